@@ -1,51 +1,564 @@
 from datetime import datetime, timedelta
-from jose import jwt, JWTError
 from fastapi import HTTPException, status
+import base64
+import calendar
+import hashlib
+import hmac
+import json
 import os
 import logging
+import threading
+import time
 import uuid
-from typing import Tuple, Dict
+from typing import Any, Tuple, Dict, Iterable, Optional
+from app.core.revocation import revocation_index
+from app.core.sessions import session_watermarks
+from app.core.metrics import record_outcome, stage_timer
 
 logger = logging.getLogger(__name__)
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
+# auto | hmac | asymmetric | pyjwt | jose
+# (auto: hmac for HS*, asymmetric for ES256/EdDSA, jose otherwise)
+JWT_BACKEND = os.getenv("JWT_BACKEND", "auto")
 
 
-# Internal helpers
-def _validate_secrets() -> Tuple[str, str]:
-    if not SECRET_KEY:
-        logger.error("SECRET_KEY environment variable is not set")
-        raise ValueError("SECRET_KEY is required")
+class TokenError(Exception):
+    """
+    Token failed verification (bad signature, malformed, expired...).
+    Raised by every codec backend.
+    """
+
+
+class TokenExpired(TokenError):
+    """
+    Token is well-formed and correctly signed but past its exp.
+    """
+
+
+# Codec backends
+#
+# Each backend is built once with the key material and exposes
+# encode(claims) -> str and decode(token) -> dict. decode verifies the
+# signature and exp.
+
+_HMAC_DIGESTS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+ASYMMETRIC_ALGORITHMS = ("ES256", "EdDSA")
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _json_bytes(value: dict) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def _split_token(token: str):
+    """
+    Split a compact JWS into (header, signing_input, payload_b64, signature).
+    """
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64decode(header_b64))
+        signature = _b64decode(signature_b64)
+    except (ValueError, TypeError):
+        raise TokenError("Malformed token")
+
+    if not isinstance(header, dict):
+        raise TokenError("Malformed token")
+
+    return header, f"{header_b64}.{payload_b64}".encode(), payload_b64, signature
+
+
+def _load_payload(payload_b64: str) -> dict:
+    """
+    Decode an already-verified payload and enforce exp.
+    """
+    try:
+        payload = json.loads(_b64decode(payload_b64))
+    except (ValueError, TypeError):
+        raise TokenError("Malformed token")
+    if not isinstance(payload, dict):
+        raise TokenError("Malformed token")
+
+    exp = payload.get("exp")
+    if exp is not None:
+        try:
+            expired = int(exp) < time.time()
+        except (TypeError, ValueError):
+            raise TokenError("Invalid exp claim")
+        if expired:
+            raise TokenExpired("Signature has expired")
+
+    return payload
+
+
+class HmacBackend:
+    """
+    Stdlib HS256/384/512. The keyed HMAC state is built once and copied
+    per token, so the key is never re-processed.
+    """
+
+    name = "hmac"
+
+    def __init__(self, secret_key: str, algorithm: str):
+        if algorithm not in _HMAC_DIGESTS:
+            raise ValueError(f"hmac backend does not support {algorithm}")
+
+        self.algorithm = algorithm
+        self._mac = hmac.new(secret_key.encode(), digestmod=_HMAC_DIGESTS[algorithm])
+        self._header = _b64encode(_json_bytes({"alg": algorithm, "typ": "JWT"}))
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, claims: dict) -> str:
+        signing_input = self._header + b"." + _b64encode(_json_bytes(claims))
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode()
+
+    def decode(self, token: str) -> dict:
+        header, signing_input, payload_b64, signature = _split_token(token)
+
+        if header.get("alg") != self.algorithm:
+            raise TokenError("Unexpected signing algorithm")
+
+        if not hmac.compare_digest(self._sign(signing_input), signature):
+            raise TokenError("Signature verification failed")
+
+        return _load_payload(payload_b64)
+
+
+class AsymmetricBackend:
+    """
+    ES256 / EdDSA (Ed25519) signing with a "kid" header, via cryptography.
+
+    Tokens are signed with one private key and verified against a set of
+    public keys indexed by kid, so keys can be rotated: start signing with
+    a new key while the previous public key stays listed in
+    JWT_VERIFICATION_KEYS until its tokens have expired. The public keys
+    are published at /.well-known/jwks.json so other services verify
+    tokens locally.
+
+    Config:
+        JWT_SIGNING_KEY_FILE   PEM private key, e.g.
+                               openssl ecparam -name prime256v1 -genkey -noout
+                               openssl genpkey -algorithm ed25519
+        JWT_SIGNING_KEY_ID     kid for the signing key (default: RFC 7638 thumbprint)
+        JWT_VERIFICATION_KEYS  extra public keys, comma separated "kid=path.pem"
+                               or "path.pem" (kid = thumbprint)
+    """
+
+    name = "asymmetric"
+
+    def __init__(
+        self,
+        algorithm: str,
+        signing_key=None,
+        signing_kid: Optional[str] = None,
+        verification_keys: Optional[Dict[str, Any]] = None,
+    ):
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+        from cryptography.hazmat.primitives.asymmetric.utils import (
+            decode_dss_signature,
+            encode_dss_signature,
+        )
+
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise ValueError(f"asymmetric backend does not support {algorithm}")
+
+        self.algorithm = algorithm
+        self._invalid_signature = InvalidSignature
+        self._ec = ec
+        self._ed25519 = ed25519
+        self._sha256 = hashes.SHA256
+        self._decode_dss = decode_dss_signature
+        self._encode_dss = encode_dss_signature
+
+        self._keys: Dict[str, Any] = {}
+        for kid, public_key in (verification_keys or {}).items():
+            self._check_key_type(public_key)
+            self._keys[kid] = public_key
+
+        self._signing_key = signing_key
+        self._header = None
+        if signing_key is not None:
+            self._check_key_type(signing_key.public_key())
+            kid = signing_kid or self._thumbprint(signing_key.public_key())
+            self._keys[kid] = signing_key.public_key()
+            self._header = _b64encode(
+                _json_bytes({"alg": algorithm, "typ": "JWT", "kid": kid})
+            )
+
+        if not self._keys:
+            raise ValueError("No signing or verification keys configured")
+
+        self._jwks = {"keys": [self._jwk(kid, key) for kid, key in self._keys.items()]}
+
+    @classmethod
+    def from_env(cls, algorithm: str) -> "AsymmetricBackend":
+        from cryptography.hazmat.primitives import serialization
+
+        signing_key = None
+        key_file = os.getenv("JWT_SIGNING_KEY_FILE")
+        if key_file:
+            with open(key_file, "rb") as f:
+                signing_key = serialization.load_pem_private_key(f.read(), password=None)
+
+        verification_keys = {}
+        for entry in filter(None, os.getenv("JWT_VERIFICATION_KEYS", "").split(",")):
+            kid, _, path = entry.strip().rpartition("=")
+            with open(path, "rb") as f:
+                public_key = serialization.load_pem_public_key(f.read())
+            verification_keys[kid or cls._thumbprint(public_key)] = public_key
+
+        return cls(
+            algorithm,
+            signing_key=signing_key,
+            signing_kid=os.getenv("JWT_SIGNING_KEY_ID"),
+            verification_keys=verification_keys,
+        )
+
+    def _check_key_type(self, public_key) -> None:
+        if self.algorithm == "ES256":
+            ok = (
+                isinstance(public_key, self._ec.EllipticCurvePublicKey)
+                and public_key.curve.name == "secp256r1"
+            )
+        else:
+            ok = isinstance(public_key, self._ed25519.Ed25519PublicKey)
+        if not ok:
+            raise ValueError(f"Key type does not match {self.algorithm}")
+
+    @staticmethod
+    def _public_jwk_fields(public_key) -> Dict[str, str]:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+
+        if isinstance(public_key, ec.EllipticCurvePublicKey):
+            numbers = public_key.public_numbers()
+            return {
+                "crv": "P-256",
+                "kty": "EC",
+                "x": _b64encode(numbers.x.to_bytes(32, "big")).decode(),
+                "y": _b64encode(numbers.y.to_bytes(32, "big")).decode(),
+            }
+
+        raw = public_key.public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+        return {"crv": "Ed25519", "kty": "OKP", "x": _b64encode(raw).decode()}
+
+    @classmethod
+    def _thumbprint(cls, public_key) -> str:
+        # RFC 7638: required members, sorted, no whitespace
+        fields = cls._public_jwk_fields(public_key)
+        canonical = json.dumps(fields, separators=(",", ":"), sort_keys=True).encode()
+        return _b64encode(hashlib.sha256(canonical).digest()).decode()
+
+    def _jwk(self, kid: str, public_key) -> Dict[str, str]:
+        return {
+            **self._public_jwk_fields(public_key),
+            "kid": kid,
+            "alg": self.algorithm,
+            "use": "sig",
+        }
+
+    def jwks(self) -> Dict[str, Any]:
+        return self._jwks
 
+    def encode(self, claims: dict) -> str:
+        if self._signing_key is None:
+            raise ValueError("No signing key configured (JWT_SIGNING_KEY_FILE)")
+
+        signing_input = self._header + b"." + _b64encode(_json_bytes(claims))
+
+        if self.algorithm == "ES256":
+            der = self._signing_key.sign(signing_input, self._ec.ECDSA(self._sha256()))
+            r, s = self._decode_dss(der)
+            signature = r.to_bytes(32, "big") + s.to_bytes(32, "big")
+        else:
+            signature = self._signing_key.sign(signing_input)
+
+        return (signing_input + b"." + _b64encode(signature)).decode()
+
+    def decode(self, token: str) -> dict:
+        header, signing_input, payload_b64, signature = _split_token(token)
+
+        if header.get("alg") != self.algorithm:
+            raise TokenError("Unexpected signing algorithm")
+
+        kid = header.get("kid")
+        if kid is None and len(self._keys) == 1:
+            public_key = next(iter(self._keys.values()))
+        else:
+            public_key = self._keys.get(kid)
+        if public_key is None:
+            raise TokenError("Unknown key id")
+
+        try:
+            if self.algorithm == "ES256":
+                if len(signature) != 64:
+                    raise TokenError("Signature verification failed")
+                der = self._encode_dss(
+                    int.from_bytes(signature[:32], "big"),
+                    int.from_bytes(signature[32:], "big"),
+                )
+                public_key.verify(der, signing_input, self._ec.ECDSA(self._sha256()))
+            else:
+                public_key.verify(signature, signing_input)
+        except self._invalid_signature:
+            raise TokenError("Signature verification failed")
+
+        return _load_payload(payload_b64)
+
+
+class JoseBackend:
+    """
+    python-jose, the original implementation. Supports every algorithm
+    python-jose does.
+    """
+
+    name = "jose"
+
+    def __init__(self, secret_key: str, algorithm: str):
+        from jose import jwt as jose_jwt, JWTError
+        from jose.exceptions import ExpiredSignatureError
+
+        self._jwt = jose_jwt
+        self._error = JWTError
+        self._expired = ExpiredSignatureError
+        self._key = secret_key
+        self._algorithm = algorithm
+        self._algorithms = [algorithm]
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(claims, self._key, algorithm=self._algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, self._key, algorithms=self._algorithms)
+        except self._expired as e:
+            raise TokenExpired(str(e))
+        except self._error as e:
+            raise TokenError(str(e))
+
+
+class PyJWTBackend:
+    """
+    PyJWT (optional dependency: pip install pyjwt).
+    """
+
+    name = "pyjwt"
+
+    def __init__(self, secret_key: str, algorithm: str):
+        import jwt as pyjwt
+
+        self._jwt = pyjwt
+        self._key = secret_key
+        self._algorithm = algorithm
+        self._algorithms = [algorithm]
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(claims, self._key, algorithm=self._algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, self._key, algorithms=self._algorithms)
+        except self._jwt.ExpiredSignatureError as e:
+            raise TokenExpired(str(e))
+        except self._jwt.PyJWTError as e:
+            raise TokenError(str(e))
+
+
+# name -> factory(secret_key, algorithm)
+TOKEN_BACKENDS = {
+    "hmac": HmacBackend,
+    "jose": JoseBackend,
+    "pyjwt": PyJWTBackend,
+    "asymmetric": lambda secret_key, algorithm: AsymmetricBackend.from_env(algorithm),
+}
+
+
+class TokenCodec:
+    """
+    Encodes and verifies JWTs with key material prepared once.
+    Used by every route; get one with get_token_codec().
+    """
+
+    def __init__(self, secret_key: Optional[str], algorithm: str, backend="auto"):
+        """
+        Args:
+            secret_key: HMAC secret (unused by the asymmetric backend)
+            algorithm: JWS algorithm, e.g. HS256, ES256, EdDSA
+            backend: backend name, "auto", or a ready backend instance
+        """
+        if isinstance(backend, str):
+            if backend == "auto":
+                if algorithm in _HMAC_DIGESTS:
+                    backend = "hmac"
+                elif algorithm in ASYMMETRIC_ALGORITHMS:
+                    backend = "asymmetric"
+                else:
+                    backend = "jose"
+
+            if backend not in TOKEN_BACKENDS:
+                raise ValueError(f"Unknown JWT backend: {backend}")
+
+            backend = TOKEN_BACKENDS[backend](secret_key, algorithm)
+
+        self.algorithm = algorithm
+        self._backend = backend
+        self.backend = backend.name
+
+    def jwks(self) -> Dict[str, Any]:
+        """
+        Public verification keys as a JWK Set. Empty for HMAC: a shared
+        secret must never be published.
+        """
+        if hasattr(self._backend, "jwks"):
+            return self._backend.jwks()
+        return {"keys": []}
+
+    def encode(self, claims: dict) -> str:
+        to_encode = dict(claims)
+        for claim in ("exp", "iat", "nbf"):
+            value = to_encode.get(claim)
+            if isinstance(value, datetime):
+                to_encode[claim] = calendar.timegm(value.utctimetuple())
+        iat = claims.get("iat")
+        if isinstance(iat, datetime):
+            # milliseconds, so session watermarks (app.core.sessions) can
+            # tell a login from a revoke-all in the same second
+            to_encode["iat"] += iat.microsecond // 1000 / 1000
+        return self._backend.encode(to_encode)
+
+    def decode(self, token: str) -> dict:
+        """
+        Verify signature and expiry and return the claims.
+
+        Raises:
+            TokenError: If the token is invalid or expired
+        """
+        if not token:
+            raise TokenError("Token is missing")
+        return self._backend.decode(token)
+
+    @staticmethod
+    def unverified_claims(token: str) -> dict:
+        """
+        Read claims WITHOUT verifying the signature.
+        Only for cache lookups that are then confirmed by other means.
+        """
+        try:
+            claims = json.loads(_b64decode(token.split(".")[1]))
+        except (ValueError, TypeError, IndexError):
+            raise TokenError("Malformed token")
+        if not isinstance(claims, dict):
+            raise TokenError("Malformed token")
+        return claims
+
+
+_codec: Optional[TokenCodec] = None
+_codec_lock = threading.Lock()
+
+
+# Internal helpers
+def _validate_secrets() -> Tuple[Optional[str], str]:
     if not ALGORITHM:
         logger.error("ALGORITHM environment variable is not set")
         raise ValueError("ALGORITHM is required")
 
+    # asymmetric algorithms use key files instead of a shared secret
+    if not SECRET_KEY and ALGORITHM not in ASYMMETRIC_ALGORITHMS:
+        logger.error("SECRET_KEY environment variable is not set")
+        raise ValueError("SECRET_KEY is required")
+
     return SECRET_KEY, ALGORITHM
 
 
-def _base_encode(data: dict, expires_delta: timedelta) -> str:
-    secret_key, algorithm = _validate_secrets()
+def get_token_codec() -> TokenCodec:
+    """
+    Return the shared codec, building it on first use.
+
+    Raises:
+        ValueError: If SECRET_KEY / ALGORITHM are missing or invalid
+    """
+    global _codec
+
+    if _codec is None:
+        with _codec_lock:
+            if _codec is None:
+                secret_key, algorithm = _validate_secrets()
+                try:
+                    _codec = TokenCodec(secret_key, algorithm, JWT_BACKEND)
+                except (OSError, ImportError) as e:
+                    logger.error(f"Failed to load JWT keys: {str(e)}")
+                    raise ValueError("Invalid JWT key configuration")
+                logger.info(f"JWT codec ready ({_codec.backend}, {algorithm})")
+    return _codec
+
+
+# "token_use" claim values; access and refresh tokens share the signing
+# key, so verification alone cannot tell them apart
+ACCESS_TOKEN_USE = "access"
+REFRESH_TOKEN_USE = "refresh"
+
 
+def _base_encode(data: dict, expires_delta: timedelta, token_use: str) -> str:
+    codec = get_token_codec()
+
+    now = datetime.utcnow()
     to_encode = data.copy()
     to_encode.update({
-        "exp": datetime.utcnow() + expires_delta,
+        "iat": now,
+        "exp": now + expires_delta,
         "jti": str(uuid.uuid4()),  # 🔥 CRITICAL
+        "token_use": token_use,
     })
 
-    return jwt.encode(to_encode, secret_key, algorithm=algorithm)
+    with stage_timer("jwt_encode"):
+        return codec.encode(to_encode)
 
 
 # Token creation
-def create_access_token(data: dict, expires_minutes: int) -> str:
+def create_access_token(
+    data: dict,
+    expires_minutes: int,
+    roles: Optional[Iterable[str]] = None,
+    role_version: Optional[int] = None,
+) -> str:
+    """
+    Create an access token.
+
+    When roles are given they are stamped into the token as the "roles"
+    claim, together with the user's role version ("rv"), so authorization
+    can be decided from the token alone (see app.deps.require_role).
+    """
     if expires_minutes <= 0:
         raise ValueError("Expiration time must be positive")
 
+    if roles is not None:
+        data = {**data, "roles": sorted(roles), "rv": role_version or 0}
+
     try:
         return _base_encode(
             data=data,
             expires_delta=timedelta(minutes=expires_minutes),
+            token_use=ACCESS_TOKEN_USE,
         )
     except Exception as e:
         logger.error(f"Failed to create access token: {str(e)}")
@@ -60,6 +573,7 @@ def create_refresh_token(data: dict, expires_days: int) -> str:
         return _base_encode(
             data=data,
             expires_delta=timedelta(days=expires_days),
+            token_use=REFRESH_TOKEN_USE,
         )
     except Exception as e:
         logger.error(f"Failed to create refresh token: {str(e)}")
@@ -67,13 +581,13 @@ def create_refresh_token(data: dict, expires_days: int) -> str:
 
 
 # Token decode (shared)
-def decode_token(token: str) -> Dict[str, str]:
+def decode_token(token: str) -> Dict[str, Any]:
     """
-    Decode JWT and return payload (sub, jti).
-    Used by access & refresh flows.
+    Decode an access token and return its payload (sub, jti, exp, iat,
+    and roles/rv when present). Refresh tokens are rejected.
     """
     try:
-        secret_key, algorithm = _validate_secrets()
+        codec = get_token_codec()
 
         if not token:
             raise HTTPException(
@@ -81,7 +595,8 @@ def decode_token(token: str) -> Dict[str, str]:
                 detail="Token is missing",
             )
 
-        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+        with stage_timer("jwt_decode"):
+            payload = codec.decode(token)
 
         sub = payload.get("sub")
         jti = payload.get("jti")
@@ -93,15 +608,44 @@ def decode_token(token: str) -> Dict[str, str]:
                 detail="Invalid token payload",
             )
 
-        return {
+        if payload.get("token_use") != ACCESS_TOKEN_USE:
+            logger.warning("Token is not an access token")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token type",
+            )
+
+        if revocation_index.is_revoked(jti):
+            record_outcome("revoked_token")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revoked",
+            )
+
+        if session_watermarks.is_invalidated(sub, payload.get("iat")):
+            record_outcome("revoked_token")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Session revoked",
+            )
+
+        claims = {
             "sub": sub,
             "jti": jti,
+            "exp": payload.get("exp"),
+            "iat": payload.get("iat"),
         }
+        if "roles" in payload:
+            claims["roles"] = payload["roles"]
+            claims["rv"] = payload.get("rv", 0)
+
+        return claims
 
     except HTTPException:
         raise
-    except JWTError as e:
-        logger.warning(f"JWT validation failed: {str(e)}")
+    except TokenError as e:
+        record_outcome("expired_token" if isinstance(e, TokenExpired) else "invalid_token")
+        logger.warning("JWT validation failed: %s", e, extra={"sample": "jwt_invalid"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
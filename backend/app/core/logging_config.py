@@ -0,0 +1,183 @@
+"""
+Non-blocking, structured logging.
+
+Handlers that do I/O (file, stderr) run on a QueueListener thread; the
+request path only enqueues records via a QueueHandler. Formatting happens
+on the listener thread too. Output is one JSON object per line
+(LOG_FORMAT=text for the old human-readable format).
+
+The queue holds at most LOG_QUEUE_SIZE records. When the listener falls
+behind, new records are dropped rather than blocking requests or growing
+memory without bound; drops are counted in log_records_dropped_total.
+
+High-volume events can be sampled: pass extra={"sample": "<key>"} and only
+one in LOG_SAMPLE_EVERY records per key is kept. Sampled records are
+dropped before formatting, so they cost almost nothing.
+"""
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+
+from app.core.metrics import LOG_RECORDS_DROPPED
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# LogRecord attributes that are not user-supplied extras
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class MaskedEmail:
+    """
+    Log argument that renders an email as "j***@example.com".
+    Masking happens only if the record is actually emitted.
+    """
+    __slots__ = ("email",)
+
+    def __init__(self, email: str):
+        self.email = email
+
+    def __str__(self) -> str:
+        local, sep, domain = self.email.partition("@")
+        if not sep:
+            return "***"
+        return f"{local[:1]}***@{domain}"
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep one in `every` records carrying the same `sample` key.
+    Records without a key always pass.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(every, 1)
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        if key is None or self.every == 1:
+            return True
+
+        with self._lock:
+            seen = self._counts.get(key, 0)
+            self._counts[key] = seen + 1
+
+        if seen % self.every:
+            return False
+        record.sample_rate = self.every
+        return True
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler for a bounded queue: drops (and counts) records when the
+    queue is full, and leaves formatting to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() formats the message (and traceback) here, on
+        # the caller's thread. Only copy the record and freeze a mapping
+        # argument; the listener's handlers format it.
+        record = copy.copy(record)
+        if isinstance(record.args, dict):
+            record.args = dict(record.args)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # put_nowait would fail on a full queue; the listener is still
+        # running, so waiting for room is safe
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: timestamp, level, logger, message,
+    plus any extra= fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+def setup_logging() -> QueueListener:
+    """
+    Route all logging through a queue and start the listener thread.
+    Safe to call more than once.
+
+    Returns:
+        The running QueueListener
+    """
+    global _listener
+
+    if _listener is not None:
+        return _listener
+
+    if LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    handlers = [logging.StreamHandler()]
+    if LOG_FILE:
+        handlers.append(logging.FileHandler(LOG_FILE))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = BoundedQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_EVERY))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = _Listener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """
+    Flush queued records and stop the listener. Called on application shutdown.
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
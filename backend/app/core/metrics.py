@@ -0,0 +1,269 @@
+"""
+Prometheus metrics for the auth flows.
+
+- http_request_duration_seconds: per route template, method and status
+  (MetricsMiddleware).
+- auth_stage_duration_seconds: per stage (password_hash, password_verify,
+  jwt_encode, jwt_decode, db_*), via stage_timer().
+- auth_outcomes_total: invalid password, revoked/expired token, ...
+- password_hash_in_flight plus db_pool_* gauges, to alert on KDF and
+  connection pool saturation.
+- auth_write_batch_size: writes per group commit (app.core.write_batcher).
+- token_sweep_rows_purged_total / token_sweep_runs_total: expiry sweeper
+  progress (app.core.sweeper).
+- log_records_dropped_total: records discarded because the log queue was
+  full (app.core.logging_config).
+
+Exposed on /metrics (app.routes.metrics).
+
+Multiple worker processes (uvicorn --workers N, gunicorn): set
+PROMETHEUS_MULTIPROC_DIR to an empty directory, wiped before every start,
+so /metrics aggregates all workers instead of reporting whichever one
+served the scrape. In that mode each worker copies its pool numbers into
+multiprocess-safe metrics every POOL_METRICS_INTERVAL_SECONDS
+(run_pool_metrics), since scrape-time collectors only see the scraping
+process.
+"""
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+POOL_METRICS_INTERVAL_SECONDS = float(os.getenv("POOL_METRICS_INTERVAL_SECONDS", "5"))
+
+_STAGE_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=_STAGE_BUCKETS,
+)
+
+STAGE_LATENCY = Histogram(
+    "auth_stage_duration_seconds",
+    "Latency of individual steps in the auth flows",
+    ["stage"],
+    buckets=_STAGE_BUCKETS,
+)
+
+AUTH_OUTCOMES = Counter(
+    "auth_outcomes_total",
+    "Authentication outcomes",
+    ["outcome"],
+)
+
+PASSWORD_HASH_IN_FLIGHT = Gauge(
+    "password_hash_in_flight",
+    "Password hash/verify jobs queued or running on the executor",
+    multiprocess_mode="livesum",
+)
+
+WRITE_BATCH_SIZE = Histogram(
+    "auth_write_batch_size",
+    "Writes flushed per group commit",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+TOKEN_SWEEP_PURGED = Counter(
+    "token_sweep_rows_purged",
+    "Rows deleted by the token expiry sweeper",
+    ["table"],
+)
+
+TOKEN_SWEEP_RUNS = Counter(
+    "token_sweep_runs",
+    "Completed token expiry sweeps",
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped",
+    "Log records discarded because the log queue was full",
+)
+
+
+def stage_timer(stage: str):
+    """
+    Context manager / decorator recording the duration of one stage.
+    """
+    return STAGE_LATENCY.labels(stage).time()
+
+
+def record_outcome(outcome: str) -> None:
+    AUTH_OUTCOMES.labels(outcome).inc()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request.
+
+    Requests are labelled with the matched route template
+    ("/admin/users/{user_id}/roles"), never the raw path, so label
+    cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            ).observe(time.perf_counter() - started)
+
+
+class _PoolCollector:
+    """
+    Reads DB pool occupancy and checkout wait times at scrape time.
+    """
+
+    def collect(self):
+        # imported lazily: app.database requires DATABASE_URL
+        from app.database import pool_stats, pool_status
+
+        gauges = {
+            key: GaugeMetricFamily(f"db_pool_{key}", f"Pool connections ({key})", labels=["pool"])
+            for key in ("size", "checked_out", "overflow", "checked_in")
+        }
+        for pool, status in pool_status().items():
+            for key, gauge in gauges.items():
+                gauge.add_metric([pool], status[key])
+        yield from gauges.values()
+
+        checkouts = CounterMetricFamily(
+            "db_pool_checkouts", "Connection checkouts", labels=["pool"]
+        )
+        wait_total = CounterMetricFamily(
+            "db_pool_wait_seconds", "Time spent waiting for a connection", labels=["pool"]
+        )
+        wait_max = GaugeMetricFamily(
+            "db_pool_wait_seconds_max", "Longest wait for a connection", labels=["pool"]
+        )
+        for pool, count in dict(pool_stats.checkouts).items():
+            checkouts.add_metric([pool], count)
+            wait_total.add_metric([pool], pool_stats.wait_seconds_total.get(pool, 0.0))
+            wait_max.add_metric([pool], pool_stats.wait_seconds_max.get(pool, 0.0))
+        yield checkouts
+        yield wait_total
+        yield wait_max
+
+
+_pool_collector = None
+
+
+def register_pool_collector() -> None:
+    """
+    Register the pool collector on the default registry (once).
+    In multiprocess mode pool metrics come from run_pool_metrics instead.
+    """
+    global _pool_collector
+
+    if _pool_collector is None and not PROMETHEUS_MULTIPROC_DIR:
+        _pool_collector = _PoolCollector()
+        REGISTRY.register(_pool_collector)
+
+
+def metrics_registry():
+    """
+    Registry to expose on /metrics: the default one, or a fresh one
+    aggregating every worker's files in multiprocess mode.
+    """
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+# Multiprocess pool metrics (same names as _PoolCollector)
+
+_POOL_GAUGES: Dict[str, Gauge] = {}
+_POOL_CHECKOUTS: Optional[Counter] = None
+_POOL_WAIT: Optional[Counter] = None
+_POOL_WAIT_MAX: Optional[Gauge] = None
+# last cumulative values pushed, per pool: (checkouts, wait seconds)
+_pool_pushed: Dict[str, tuple] = {}
+
+
+def _create_pool_metrics() -> None:
+    global _POOL_CHECKOUTS, _POOL_WAIT, _POOL_WAIT_MAX
+
+    for key in ("size", "checked_out", "overflow", "checked_in"):
+        _POOL_GAUGES[key] = Gauge(
+            f"db_pool_{key}", f"Pool connections ({key})", ["pool"],
+            multiprocess_mode="livesum",
+        )
+    _POOL_CHECKOUTS = Counter("db_pool_checkouts", "Connection checkouts", ["pool"])
+    _POOL_WAIT = Counter(
+        "db_pool_wait_seconds", "Time spent waiting for a connection", ["pool"]
+    )
+    _POOL_WAIT_MAX = Gauge(
+        "db_pool_wait_seconds_max", "Longest wait for a connection", ["pool"],
+        multiprocess_mode="max",
+    )
+
+
+def push_pool_metrics() -> None:
+    """
+    Copy this process's pool numbers into the multiprocess metrics.
+    """
+    from app.database import pool_stats, pool_status
+
+    if not _POOL_GAUGES:
+        _create_pool_metrics()
+
+    for pool, status in pool_status().items():
+        for key, gauge in _POOL_GAUGES.items():
+            gauge.labels(pool).set(status[key])
+
+    for pool, count in dict(pool_stats.checkouts).items():
+        waited = pool_stats.wait_seconds_total.get(pool, 0.0)
+        last_count, last_waited = _pool_pushed.get(pool, (0, 0.0))
+        _POOL_CHECKOUTS.labels(pool).inc(count - last_count)
+        _POOL_WAIT.labels(pool).inc(waited - last_waited)
+        _POOL_WAIT_MAX.labels(pool).set(pool_stats.wait_seconds_max.get(pool, 0.0))
+        _pool_pushed[pool] = (count, waited)
+
+
+async def run_pool_metrics(interval: Optional[float] = None) -> None:
+    """
+    Push pool metrics forever (multiprocess mode). Started from the app lifespan.
+    """
+    interval = interval or POOL_METRICS_INTERVAL_SECONDS
+
+    while True:
+        try:
+            push_pool_metrics()
+        except Exception as e:
+            logger.error(f"Pool metrics update failed: {str(e)}")
+
+        await asyncio.sleep(interval)
+
@@ -0,0 +1,152 @@
+"""
+Short-lived caches of negative lookups.
+
+Credential stuffing sends logins for emails that do not exist, and
+stolen or replayed refresh cookies keep presenting tokens that were
+already rotated or revoked. Both answers can be remembered for
+NEGATIVE_CACHE_TTL_SECONDS so repeats are rejected without a query:
+
+- revoked_refresh_tokens: refresh token hashes that failed rotation.
+  Revocation is permanent, so a per-process cache is always correct;
+  the TTL and size bound only limit memory.
+- unknown emails: "no user with this email". Unlike revocation this
+  answer changes on signup, and every process that cached it must
+  forget it before the new user logs in. Off by default. Enable it
+  with a store shared by all workers (set_unknown_email_backend), or
+  with UNKNOWN_EMAIL_CACHE=local in single-process deployments only:
+  with several workers a login routed to another worker right after
+  signup would be rejected until the entry expires.
+
+A shared backend implements, like the rate limit backends:
+
+    async def contains(key: str) -> bool
+    async def add(key: str, ttl: float) -> None
+    async def discard(key: str) -> None
+"""
+from collections import OrderedDict
+from typing import Hashable
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+NEGATIVE_CACHE_MAX_ENTRIES = int(os.getenv("NEGATIVE_CACHE_MAX_ENTRIES", "100000"))
+NEGATIVE_CACHE_TTL_SECONDS = float(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", "30"))
+# off | local (single-process deployments only)
+UNKNOWN_EMAIL_CACHE = os.getenv("UNKNOWN_EMAIL_CACHE", "off").lower()
+
+
+class NegativeCache:
+    """
+    Thread-safe set of keys with a TTL, bounded to max_entries (LRU).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> monotonic expiry time
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        if self.max_entries <= 0:
+            return False
+
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False
+            return True
+
+    def add(self, key: Hashable) -> None:
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class LocalEmailBackend:
+    """
+    Unknown-email backend over a per-process NegativeCache.
+    """
+
+    def __init__(self, cache: NegativeCache):
+        self.cache = cache
+
+    async def contains(self, key: str) -> bool:
+        return key in self.cache
+
+    async def add(self, key: str, ttl: float) -> None:
+        self.cache.add(key)
+
+    async def discard(self, key: str) -> None:
+        self.cache.discard(key)
+
+
+revoked_refresh_tokens = NegativeCache(NEGATIVE_CACHE_MAX_ENTRIES, NEGATIVE_CACHE_TTL_SECONDS)
+
+_email_backend = (
+    LocalEmailBackend(NegativeCache(NEGATIVE_CACHE_MAX_ENTRIES, NEGATIVE_CACHE_TTL_SECONDS))
+    if UNKNOWN_EMAIL_CACHE == "local" else None
+)
+
+
+def set_unknown_email_backend(backend) -> None:
+    """
+    Cache unknown emails in `backend` (shared by all workers), or
+    disable the cache with None.
+    """
+    global _email_backend
+    _email_backend = backend
+
+
+async def is_unknown_email(email: str) -> bool:
+    """
+    True if a recent lookup found no user with this email.
+    Cache errors count as a miss: the caller just queries the DB.
+    """
+    if _email_backend is None:
+        return False
+    try:
+        return await _email_backend.contains(email)
+    except Exception as e:
+        logger.error("Unknown email cache error: %s", e)
+        return False
+
+
+async def remember_unknown_email(email: str) -> None:
+    if _email_backend is None:
+        return
+    try:
+        await _email_backend.add(email, NEGATIVE_CACHE_TTL_SECONDS)
+    except Exception as e:
+        logger.error("Unknown email cache error: %s", e)
+
+
+async def forget_unknown_email(email: str) -> None:
+    """
+    Call after creating a user with this email.
+    """
+    if _email_backend is None:
+        return
+    try:
+        await _email_backend.discard(email)
+    except Exception as e:
+        logger.error("Unknown email cache error: %s", e)
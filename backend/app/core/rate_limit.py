@@ -0,0 +1,136 @@
+"""
+Sliding-window rate limiting for the credential endpoints.
+
+Login and signup each cost a full bcrypt operation, so they are throttled
+per client IP and (login) per email before any DB or KDF work. Limits
+use a sliding-window counter: the previous fixed window's count is
+weighted by how much of it still overlaps the sliding window, which
+needs two integers per key instead of a timestamp per request.
+
+The default MemoryBackend is per-process. To share limits across workers
+plug in a backend with the same interface via set_rate_limit_backend():
+
+    async def hit(key: str, limit: int, window: float) -> float
+        Count one request for key; return 0 if it is allowed, otherwise
+        the number of seconds until the caller may retry.
+"""
+from collections import OrderedDict
+from fastapi import HTTPException, Request, status
+from typing import List, Tuple
+import logging
+import math
+import os
+import threading
+import time
+
+from app.core.metrics import record_outcome
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_WINDOW_SECONDS = float(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60"))
+RATE_LIMIT_LOGIN_PER_IP = int(os.getenv("RATE_LIMIT_LOGIN_PER_IP", "30"))
+RATE_LIMIT_LOGIN_PER_EMAIL = int(os.getenv("RATE_LIMIT_LOGIN_PER_EMAIL", "10"))
+RATE_LIMIT_SIGNUP_PER_IP = int(os.getenv("RATE_LIMIT_SIGNUP_PER_IP", "10"))
+# Keys tracked by the memory backend; least recently used are evicted
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Use the first X-Forwarded-For address (only behind a trusted proxy)
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+
+class MemoryBackend:
+    """
+    In-process sliding-window counters, bounded to max_keys entries (LRU).
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # key -> [window index, previous window count, current window count]
+        self._windows: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        now = time.time()
+        index = int(now // window)
+        elapsed = now - index * window
+
+        with self._lock:
+            entry = self._windows.get(key)
+            if entry is None or entry[0] < index - 1:
+                previous, current = 0, 0
+            elif entry[0] == index - 1:
+                previous, current = entry[2], 0
+            else:
+                previous, current = entry[1], entry[2]
+
+            estimated = previous * (1 - elapsed / window) + current
+            allowed = estimated < limit
+            if allowed:
+                current += 1
+
+            self._windows[key] = [index, previous, current]
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+
+        if allowed:
+            return 0.0
+        if current >= limit:
+            return window - elapsed
+        # wait until enough of the previous window has slid out
+        return window * (1 - (limit - current) / previous) - elapsed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._windows.clear()
+
+
+_backend = MemoryBackend(RATE_LIMIT_MAX_KEYS)
+
+
+def set_rate_limit_backend(backend) -> None:
+    """
+    Replace the rate limit store (e.g. with one shared across workers).
+    """
+    global _backend
+    _backend = backend
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def enforce_rate_limits(checks: List[Tuple[str, int]]) -> None:
+    """
+    Count one hit against every (key, limit) pair.
+
+    Raises:
+        HTTPException: 429 with Retry-After if any limit is exceeded
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+
+    retry_after = 0.0
+    for key, limit in checks:
+        try:
+            wait = await _backend.hit(key, limit, RATE_LIMIT_WINDOW_SECONDS)
+        except Exception as e:
+            # fail open: an unavailable store must not lock everyone out
+            logger.error("Rate limit backend error: %s", e)
+            continue
+        retry_after = max(retry_after, wait)
+
+    if retry_after:
+        record_outcome("rate_limited")
+        logger.warning(
+            "Rate limit exceeded: %s", checks[0][0], extra={"sample": "rate_limited"}
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
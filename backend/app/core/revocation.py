@@ -0,0 +1,235 @@
+"""
+In-memory index of revoked JWT ids (jti).
+
+Mirrors the revoked_tokens table so revocation can be checked on every
+request without touching the DB. A bloom filter sits in front of the
+exact set: almost every token is not revoked, and the filter answers
+that without hashing into a large dict. Hits are confirmed against the
+exact set, so there are no false positives.
+
+The index is loaded at startup and then kept in sync incrementally by
+polling rows revoked since the previous poll, minus
+REVOCATION_SYNC_LOOKBACK_SECONDS: ids and revoked_at are assigned before
+commit, so a row can become visible after rows with later values, and
+polling above the highest one seen would skip it forever. Re-read rows
+are deduplicated by jti. Revocations made by this process are added
+immediately; those made by other workers become visible within
+REVOCATION_SYNC_INTERVAL_SECONDS.
+
+DB modules are imported lazily so the token code path (app.core.jwt)
+stays importable without a database configured.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from typing import Dict, Optional
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_SYNC_INTERVAL_SECONDS = float(os.getenv("REVOCATION_SYNC_INTERVAL_SECONDS", "5"))
+# Re-scan window for rows committed late (long transactions, clock skew)
+REVOCATION_SYNC_LOOKBACK_SECONDS = float(os.getenv("REVOCATION_SYNC_LOOKBACK_SECONDS", "60"))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+# Rows without expires_at (written before it existed) are kept this long
+LEGACY_RETENTION_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter over strings, using double hashing
+    on a single 128-bit blake2b digest.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class RevocationIndex:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.loaded = False
+        # jti -> expiry as unix time
+        self._jtis: Dict[str, float] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        # start of the last load/sync query (app clock, naive UTC)
+        self._synced_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def is_revoked(self, jti: str) -> bool:
+        if jti not in self._bloom:
+            return False
+
+        exp = self._jtis.get(jti)
+        return exp is not None and exp > time.time()
+
+    def add(self, jti: str, expires_at: Optional[datetime] = None) -> None:
+        """
+        Record a revocation made by this process.
+        """
+        with self._lock:
+            self._add(jti, self._expiry(expires_at, None))
+
+    def load(self, db: Session) -> None:
+        """
+        (Re)build the index from every revoked token that has not expired.
+        """
+        from app.models.token import RevokedToken
+
+        now = datetime.utcnow()
+        rows = (
+            db.query(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at)
+            .filter(
+                (RevokedToken.expires_at > now)
+                | RevokedToken.expires_at.is_(None)
+            )
+            .all()
+        )
+
+        jtis = {}
+        for jti, expires_at, revoked_at in rows:
+            jtis[jti] = self._expiry(expires_at, revoked_at)
+
+        bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+
+        with self._lock:
+            # keep local revocations that raced with the load
+            for jti, exp in self._jtis.items():
+                if jti not in jtis:
+                    jtis[jti] = exp
+                    bloom.add(jti)
+            self._jtis = jtis
+            self._bloom = bloom
+            self._synced_at = now
+            self.loaded = True
+
+        logger.info(f"Revocation index loaded with {len(jtis)} entries")
+
+    def sync(self, db: Session) -> int:
+        """
+        Pull revocations written since the last sync (plus the lookback
+        window).
+
+        Returns:
+            Number of jtis not already in the index
+        """
+        from app.models.token import RevokedToken
+
+        started = datetime.utcnow()
+        since = self._synced_at - timedelta(seconds=REVOCATION_SYNC_LOOKBACK_SECONDS)
+        rows = (
+            db.query(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at)
+            .filter(RevokedToken.revoked_at > since)
+            .all()
+        )
+
+        added = 0
+        now = time.time()
+        with self._lock:
+            for jti, expires_at, revoked_at in rows:
+                exp = self._expiry(expires_at, revoked_at)
+                if exp <= now:
+                    continue
+                if jti not in self._jtis:
+                    added += 1
+                self._add(jti, exp)
+            self._synced_at = started
+
+            self._prune()
+            needs_rebuild = self._bloom.count > self._bloom.capacity
+
+        if needs_rebuild:
+            self.load(db)
+
+        return added
+
+    def _add(self, jti: str, exp: float) -> None:
+        if jti not in self._jtis:
+            self._bloom.add(jti)
+        self._jtis[jti] = exp
+
+    def _prune(self) -> None:
+        now = time.time()
+        expired = [jti for jti, exp in self._jtis.items() if exp <= now]
+        for jti in expired:
+            del self._jtis[jti]
+
+    @staticmethod
+    def _expiry(expires_at: Optional[datetime], revoked_at: Optional[datetime]) -> float:
+        if expires_at is None:
+            expires_at = (revoked_at or datetime.utcnow()) + timedelta(days=LEGACY_RETENTION_DAYS)
+        # naive UTC datetimes throughout the app
+        return (expires_at - datetime(1970, 1, 1)).total_seconds()
+
+
+revocation_index = RevocationIndex(REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_ERROR_RATE)
+
+
+def load_revocation_index() -> None:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        revocation_index.load(db)
+    finally:
+        db.close()
+
+
+def sync_revocation_index() -> int:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return revocation_index.sync(db)
+    finally:
+        db.close()
+
+
+async def run_revocation_sync(interval: Optional[float] = None) -> None:
+    """
+    Keep the index in sync forever. Started from the app lifespan.
+    """
+    interval = interval or REVOCATION_SYNC_INTERVAL_SECONDS
+
+    while True:
+        try:
+            if revocation_index.loaded:
+                await asyncio.to_thread(sync_revocation_index)
+            else:
+                await asyncio.to_thread(load_revocation_index)
+        except Exception as e:
+            logger.error(f"Revocation index sync failed: {str(e)}")
+
+        await asyncio.sleep(interval)
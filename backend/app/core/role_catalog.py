@@ -0,0 +1,89 @@
+"""
+In-process catalog of role names -> ids.
+
+Roles almost never change, yet every role assignment and user creation
+looked one up by name. The catalog is loaded at startup and reloaded
+when it is older than ROLE_CATALOG_TTL_SECONDS, when a name is missing
+(at most once per ROLE_CATALOG_MISS_RELOAD_SECONDS, so unknown names
+cannot hammer the DB), or after invalidate() is called by code that
+changes the roles table.
+
+DB modules are imported lazily, as in app.core.revocation.
+"""
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ROLE_CATALOG_TTL_SECONDS = float(os.getenv("ROLE_CATALOG_TTL_SECONDS", "300"))
+ROLE_CATALOG_MISS_RELOAD_SECONDS = float(os.getenv("ROLE_CATALOG_MISS_RELOAD_SECONDS", "1"))
+
+
+class RoleCatalog:
+    def __init__(self, ttl_seconds: float, miss_reload_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.miss_reload_seconds = miss_reload_seconds
+        self._ids: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def _age(self) -> float:
+        if self._loaded_at is None:
+            return float("inf")
+        return time.monotonic() - self._loaded_at
+
+    def _set(self, rows: Iterable[Tuple[str, int]]) -> None:
+        ids = {name: role_id for name, role_id in rows}
+        with self._lock:
+            self._ids = ids
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def load(self, db: Session) -> None:
+        from app.models.role import Role
+
+        self._set(db.query(Role.name, Role.id).all())
+        logger.info(f"Role catalog loaded with {len(self._ids)} roles")
+
+    async def reload(self, db) -> None:
+        from sqlalchemy import select
+        from app.models.role import Role
+
+        self._set((await db.execute(select(Role.name, Role.id))).all())
+
+    async def get_id(self, db, name: str) -> Optional[int]:
+        """
+        Id of the role called `name`, or None if there is no such role.
+        Only touches the DB when the catalog is stale or missing the name.
+        """
+        age = self._age()
+        if age > self.ttl_seconds or (
+            name not in self._ids and age > self.miss_reload_seconds
+        ):
+            await self.reload(db)
+
+        return self._ids.get(name)
+
+
+role_catalog = RoleCatalog(ROLE_CATALOG_TTL_SECONDS, ROLE_CATALOG_MISS_RELOAD_SECONDS)
+
+
+def load_role_catalog() -> None:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        role_catalog.load(db)
+    finally:
+        db.close()
@@ -0,0 +1,48 @@
+from typing import Dict
+import logging
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class RoleVersionRegistry:
+    """
+    Latest role version seen by this process for each user.
+
+    Every role change bumps users.role_version and records the new value
+    here. Access tokens carry the version they were issued with ("rv"), so
+    a token whose rv is lower than the recorded one holds stale role claims
+    and can be rejected without a DB query.
+
+    Only changes made through this process are known; other workers learn
+    about them when the token expires or when strict role checks are on
+    (the default for admin routes, see app.deps.ADMIN_ROLE_CHECK_STRICT).
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def note(self, user_id, version: int) -> None:
+        key = str(user_id)
+        with self._lock:
+            if version > self._versions.get(key, -1):
+                self._versions[key] = version
+
+    def mark_deleted(self, user_id) -> None:
+        """
+        Reject every role claim issued to a deleted user.
+        """
+        self.note(user_id, sys.maxsize)
+
+    def is_stale(self, user_id, version) -> bool:
+        known = self._versions.get(str(user_id))
+        if known is None:
+            return False
+        if version is None:
+            return True
+        return int(version) < known
+
+
+role_versions = RoleVersionRegistry()
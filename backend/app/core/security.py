@@ -1,14 +1,177 @@
 from passlib.context import CryptContext
+from fastapi import HTTPException, status
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional, TypeVar
+import asyncio
 import hashlib
 import logging
+import math
+import os
+import threading
+import time
+from app.core.metrics import PASSWORD_HASH_IN_FLIGHT, stage_timer
 
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+# Password hash cost
+#
+# PASSWORD_HASH_SCHEME selects the scheme for new hashes: bcrypt, or
+# argon2 (argon2id; optional dependency: pip install argon2-cffi). Hashes
+# of the other scheme still verify and are flagged for rehash.
+# Explicit BCRYPT_ROUNDS / ARGON2_TIME_COST win; otherwise, when
+# PASSWORD_HASH_TARGET_MS is set, the cost is calibrated at startup so one
+# hash takes about that long on this hardware. Hashes below the current
+# cost are upgraded after a successful login (see password_needs_rehash).
+
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "0"))
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS")
+# Calibration never goes below this
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "10"))
+BCRYPT_MAX_ROUNDS = 16
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_TIME_COST = os.getenv("ARGON2_TIME_COST")
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "2"))
+ARGON2_MAX_TIME_COST = 10
+# bcrypt ignores anything past 72 bytes
+PASSWORD_MAX_LENGTH = 72
+
+_SCHEMES = ("bcrypt", "argon2")
+
+if PASSWORD_HASH_SCHEME not in _SCHEMES:
+    raise ValueError(f"PASSWORD_HASH_SCHEME must be one of {', '.join(_SCHEMES)}")
+
+
+def _build_context(settings: dict) -> CryptContext:
+    scheme = settings["scheme"]
+    schemes = [scheme] + [s for s in _SCHEMES if s != scheme]
+
+    # min_rounds makes needs_update() flag hashes below the current cost.
+    # max_rounds must be set too: passlib otherwise caps it at `rounds`
+    # and flags stronger hashes as well, so workers calibrated to
+    # different costs would keep rehashing each other's hashes.
+    return CryptContext(
+        schemes=schemes,
+        default=scheme,
+        deprecated=schemes[1:],
+        bcrypt__rounds=settings["bcrypt_rounds"],
+        bcrypt__min_rounds=settings["bcrypt_rounds"],
+        bcrypt__max_rounds=max(settings["bcrypt_rounds"], BCRYPT_MAX_ROUNDS),
+        argon2__type="id",
+        argon2__memory_cost=settings["argon2_memory_cost"],
+        argon2__time_cost=settings["argon2_time_cost"],
+        argon2__min_rounds=settings["argon2_time_cost"],
+        argon2__max_rounds=max(settings["argon2_time_cost"], ARGON2_MAX_TIME_COST),
+        argon2__parallelism=settings["argon2_parallelism"],
+    )
+
+
+_hash_settings = {
+    "scheme": PASSWORD_HASH_SCHEME,
+    "bcrypt_rounds": int(BCRYPT_ROUNDS or "12"),
+    "argon2_memory_cost": ARGON2_MEMORY_COST,
+    "argon2_time_cost": int(ARGON2_TIME_COST or "3"),
+    "argon2_parallelism": ARGON2_PARALLELISM,
+}
+pwd_context = _build_context(_hash_settings)
+# Hash of a random password at the current cost (see dummy_password_hash)
+_dummy_hash: Optional[str] = None
+
+
+def configure_password_hashing(settings: dict) -> None:
+    """
+    Apply hash cost settings to this process.
+    Also the initializer of the process pool workers.
+    """
+    global _hash_settings, pwd_context, _dummy_hash
+
+    _hash_settings = dict(settings)
+    pwd_context = _build_context(_hash_settings)
+    _dummy_hash = None
+
+
+def _time_hash_ms(settings: dict, samples: int = 3) -> float:
+    context = _build_context(settings)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash("calibration-password")
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[samples // 2]
+
+
+def calibrate_password_hashing() -> dict:
+    """
+    Pick the cost that makes one hash take about PASSWORD_HASH_TARGET_MS.
+    Explicitly configured costs are left alone.
+
+    Returns:
+        Hash settings to pass to configure_password_hashing
+    """
+    settings = dict(_hash_settings)
+    if PASSWORD_HASH_TARGET_MS <= 0:
+        return settings
+
+    if settings["scheme"] == "bcrypt" and BCRYPT_ROUNDS is None:
+        base = {**settings, "bcrypt_rounds": BCRYPT_MIN_ROUNDS}
+        measured = _time_hash_ms(base)
+        # every extra round doubles the cost
+        extra = max(0, round(math.log2(PASSWORD_HASH_TARGET_MS / measured)))
+        settings["bcrypt_rounds"] = min(BCRYPT_MIN_ROUNDS + extra, BCRYPT_MAX_ROUNDS)
+
+    elif settings["scheme"] == "argon2" and ARGON2_TIME_COST is None:
+        measured = _time_hash_ms({**settings, "argon2_time_cost": 1})
+        time_cost = round(PASSWORD_HASH_TARGET_MS / measured)
+        settings["argon2_time_cost"] = max(1, min(time_cost, ARGON2_MAX_TIME_COST))
+
+    return settings
+
+
+def init_password_hashing() -> None:
+    """
+    Calibrate and apply the hash cost. Called once at startup; restarts
+    the executor so its workers pick up the settings.
+    """
+    configure_password_hashing(calibrate_password_hashing())
+    shutdown_password_executor()
+    dummy_password_hash()
+
+    if _hash_settings["scheme"] == "bcrypt":
+        logger.info(f"Password hashing: bcrypt, rounds={_hash_settings['bcrypt_rounds']}")
+    else:
+        logger.info(
+            f"Password hashing: argon2id, time_cost={_hash_settings['argon2_time_cost']}, "
+            f"memory_cost={_hash_settings['argon2_memory_cost']}KiB"
+        )
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    """
+    True if the hash uses a deprecated scheme or a lower cost than the
+    current settings. Cheap: parses the hash, does not run the KDF.
+    """
+    try:
+        return pwd_context.needs_update(hashed)
+    except (ValueError, TypeError):
+        return False
+
+def dummy_password_hash() -> str:
+    """
+    Hash of a random password with the current scheme and cost, for
+    verifying against when there is no user: an unknown email then costs
+    the same KDF time as a wrong password. Computed once per settings
+    change (by init_password_hashing, off the event loop).
+    """
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = pwd_context.hash(os.urandom(16).hex())
+    return _dummy_hash
 
 def hash_password(password: str) -> str:
     """
-    Hash a password using bcrypt.
+    Hash a password with the configured scheme and cost.
     
     Args:
         password: Plain text password to hash
@@ -23,16 +186,16 @@ def hash_password(password: str) -> str:
         if not password or len(password) == 0:
             raise ValueError("Password cannot be empty")
         
-        if len(password) > 72:
-            raise ValueError("Password is too long (max 72 characters)")
+        if len(password) > PASSWORD_MAX_LENGTH:
+            raise ValueError(f"Password is too long (max {PASSWORD_MAX_LENGTH} characters)")
             
         hashed = pwd_context.hash(password)
         return hashed
     except ValueError as e:
-        logger.error(f"Password validation error: {str(e)}")
+        logger.error("Password validation error: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error during password hashing: {str(e)}")
+        logger.error("Unexpected error during password hashing: %s", e)
         raise ValueError("Failed to hash password")
 
 def verify_password(password: str, hashed: str) -> bool:
@@ -57,10 +220,10 @@ def verify_password(password: str, hashed: str) -> bool:
         result = pwd_context.verify(password, hashed)
         return result
     except Exception as e:
-        logger.error(f"Error during password verification: {str(e)}")
+        logger.error("Error during password verification: %s", e)
         raise ValueError("Failed to verify password")
 
-def hash_token(token: str) -> str:
+def hash_token(token: str) -> bytes:
     """
     Hash a token using SHA256.
     
@@ -68,7 +231,7 @@ def hash_token(token: str) -> str:
         token: Token to hash
         
     Returns:
-        Hashed token
+        Raw 32-byte digest (stored as refresh_tokens.token_hash)
         
     Raises:
         ValueError: If token hashing fails
@@ -77,11 +240,196 @@ def hash_token(token: str) -> str:
         if not token or len(token) == 0:
             raise ValueError("Token cannot be empty")
             
-        hashed = hashlib.sha256(token.encode()).hexdigest()
+        hashed = hashlib.sha256(token.encode()).digest()
         return hashed
     except ValueError as e:
-        logger.error(f"Token validation error: {str(e)}")
+        logger.error("Token validation error: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Error during token hashing: {str(e)}")
-        raise ValueError("Failed to hash token")
\ No newline at end of file
+        logger.error("Error during token hashing: %s", e)
+        raise ValueError("Failed to hash token")
+
+# Password hashing executor
+#
+# bcrypt is CPU-bound and holds the GIL, so running it inline in a route
+# pins one of Starlette's threadpool slots for the whole hash. Routes await
+# the *_async helpers below instead, which run the work on a dedicated
+# executor with a bounded number of pending jobs.
+#
+# Bulk hashing (user import) gets its own, smaller executor so a large
+# import never occupies the workers that serve logins and signups.
+
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or (os.cpu_count() or 1)
+PASSWORD_HASH_MAX_PENDING = int(
+    os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4))
+)
+
+# Defaults to half the interactive workers, leaving CPU for logins
+PASSWORD_HASH_BULK_WORKERS = int(os.getenv("PASSWORD_HASH_BULK_WORKERS", "0")) or max(
+    1, PASSWORD_HASH_WORKERS // 2
+)
+# Passwords per bulk job: small jobs keep shutdown and cancellation prompt
+PASSWORD_HASH_BULK_BATCH = 16
+
+_executor: Optional[Executor] = None
+_bulk_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+def _create_executor(workers: int, name: str) -> Executor:
+    if PASSWORD_HASH_EXECUTOR == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=configure_password_hashing,
+        initargs=(_hash_settings,),
+    )
+
+
+def get_password_executor() -> Executor:
+    """
+    Return the shared password hashing executor, creating it on first use.
+
+    Returns:
+        Process pool (default) or thread pool sized by PASSWORD_HASH_WORKERS
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = _create_executor(PASSWORD_HASH_WORKERS, "password-hash")
+                logger.info(
+                    f"Password hashing executor started "
+                    f"({PASSWORD_HASH_EXECUTOR}, workers={PASSWORD_HASH_WORKERS}, "
+                    f"max_pending={PASSWORD_HASH_MAX_PENDING})"
+                )
+    return _executor
+
+
+def get_bulk_password_executor() -> Executor:
+    """
+    Return the bulk password hashing executor, creating it on first use.
+
+    Returns:
+        Process pool (default) or thread pool sized by PASSWORD_HASH_BULK_WORKERS
+    """
+    global _bulk_executor
+
+    if _bulk_executor is None:
+        with _executor_lock:
+            if _bulk_executor is None:
+                _bulk_executor = _create_executor(
+                    PASSWORD_HASH_BULK_WORKERS, "password-hash-bulk"
+                )
+                logger.info(
+                    f"Bulk password hashing executor started "
+                    f"({PASSWORD_HASH_EXECUTOR}, workers={PASSWORD_HASH_BULK_WORKERS})"
+                )
+    return _bulk_executor
+
+
+def shutdown_password_executor() -> None:
+    """
+    Stop the password hashing executors. Called on application shutdown.
+    """
+    global _executor, _bulk_executor
+
+    with _executor_lock:
+        for executor in (_executor, _bulk_executor):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+        _bulk_executor = None
+
+
+async def _run_in_password_executor(fn: Callable[..., T], *args) -> T:
+    if not _pending.acquire(blocking=False):
+        logger.warning("Password hashing queue is full, rejecting request")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+    PASSWORD_HASH_IN_FLIGHT.inc()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_password_executor(), fn, *args)
+    finally:
+        PASSWORD_HASH_IN_FLIGHT.dec()
+        _pending.release()
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a password on the password hashing executor.
+
+    Raises:
+        ValueError: If password hashing fails
+        HTTPException: 503 if the executor queue is full
+    """
+    with stage_timer("password_hash"):
+        return await _run_in_password_executor(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    """
+    Verify a password on the password hashing executor.
+
+    Raises:
+        ValueError: If verification fails
+        HTTPException: 503 if the executor queue is full
+    """
+    with stage_timer("password_verify"):
+        return await _run_in_password_executor(verify_password, password, hashed)
+
+
+async def verify_dummy_password_async(password: str) -> None:
+    """
+    Run a password verification that always fails, on the password
+    hashing executor. Keeps login latency uniform for unknown emails.
+
+    Raises:
+        HTTPException: 503 if the executor queue is full
+    """
+    try:
+        await verify_password_async(password, dummy_password_hash())
+    except ValueError:
+        pass
+
+
+def _hash_many(passwords: List[str]) -> List[Optional[str]]:
+    hashes = []
+    for password in passwords:
+        try:
+            hashes.append(hash_password(password))
+        except ValueError:
+            hashes.append(None)
+    return hashes
+
+
+async def hash_passwords_async(passwords: List[str]) -> List[Optional[str]]:
+    """
+    Hash many passwords on the bulk executor, in small jobs.
+    Waits for capacity instead of rejecting with 503, and never takes
+    workers or queue slots from interactive hashing.
+
+    Returns:
+        One hash per password, None where the password was rejected
+    """
+    if not passwords:
+        return []
+
+    loop = asyncio.get_running_loop()
+    executor = get_bulk_password_executor()
+    size = PASSWORD_HASH_BULK_BATCH
+
+    with stage_timer("password_hash_bulk"):
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(executor, _hash_many, passwords[i:i + size])
+            for i in range(0, len(passwords), size)
+        ))
+    return [hashed for part in parts for hashed in part]
@@ -0,0 +1,273 @@
+"""
+Login sessions.
+
+A session is a chain of refresh tokens: rotation writes a new
+RefreshToken row that carries the session_id, device and start time
+forward. Revoking one session revokes its current refresh token.
+
+"Log out everywhere" is a single set-based UPDATE of the user's refresh
+tokens plus a per-user watermark, users.tokens_valid_after: every token
+issued at or before it (by its iat claim) is rejected by decode_token.
+Both sides are compared in milliseconds (iat carries a fractional part),
+so a login right after a revoke-all is not caught by its watermark.
+Watermarks are kept in memory and synced from the DB the same way as
+the revocation index (app.core.revocation), so checking them costs a
+dict lookup and revoking all sessions costs O(1) in the number of
+outstanding access tokens.
+
+DB modules are imported lazily so the token code path (app.core.jwt)
+stays importable without a database configured.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import os
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+SESSION_SYNC_INTERVAL_SECONDS = float(os.getenv("SESSION_SYNC_INTERVAL_SECONDS", "5"))
+# Re-scan window: watermarks are stamped before commit, so one can become
+# visible after a later one (see app.core.revocation)
+SESSION_SYNC_LOOKBACK_SECONDS = float(os.getenv("SESSION_SYNC_LOOKBACK_SECONDS", "60"))
+# Watermarks older than the longest token lifetime no longer reject anything
+WATERMARK_RETENTION_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+DEVICE_MAX_LENGTH = 255
+
+
+def _timestamp_ms(value: datetime) -> int:
+    # naive UTC datetimes throughout the app
+    return (value - datetime(1970, 1, 1)) // timedelta(milliseconds=1)
+
+
+def _iat_ms(iat: Any) -> int:
+    # iat is a NumericDate with millisecond precision (whole seconds for
+    # tokens issued before that)
+    return round(float(iat) * 1000)
+
+
+def issued_before(iat: Any, valid_after: Optional[datetime]) -> bool:
+    """
+    True if a token with this iat claim was issued at or before the
+    watermark valid_after. Tokens without a usable iat count as issued
+    before.
+    """
+    if valid_after is None:
+        return False
+    try:
+        return _iat_ms(iat) <= _timestamp_ms(valid_after)
+    except (TypeError, ValueError):
+        return True
+
+
+class SessionWatermarks:
+    def __init__(self):
+        self.loaded = False
+        # user id (str) -> unix time in ms; tokens with iat <= this are invalid
+        self._by_user: Dict[str, int] = {}
+        self._last_seen: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def is_invalidated(self, user_id: str, iat: Any) -> bool:
+        watermark = self._by_user.get(user_id)
+        if watermark is None:
+            return False
+        try:
+            return _iat_ms(iat) <= watermark
+        except (TypeError, ValueError):
+            # tokens from before iat was stamped
+            return True
+
+    def set(self, user_id, valid_after: datetime) -> None:
+        """
+        Record a revoke-all made by this process.
+        """
+        with self._lock:
+            self._set(str(user_id), _timestamp_ms(valid_after))
+
+    def load(self, db: Session) -> None:
+        from app.models.user import User
+
+        cutoff = datetime.utcnow() - timedelta(days=WATERMARK_RETENTION_DAYS)
+        rows = (
+            db.query(User.id, User.tokens_valid_after)
+            .filter(User.tokens_valid_after > cutoff)
+            .all()
+        )
+
+        by_user = {str(user_id): _timestamp_ms(valid_after) for user_id, valid_after in rows}
+        last_seen = max((valid_after for _, valid_after in rows), default=cutoff)
+
+        with self._lock:
+            for user_id, watermark in self._by_user.items():
+                if watermark > by_user.get(user_id, -1):
+                    by_user[user_id] = watermark
+            self._by_user = by_user
+            self._last_seen = last_seen
+            self.loaded = True
+
+        logger.info(f"Session watermarks loaded for {len(by_user)} users")
+
+    def sync(self, db: Session) -> int:
+        """
+        Pull watermarks written since the last sync.
+
+        Returns:
+            Number of rows seen
+        """
+        from app.models.user import User
+
+        since = self._last_seen - timedelta(seconds=SESSION_SYNC_LOOKBACK_SECONDS)
+        rows = (
+            db.query(User.id, User.tokens_valid_after)
+            .filter(User.tokens_valid_after >= since)
+            .all()
+        )
+
+        with self._lock:
+            for user_id, valid_after in rows:
+                self._set(str(user_id), _timestamp_ms(valid_after))
+                self._last_seen = max(self._last_seen, valid_after)
+
+        return len(rows)
+
+    def _set(self, user_id: str, watermark: int) -> None:
+        if watermark > self._by_user.get(user_id, -1):
+            self._by_user[user_id] = watermark
+
+
+session_watermarks = SessionWatermarks()
+
+
+def load_session_watermarks() -> None:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        session_watermarks.load(db)
+    finally:
+        db.close()
+
+
+def sync_session_watermarks() -> int:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return session_watermarks.sync(db)
+    finally:
+        db.close()
+
+
+async def run_session_sync(interval: Optional[float] = None) -> None:
+    """
+    Keep the watermarks in sync forever. Started from the app lifespan.
+    """
+    interval = interval or SESSION_SYNC_INTERVAL_SECONDS
+
+    while True:
+        try:
+            if session_watermarks.loaded:
+                await asyncio.to_thread(sync_session_watermarks)
+            else:
+                await asyncio.to_thread(load_session_watermarks)
+        except Exception as e:
+            logger.error(f"Session watermark sync failed: {str(e)}")
+
+        await asyncio.sleep(interval)
+
+
+# Session queries (AsyncSession)
+
+async def list_sessions(db, user_id, current_token_hash: Optional[bytes] = None) -> List[dict]:
+    """
+    Active sessions of a user, most recently used first.
+    """
+    from sqlalchemy import select
+    from app.models.refresh_token import RefreshToken
+
+    rows = (await db.execute(
+        select(RefreshToken)
+        .where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.is_revoked == False,
+            RefreshToken.expires_at > datetime.utcnow()
+        )
+        .order_by(RefreshToken.last_used_at.desc().nulls_last())
+    )).scalars().all()
+
+    return [
+        {
+            "id": str(row.session_id),
+            "device": row.device,
+            "ip": row.ip,
+            "created_at": row.created_at,
+            "last_used_at": row.last_used_at,
+            "expires_at": row.expires_at,
+            "current": current_token_hash is not None and row.token_hash == current_token_hash,
+        }
+        for row in rows
+    ]
+
+
+async def revoke_session(db, user_id, session_id: uuid.UUID) -> bool:
+    """
+    Revoke one session of a user. Its access tokens stay valid until
+    they expire.
+
+    Returns:
+        False if the user has no such active session
+    """
+    from sqlalchemy import update
+    from app.models.refresh_token import RefreshToken
+
+    result = await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.session_id == session_id,
+            RefreshToken.is_revoked == False
+        )
+        .values(is_revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def revoke_all_sessions(db, user_id) -> int:
+    """
+    Revoke every session of a user and invalidate all tokens issued so far.
+
+    Returns:
+        Number of refresh tokens revoked
+    """
+    from sqlalchemy import update
+    from app.models.refresh_token import RefreshToken
+    from app.models.user import User
+    from app.core.token_cache import token_cache
+
+    now = datetime.utcnow()
+    # users row first: refresh rotation reads it FOR SHARE, so a rotation
+    # either finishes before this UPDATE (and its new refresh token is
+    # revoked below) or waits and then sees the new watermark
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(tokens_valid_after=now)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.is_revoked == False)
+        .values(is_revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+    session_watermarks.set(user_id, now)
+    token_cache.invalidate_user(user_id)
+    return result.rowcount
@@ -0,0 +1,187 @@
+"""
+Expiry sweeper for revoked_tokens and refresh_tokens.
+
+Both tables only ever grow: every refresh and logout inserts a
+RevokedToken, and rotated or expired RefreshTokens are kept forever.
+The sweeper deletes rows that can no longer affect any decision, in
+bounded batches so it never holds long locks:
+
+- revoked_tokens whose token has expired (expires_at < now); legacy rows
+  without expires_at once revoked_at is older than the longest token
+  lifetime;
+- refresh_tokens that have expired or been revoked.
+
+Run it as one standalone process (cron job or sidecar):
+    python -m app.core.sweeper [--once] [--batch-size N] [--interval S]
+
+or in-app as a lifespan task with TOKEN_SWEEP_ENABLED=true (off by
+default). Either way each sweep holds a PostgreSQL advisory lock, so when
+several workers or sweepers run at once only one of them sweeps and the
+others skip that round instead of deleting the same rows concurrently.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+from typing import Dict, Optional
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from app.database import SessionLocal, engine
+from app.models.refresh_token import RefreshToken
+from app.models.token import RevokedToken
+from app.core.metrics import TOKEN_SWEEP_PURGED, TOKEN_SWEEP_RUNS
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SWEEP_ENABLED = os.getenv("TOKEN_SWEEP_ENABLED", "false").lower() == "true"
+TOKEN_SWEEP_INTERVAL_SECONDS = int(os.getenv("TOKEN_SWEEP_INTERVAL_SECONDS", "300"))
+TOKEN_SWEEP_BATCH_SIZE = int(os.getenv("TOKEN_SWEEP_BATCH_SIZE", "1000"))
+# Upper bound on any token lifetime, for revoked_tokens rows without expires_at
+LEGACY_RETENTION_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# pg_try_advisory_lock key ("toksweep")
+SWEEP_LOCK_KEY = 0x746F6B7377656570
+
+# Process-local summary; the Prometheus counters are in app.core.metrics
+sweep_stats = {
+    "runs": 0,
+    "revoked_tokens_purged": 0,
+    "refresh_tokens_purged": 0,
+    "last_run_at": None,
+    "last_duration_seconds": 0.0,
+}
+
+
+def _delete_in_batches(db: Session, model, condition, batch_size: int) -> int:
+    """
+    Delete matching rows batch_size at a time, committing after each batch.
+    """
+    total = 0
+
+    while True:
+        ids = select(model.id).where(condition).limit(batch_size).scalar_subquery()
+        result = db.execute(
+            delete(model)
+            .where(model.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+
+def sweep_once(batch_size: Optional[int] = None) -> Optional[Dict[str, int]]:
+    """
+    Run one sweep over both tables, unless another process is sweeping.
+
+    Returns:
+        Number of rows purged per table, or None if the sweep was skipped
+    """
+    batch_size = batch_size or TOKEN_SWEEP_BATCH_SIZE
+    if engine.dialect.name != "postgresql":
+        return _sweep(batch_size)
+
+    # session-level lock on a connection of its own: the sweep commits
+    # every batch, which would release a transaction-level lock
+    with engine.connect() as lock_conn:
+        acquired = lock_conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": SWEEP_LOCK_KEY}
+        ).scalar()
+        # don't sit idle in a transaction while sweeping
+        lock_conn.commit()
+        if not acquired:
+            logger.info("Token sweep skipped: another process is sweeping")
+            return None
+        try:
+            return _sweep(batch_size)
+        finally:
+            lock_conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": SWEEP_LOCK_KEY}
+            )
+            lock_conn.commit()
+
+
+def _sweep(batch_size: int) -> Dict[str, int]:
+    started = time.perf_counter()
+    now = datetime.utcnow()
+
+    db = SessionLocal()
+    try:
+        revoked = _delete_in_batches(
+            db,
+            RevokedToken,
+            (RevokedToken.expires_at < now)
+            | (
+                RevokedToken.expires_at.is_(None)
+                & (RevokedToken.revoked_at < now - timedelta(days=LEGACY_RETENTION_DAYS))
+            ),
+            batch_size,
+        )
+        TOKEN_SWEEP_PURGED.labels("revoked_tokens").inc(revoked)
+        refresh = _delete_in_batches(
+            db, RefreshToken, RefreshToken.expires_at < now, batch_size
+        )
+        TOKEN_SWEEP_PURGED.labels("refresh_tokens").inc(refresh)
+        revoked_refresh = _delete_in_batches(
+            db, RefreshToken, RefreshToken.is_revoked == True, batch_size  # noqa: E712
+        )
+        TOKEN_SWEEP_PURGED.labels("refresh_tokens").inc(revoked_refresh)
+        refresh += revoked_refresh
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    duration = time.perf_counter() - started
+    TOKEN_SWEEP_RUNS.inc()
+    sweep_stats["runs"] += 1
+    sweep_stats["revoked_tokens_purged"] += revoked
+    sweep_stats["refresh_tokens_purged"] += refresh
+    sweep_stats["last_run_at"] = now.isoformat()
+    sweep_stats["last_duration_seconds"] = duration
+
+    logger.info(
+        f"Token sweep purged {revoked} revoked_tokens and "
+        f"{refresh} refresh_tokens in {duration:.2f}s"
+    )
+    return {"revoked_tokens": revoked, "refresh_tokens": refresh}
+
+
+async def run_sweeper(interval: Optional[int] = None) -> None:
+    """
+    Sweep forever. Started as a background task from the app lifespan.
+    """
+    interval = interval or TOKEN_SWEEP_INTERVAL_SECONDS
+
+    while True:
+        try:
+            await asyncio.to_thread(sweep_once)
+        except Exception as e:
+            logger.error(f"Token sweep failed: {str(e)}")
+
+        await asyncio.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Purge expired and revoked tokens")
+    parser.add_argument("--once", action="store_true", help="run a single sweep and exit")
+    parser.add_argument("--batch-size", type=int, default=TOKEN_SWEEP_BATCH_SIZE)
+    parser.add_argument("--interval", type=int, default=TOKEN_SWEEP_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    while True:
+        sweep_once(args.batch_size)
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+import hmac
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# 0 disables the cache
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+# Upper bound on how long another worker's role/status change goes unseen
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "60"))
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """
+    Compact, immutable view of the authenticated user.
+    Returned by get_current_user instead of the ORM object so it can be
+    cached across requests.
+    """
+    id: uuid.UUID
+    email: str
+    is_active: bool
+    roles: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class _Entry:
+    token: str
+    claims: Dict[str, Any]
+    user: UserSnapshot
+    expires_at: float
+
+
+class TokenCache:
+    """
+    Thread-safe LRU + TTL cache of verified access tokens, keyed on jti.
+
+    An entry only matches when the presented token is byte-identical to the
+    one that was verified, so a hit never skips a signature check for a
+    different token. Entries expire after TOKEN_CACHE_TTL_SECONDS or at the
+    token's own exp, whichever comes first.
+
+    Invalidation is per process. Logouts and "log out everywhere" stop a
+    cached token everywhere once the revocation index and session
+    watermarks have synced, since app.deps._cached_user checks both
+    before every hit. invalidate_user() after a role change, deactivation
+    or deletion only clears this worker's entries: other workers keep
+    serving their cached snapshot for up to TOKEN_CACHE_TTL_SECONDS.
+    Lower it to tighten that window, or set TOKEN_CACHE_MAX_ENTRIES=0.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, jti: str, token: str) -> Optional[_Entry]:
+        if self.max_entries <= 0:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry is None:
+                return None
+
+            if entry.expires_at <= time.time():
+                self._remove(jti)
+                return None
+
+            if not hmac.compare_digest(entry.token, token):
+                return None
+
+            self._entries.move_to_end(jti)
+            return entry
+
+    def put(self, jti: str, token: str, claims: Dict[str, Any], user: UserSnapshot) -> None:
+        if self.max_entries <= 0:
+            return
+
+        expires_at = time.time() + self.ttl_seconds
+        exp = claims.get("exp")
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+
+        with self._lock:
+            if jti in self._entries:
+                self._remove(jti)
+
+            self._entries[jti] = _Entry(token, claims, user, expires_at)
+            self._by_user.setdefault(str(user.id), set()).add(jti)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_user(self, user_id) -> None:
+        """
+        Drop every cached token belonging to a user.
+        Call after changing a user's roles, status or deleting them.
+        """
+        with self._lock:
+            for jti in list(self._by_user.get(str(user_id), ())):
+                self._remove(jti)
+
+        logger.debug(f"Token cache invalidated for user {user_id}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, jti: str) -> None:
+        entry = self._entries.pop(jti, None)
+        if entry is None:
+            return
+
+        user_id = str(entry.user.id)
+        jtis = self._by_user.get(user_id)
+        if jtis is not None:
+            jtis.discard(jti)
+            if not jtis:
+                del self._by_user[user_id]
+
+
+token_cache = TokenCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS)
@@ -0,0 +1,279 @@
+"""
+Bulk user provisioning from a CSV or NDJSON feed.
+
+Rows are processed in chunks of USER_IMPORT_CHUNK_SIZE: passwords are
+hashed in parallel on the bulk password hashing executor (separate from
+the one serving logins), then the chunk is
+written with one INSERT ... ON CONFLICT (email) DO NOTHING RETURNING and
+one INSERT of default role links, in a single transaction. The default
+role is resolved once per import.
+
+Input:
+- CSV: header line with at least "email" and "password" (optional
+  "is_active"); one user per line, no embedded newlines.
+- NDJSON: one {"email", "password", "is_active"?} object per line.
+
+Every data line gets one result, in input order:
+    {"line": 3, "email": "...", "status": "created", "id": "..."}
+status is created | exists | duplicate | invalid | error.
+
+Used by POST /admin/users/import, or standalone:
+    python -m app.core.user_import users.csv [--format csv] [--chunk-size N] > report.ndjson
+"""
+from datetime import datetime
+from pydantic import ValidationError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import os
+import sys
+import uuid
+
+from app.database import AsyncSessionLocal, async_engine
+from app.models.user import User
+from app.models.user_role import UserRole
+from app.schemas.auth import SignupSchema
+from app.core.security import (
+    PASSWORD_MAX_LENGTH,
+    hash_passwords_async,
+    shutdown_password_executor,
+)
+from app.core.role_catalog import role_catalog
+from app.core.negative_cache import forget_unknown_email
+
+logger = logging.getLogger(__name__)
+
+USER_IMPORT_CHUNK_SIZE = int(os.getenv("USER_IMPORT_CHUNK_SIZE", "500"))
+DEFAULT_ROLE = "user"
+IMPORT_FORMATS = ("csv", "ndjson")
+
+_TRUE = {"1", "true", "yes", "y"}
+
+
+class _RowReader:
+    """
+    Turns input lines into (line number, raw row or None if unparseable).
+    """
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.header: Optional[List[str]] = None
+        self.line_no = 0
+
+    def read(self, line: str) -> Optional[Tuple[int, Optional[dict]]]:
+        self.line_no += 1
+        line = line.strip()
+        if not line:
+            return None
+
+        if self.fmt == "csv":
+            values = next(csv.reader([line]))
+            if self.header is None:
+                self.header = [name.strip().lower() for name in values]
+                return None
+            if len(values) != len(self.header):
+                return self.line_no, None
+            return self.line_no, dict(zip(self.header, values))
+
+        try:
+            row = json.loads(line)
+        except ValueError:
+            return self.line_no, None
+        return self.line_no, row if isinstance(row, dict) else None
+
+
+def _validate(row: Optional[dict]) -> Optional[Tuple[str, str, bool]]:
+    if row is None:
+        return None
+    try:
+        data = SignupSchema(email=row.get("email"), password=row.get("password"))
+    except ValidationError:
+        return None
+    # rejected here rather than by the hasher, so a later row for the
+    # same email is not reported as a duplicate
+    if not data.password or len(data.password) > PASSWORD_MAX_LENGTH:
+        return None
+
+    is_active = row.get("is_active", True)
+    if isinstance(is_active, str):
+        is_active = is_active.strip().lower() in _TRUE if is_active.strip() else True
+    return data.email, data.password, bool(is_active)
+
+
+async def _import_chunk(
+    db,
+    rows: List[Tuple[int, Optional[dict]]],
+    role_id: Optional[int],
+    seen: Set[str],
+) -> List[dict]:
+    results: Dict[int, dict] = {}
+    pending = []
+
+    for line_no, row in rows:
+        valid = _validate(row)
+        email = valid[0] if valid else (row or {}).get("email")
+        if not valid:
+            results[line_no] = {"line": line_no, "email": email, "status": "invalid"}
+        elif email in seen:
+            results[line_no] = {"line": line_no, "email": email, "status": "duplicate"}
+        else:
+            seen.add(email)
+            pending.append((line_no, *valid))
+
+    hashes = await hash_passwords_async([password for _, _, password, _ in pending])
+
+    now = datetime.utcnow()
+    values = []
+    for (line_no, email, _, is_active), hashed in zip(pending, hashes):
+        if hashed is None:
+            results[line_no] = {"line": line_no, "email": email, "status": "invalid"}
+            # a later row may still create this user
+            seen.discard(email)
+            continue
+        values.append({
+            "id": uuid.uuid4(),
+            "email": email,
+            "hashed_password": hashed,
+            "is_active": is_active,
+            "created_at": now,
+            "role_version": 0,
+        })
+
+    created: Dict[str, uuid.UUID] = {}
+    if values:
+        try:
+            created = dict((await db.execute(
+                insert(User)
+                .values(values)
+                .on_conflict_do_nothing(index_elements=["email"])
+                .returning(User.email, User.id)
+            )).all())
+
+            if created and role_id is not None:
+                await db.execute(
+                    insert(UserRole)
+                    .values([{"user_id": user_id, "role_id": role_id} for user_id in created.values()])
+                    .on_conflict_do_nothing()
+                )
+            await db.commit()
+            for email in created:
+                await forget_unknown_email(email)
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error("User import chunk failed: %s", e)
+            for line_no, email, _, _ in pending:
+                results.setdefault(line_no, {"line": line_no, "email": email, "status": "error"})
+            return [results[line_no] for line_no, _ in rows]
+
+    for line_no, email, _, _ in pending:
+        if line_no in results:
+            continue
+        if email in created:
+            results[line_no] = {
+                "line": line_no, "email": email, "status": "created", "id": str(created[email])
+            }
+        else:
+            results[line_no] = {"line": line_no, "email": email, "status": "exists"}
+
+    return [results[line_no] for line_no, _ in rows]
+
+
+async def import_users(
+    lines: AsyncIterable[str],
+    fmt: str,
+    chunk_size: int = USER_IMPORT_CHUNK_SIZE,
+) -> AsyncIterator[dict]:
+    """
+    Import users from text lines, yielding one result per data line.
+
+    Raises:
+        ValueError: If fmt is not csv or ndjson
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    reader = _RowReader(fmt)
+    seen: Set[str] = set()
+    chunk = []
+
+    async with AsyncSessionLocal() as db:
+        role_id = await role_catalog.get_id(db, DEFAULT_ROLE)
+        if role_id is None:
+            logger.warning(f"Default role '{DEFAULT_ROLE}' not found, importing without roles")
+
+        async for line in lines:
+            parsed = reader.read(line)
+            if parsed is None:
+                continue
+            chunk.append(parsed)
+
+            if len(chunk) >= chunk_size:
+                for result in await _import_chunk(db, chunk, role_id, seen):
+                    yield result
+                chunk = []
+
+        if chunk:
+            for result in await _import_chunk(db, chunk, role_id, seen):
+                yield result
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Split a stream of UTF-8 byte chunks (e.g. a request body) into lines.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def _file_lines(f: Iterable[str]) -> AsyncIterator[str]:
+    for line in f:
+        yield line
+
+
+async def _run_cli(path: str, fmt: str, chunk_size: int) -> Dict[str, int]:
+    summary: Dict[str, int] = {}
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+    try:
+        async for result in import_users(_file_lines(f), fmt, chunk_size):
+            summary[result["status"]] = summary.get(result["status"], 0) + 1
+            sys.stdout.write(json.dumps(result) + "\n")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+        await async_engine.dispose()
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import users from CSV or NDJSON")
+    parser.add_argument("path", help="input file, or - for stdin")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=USER_IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    try:
+        summary = asyncio.run(_run_cli(args.path, fmt, args.chunk_size))
+    finally:
+        shutdown_password_executor()
+    logger.info(f"User import finished: {summary}")
+
+
+if __name__ == "__main__":
+    main()
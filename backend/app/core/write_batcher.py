@@ -0,0 +1,224 @@
+"""
+Write-behind group commit for the token tables.
+
+Every login inserts a refresh token and every logout blacklists jtis and
+revokes a refresh token, each in its own small transaction; at peak the
+cost is dominated by one WAL flush per commit. With WRITE_BATCH_ENABLED
+these writes are queued instead and a single flusher task commits
+everything that arrived within WRITE_BATCH_MAX_DELAY_MS (or
+WRITE_BATCH_MAX_SIZE writes) as one transaction:
+
+- one multi-row INSERT into refresh_tokens,
+- one multi-row INSERT ... ON CONFLICT (jti) DO NOTHING into revoked_tokens,
+- one UPDATE refresh_tokens ... WHERE token_hash IN (...).
+
+Each caller awaits its own future, which resolves only after the batch
+has committed, so a 200 still means the write is durable. If a batch
+fails, its writes are retried one transaction each so a single bad row
+(e.g. a user deleted mid-login) only fails its own request.
+
+Refresh rotation is not batched: it needs its row lock and RETURNING in
+the request's own transaction.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from typing import Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import os
+
+from app.database import AsyncSessionLocal
+from app.models.refresh_token import RefreshToken
+from app.models.token import RevokedToken
+from app.core.metrics import WRITE_BATCH_SIZE, stage_timer
+
+logger = logging.getLogger(__name__)
+
+WRITE_BATCH_ENABLED = os.getenv("WRITE_BATCH_ENABLED", "false").lower() == "true"
+WRITE_BATCH_MAX_DELAY_MS = float(os.getenv("WRITE_BATCH_MAX_DELAY_MS", "5"))
+WRITE_BATCH_MAX_SIZE = int(os.getenv("WRITE_BATCH_MAX_SIZE", "500"))
+
+
+class WriteBatcherStopped(RuntimeError):
+    """
+    The batcher no longer accepts writes (stop() has begun). Callers fall
+    back to writing in their own transaction.
+    """
+
+
+@dataclass
+class _Write:
+    refresh_tokens: List[dict] = field(default_factory=list)
+    revoked_jtis: List[Tuple[str, Optional[datetime]]] = field(default_factory=list)
+    revoked_hashes: List[bytes] = field(default_factory=list)
+    future: Optional[asyncio.Future] = None
+
+
+class WriteBatcher:
+    def __init__(self, max_delay_ms: float, max_size: int):
+        self.max_delay = max_delay_ms / 1000
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether new writes are accepted (False once stop() has begun).
+        """
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    def start(self) -> None:
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Write batching enabled (max delay {self.max_delay * 1000:g}ms, "
+            f"max size {self.max_size})"
+        )
+
+    async def stop(self) -> None:
+        """
+        Flush everything queued so far, then stop the flusher.
+        Writes submitted after this is called raise WriteBatcherStopped.
+        """
+        if not self.running:
+            return
+        self._stopping = True
+        await self._queue.put(None)
+        try:
+            await self._task
+        finally:
+            self._task = None
+            await self._drain()
+
+    async def _drain(self) -> None:
+        # anything the flusher left behind, e.g. queued behind the sentinel
+        pending = []
+        while not self._queue.empty():
+            write = self._queue.get_nowait()
+            if write is not None:
+                pending.append(write)
+        for i in range(0, len(pending), self.max_size):
+            await self._flush(pending[i:i + self.max_size])
+
+    async def insert_refresh_token(self, values: dict) -> None:
+        """
+        Insert one refresh_tokens row; returns once it is committed.
+
+        Raises:
+            SQLAlchemyError: If the write fails
+            WriteBatcherStopped: If the batcher is stopping or stopped
+        """
+        await self._submit(_Write(refresh_tokens=[values]))
+
+    async def revoke(
+        self,
+        jtis: Iterable[Tuple[str, Optional[datetime]]] = (),
+        refresh_token_hash: Optional[bytes] = None,
+    ) -> None:
+        """
+        Blacklist jtis and revoke a refresh token; returns once committed.
+
+        Raises:
+            SQLAlchemyError: If the write fails
+            WriteBatcherStopped: If the batcher is stopping or stopped
+        """
+        await self._submit(_Write(
+            revoked_jtis=list(jtis),
+            revoked_hashes=[refresh_token_hash] if refresh_token_hash else [],
+        ))
+
+    async def _submit(self, write: _Write) -> None:
+        if not self.running:
+            raise WriteBatcherStopped("Write batcher is not running")
+        write.future = asyncio.get_running_loop().create_future()
+        await self._queue.put(write)
+        await write.future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                return
+
+            # let concurrent requests join this commit
+            await asyncio.sleep(self.max_delay)
+            batch = [first]
+            while len(batch) < self.max_size and not self._queue.empty():
+                write = self._queue.get_nowait()
+                if write is None:
+                    stopping = True
+                    break
+                batch.append(write)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[_Write]) -> None:
+        WRITE_BATCH_SIZE.observe(len(batch))
+        try:
+            with stage_timer("db_write_batch_commit"):
+                await self._commit(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                _resolve(batch[0], e)
+                return
+            logger.warning("Write batch of %d failed, retrying one by one: %s", len(batch), e)
+            for write in batch:
+                try:
+                    await self._commit([write])
+                except Exception as e:
+                    _resolve(write, e)
+                else:
+                    _resolve(write)
+            return
+
+        for write in batch:
+            _resolve(write)
+
+    async def _commit(self, batch: List[_Write]) -> None:
+        refresh_tokens = [values for write in batch for values in write.refresh_tokens]
+        revoked_jtis = dict(jti for write in batch for jti in write.revoked_jtis)
+        revoked_hashes = [h for write in batch for h in write.revoked_hashes]
+        now = datetime.utcnow()
+
+        async with AsyncSessionLocal() as db:
+            if refresh_tokens:
+                await db.execute(insert(RefreshToken).values(refresh_tokens))
+            if revoked_jtis:
+                await db.execute(
+                    insert(RevokedToken)
+                    .values([
+                        {"jti": jti, "expires_at": expires_at, "revoked_at": now}
+                        for jti, expires_at in revoked_jtis.items()
+                    ])
+                    .on_conflict_do_nothing(index_elements=["jti"])
+                )
+            if revoked_hashes:
+                await db.execute(
+                    update(RefreshToken)
+                    .where(
+                        RefreshToken.token_hash.in_(revoked_hashes),
+                        RefreshToken.is_revoked == False
+                    )
+                    .values(is_revoked=True)
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+
+
+def _resolve(write: _Write, error: Optional[Exception] = None) -> None:
+    # the request may have been cancelled (client went away) meanwhile
+    if write.future.done():
+        return
+    if error is None:
+        write.future.set_result(None)
+    else:
+        write.future.set_exception(error)
+
+
+write_batcher = WriteBatcher(WRITE_BATCH_MAX_DELAY_MS, WRITE_BATCH_MAX_SIZE)
@@ -1,9 +1,22 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
+from fastapi import HTTPException
+from typing import Dict
+import asyncio
 import os
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -15,20 +28,213 @@ if not DATABASE_URL:
     logger.error("DATABASE_URL environment variable is not set")
     raise ValueError("DATABASE_URL environment variable is required")
 
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+# Pre-ping costs a round-trip per checkout; recycle alone is often enough
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Connections opened per engine at startup (see warm_up_pool)
+DB_POOL_WARMUP_CONNECTIONS = int(os.getenv("DB_POOL_WARMUP_CONNECTIONS", str(DB_POOL_SIZE)))
+
+# Optional read replica for pure lookups
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+
+class PoolStats:
+    """
+    Time spent waiting for a pooled connection, per engine.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts: Dict[str, int] = {}
+        self.wait_seconds_total: Dict[str, float] = {}
+        self.wait_seconds_max: Dict[str, float] = {}
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.checkouts[name] = self.checkouts.get(name, 0) + 1
+            self.wait_seconds_total[name] = self.wait_seconds_total.get(name, 0.0) + seconds
+            self.wait_seconds_max[name] = max(self.wait_seconds_max.get(name, 0.0), seconds)
+
+
+pool_stats = PoolStats()
+
+
+def _timed_pool_class(base, name: str):
+    """
+    Pool subclass that records how long each checkout waited.
+    A subclass (rather than an instance attribute) survives pool.recreate().
+    """
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return base._do_get(self)
+        finally:
+            pool_stats.observe(name, time.perf_counter() - started)
+
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+def _pool_options(url: str, pool_class, name: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+
+    return {
+        "poolclass": _timed_pool_class(pool_class, name),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
 try:
     engine = create_engine(
         DATABASE_URL,
-        pool_pre_ping=True,  # Test connections before using them
-        pool_recycle=3600,   # Recycle connections after 1 hour
-        echo=False
+        echo=False,
+        **_pool_options(DATABASE_URL, QueuePool, "primary")
     )
     logger.info("Database engine created successfully")
 except Exception as e:
-    logger.error(f"Failed to create database engine: {str(e)}")
+    logger.error("Failed to create database engine: %s", e)
     raise
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_database_url(url: str) -> str:
+    """
+    Derive the async driver URL from DATABASE_URL
+    (postgresql / postgresql+psycopg2 -> postgresql+asyncpg).
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_database_url(DATABASE_URL)
+ASYNC_DATABASE_READ_URL = os.getenv("ASYNC_DATABASE_READ_URL") or (
+    _async_database_url(DATABASE_READ_URL) if DATABASE_READ_URL else None
+)
+
+try:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=False,
+        **_pool_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, "primary_async")
+    )
+
+    if ASYNC_DATABASE_READ_URL:
+        async_read_engine = create_async_engine(
+            ASYNC_DATABASE_READ_URL,
+            echo=False,
+            **_pool_options(ASYNC_DATABASE_READ_URL, AsyncAdaptedQueuePool, "replica_async")
+        )
+        logger.info("Read replica engine created successfully")
+    else:
+        async_read_engine = async_engine
+
+    logger.info("Async database engine created successfully")
+except Exception as e:
+    logger.error("Failed to create async database engine: %s", e)
+    raise
+
+# expire_on_commit=False: AsyncSession cannot lazy-refresh attributes after commit
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
+def pool_status() -> Dict[str, dict]:
+    """
+    Current pool occupancy for each engine.
+    """
+    engines = {"primary": engine, "primary_async": async_engine.sync_engine}
+    if async_read_engine is not async_engine:
+        engines["replica_async"] = async_read_engine.sync_engine
+
+    status = {}
+    for name, eng in engines.items():
+        pool = eng.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        status[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checked_in": pool.checkedin(),
+        }
+    return status
+
+
+async def warm_up_pool(async_eng: AsyncEngine, connections: int = DB_POOL_WARMUP_CONNECTIONS) -> int:
+    """
+    Open `connections` connections concurrently and return them to the pool,
+    so the first requests don't pay connection setup.
+
+    Returns:
+        Number of connections opened
+
+    Raises:
+        Exception: The first connection error, after closing the rest
+    """
+    async def _open():
+        conn = await async_eng.connect()
+        try:
+            await conn.execute(text("SELECT 1"))
+        except Exception:
+            await conn.close()
+            raise
+        return conn
+
+    results = await asyncio.gather(
+        *(_open() for _ in range(max(connections, 1))),
+        return_exceptions=True
+    )
+    opened = [r for r in results if not isinstance(r, BaseException)]
+    for conn in opened:
+        await conn.close()
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        raise errors[0]
+    return len(opened)
+
+
+async def ping_database(async_eng: AsyncEngine, timeout: float) -> bool:
+    """
+    Run SELECT 1 with a deadline. Used by the readiness probe.
+    """
+    async def _ping():
+        async with async_eng.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(_ping(), timeout)
+        return True
+    except Exception as e:
+        logger.warning("Database ping failed: %s", e)
+        return False
+
 Base = declarative_base()
 
 def get_db():
@@ -44,14 +250,63 @@ def get_db():
     db = SessionLocal()
     try:
         yield db
+    except HTTPException:
+        # the route's own response (401, 404, ...), not a session problem
+        db.rollback()
+        raise
     except SQLAlchemyError as e:
-        logger.error(f"Database error: {str(e)}")
+        logger.error("Database error: %s", e)
         db.rollback()
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in database session: {str(e)}")
+        logger.error("Unexpected error in database session: %s", e)
         db.rollback()
         raise
     finally:
         db.close()
-        logger.debug("Database session closed")  
\ No newline at end of file
+        logger.debug("Database session closed")
+
+
+async def get_async_db():
+    """
+    Get async database session. Used by the API routes;
+    get_db remains for CLI tools and background jobs.
+
+    Yields:
+        SQLAlchemy AsyncSession
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except HTTPException:
+            await db.rollback()
+            raise
+        except SQLAlchemyError as e:
+            logger.error("Database error: %s", e)
+            await db.rollback()
+            raise
+        except Exception as e:
+            logger.error("Unexpected error in database session: %s", e)
+            await db.rollback()
+            raise
+
+
+async def get_read_db():
+    """
+    Get async session for read-only lookups. Bound to the read replica
+    when DATABASE_READ_URL is set, otherwise to the primary.
+    Never use it for writes or for reads that must see them immediately.
+
+    Yields:
+        SQLAlchemy AsyncSession
+    """
+    async with AsyncReadSessionLocal() as db:
+        try:
+            yield db
+        except HTTPException:
+            await db.rollback()
+            raise
+        except Exception as e:
+            logger.error("Error in read database session: %s", e)
+            await db.rollback()
+            raise
@@ -1,22 +1,85 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Any, Dict, Optional
+import hmac
 import os
-from jose import JWTError, jwt
-from app.database import get_db
-from app.core.jwt import decode_access_token
+import uuid
+from app.database import get_async_db, get_read_db
+from app.core.jwt import TokenCodec, TokenError, decode_token
+from app.core.token_cache import UserSnapshot, token_cache
+from app.core.role_versions import role_versions
+from app.core.revocation import revocation_index
+from app.core.sessions import session_watermarks
+from app.core.metrics import stage_timer
+from app.core.rate_limit import (
+    RATE_LIMIT_LOGIN_PER_EMAIL,
+    RATE_LIMIT_LOGIN_PER_IP,
+    RATE_LIMIT_SIGNUP_PER_IP,
+    client_ip,
+    enforce_rate_limits,
+)
+from app.schemas.auth import LoginSchema
+from app.models.role import Role
 from app.models.user import User
+from app.models.user_role import UserRole
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(
+# When true, require_role re-checks roles against the DB on every request
+ROLE_CHECK_STRICT = os.getenv("ROLE_CHECK_STRICT", "false").lower() == "true"
+# Admin routes check the DB by default: role versions are only known to the
+# process that changed them, so a claims-only check would keep honouring a
+# revoked admin claim on other workers until the token expires
+ADMIN_ROLE_CHECK_STRICT = os.getenv("ADMIN_ROLE_CHECK_STRICT", "true").lower() == "true"
+
+# Shared key for gateways calling /auth/introspect
+INTROSPECT_API_KEY = os.getenv("INTROSPECT_API_KEY")
+
+def _cached_user(token: str):
+    """
+    Return the cached snapshot for an already-verified token, if any.
+    """
+    try:
+        claims = TokenCodec.unverified_claims(token)
+    except TokenError:
+        return None
+
+    jti = claims.get("jti")
+    if not jti or revocation_index.is_revoked(jti):
+        return None
+    if session_watermarks.is_invalidated(claims.get("sub"), claims.get("iat")):
+        return None
+
+    return token_cache.get(jti, token)
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_read_db)
+) -> UserSnapshot:
 
-    user_id = decode_access_token(token)
+    cached = _cached_user(token)
+    if cached:
+        return cached.user
 
-    user = db.query(User).filter(User.id == user_id).first()
+    claims = decode_token(token)
+
+    try:
+        user_id = uuid.UUID(claims["sub"])
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token payload"
+        )
+
+    with stage_timer("db_current_user"):
+        user = (await db.execute(
+            select(User)
+            .options(selectinload(User.roles).selectinload(UserRole.role))
+            .where(User.id == user_id)
+        )).scalar_one_or_none()
 
     if not user:
         raise HTTPException(
@@ -30,45 +93,129 @@ def get_current_user(
             detail="Inactive user"
         )
 
-    return user
-def get_token_payload(
-    token: str = Depends(oauth2_scheme),
-):
+    snapshot = UserSnapshot(
+        id=user.id,
+        email=user.email,
+        is_active=user.is_active,
+        roles=tuple(ur.role.name for ur in user.roles),
+    )
+    token_cache.put(claims["jti"], token, claims, snapshot)
+
+    return snapshot
+
+def require_role(role: str, strict: Optional[bool] = None):
     """
-    Decode JWT and return full payload.
-    Used in logout to get jti.
+    Build a dependency that requires the caller to hold a role.
+
+    By default the decision is made from the token's "roles" claim only:
+    no DB query. Tokens whose role version is older than one this process
+    has recorded are rejected as stale. In strict mode (strict=True or
+    ROLE_CHECK_STRICT=true) the user's current roles are read from the
+    primary DB on every call, bypassing the token cache, so demotions and
+    deletions made by any process apply immediately.
+
+    Returns the verified token claims.
     """
-    SECRET_KEY = os.getenv("SECRET_KEY")
-    ALGORITHM = os.getenv("ALGORITHM")
+    if strict is None:
+        strict = ROLE_CHECK_STRICT
 
-    if not SECRET_KEY or not ALGORITHM:
-        raise HTTPException(
-            status_code=500,
-            detail="JWT configuration error",
+    def forbidden():
+        return HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"{role.capitalize()} access required"
         )
 
-    try:
-        payload = jwt.decode(
-            token,
-            SECRET_KEY,
-            algorithms=[ALGORITHM],
-        )
-        return payload
+    if strict:
+        async def strict_checker(
+            token: str = Depends(oauth2_scheme),
+            db: AsyncSession = Depends(get_async_db),
+        ) -> Dict[str, Any]:
+            cached = _cached_user(token)
+            claims = cached.claims if cached else decode_token(token)
+
+            try:
+                user_id = uuid.UUID(claims["sub"])
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid token payload"
+                )
+
+            with stage_timer("db_role_check"):
+                held = (await db.execute(
+                    select(Role.id)
+                    .join(UserRole, UserRole.role_id == Role.id)
+                    .join(User, User.id == UserRole.user_id)
+                    .where(
+                        User.id == user_id,
+                        User.is_active == True,
+                        Role.name == role
+                    )
+                )).first()
+            if not held:
+                raise forbidden()
+
+            return claims
+
+        return strict_checker
+
+    async def claims_checker(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+        cached = _cached_user(token)
+        claims = cached.claims if cached else decode_token(token)
+
+        if "roles" not in claims:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has no role claims"
+            )
+
+        if role_versions.is_stale(claims["sub"], claims.get("rv")):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Role claims are stale"
+            )
+
+        if role not in claims["roles"]:
+            raise forbidden()
+
+        return claims
+
+    return claims_checker
+
+admin_required = require_role("admin", strict=ROLE_CHECK_STRICT or ADMIN_ROLE_CHECK_STRICT)
 
-    except JWTError:
+def introspection_client(x_introspect_key: Optional[str] = Header(None)):
+    """
+    Authenticate a gateway by its X-Introspect-Key header.
+    """
+    if not INTROSPECT_API_KEY:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Introspection is not configured"
         )
-def admin_required(current_user: User = Depends(get_current_user)):
-    is_admin = any(
-        ur.role.name == "admin" for ur in current_user.roles
-    )
 
-    if not is_admin:
+    if not x_introspect_key or not hmac.compare_digest(
+        x_introspect_key.encode(), INTROSPECT_API_KEY.encode()
+    ):
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin access required"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid introspection key"
         )
 
-    return current_user
\ No newline at end of file
+async def login_rate_limit(request: Request, data: LoginSchema):
+    """
+    Throttle login per client IP and per email. Runs before the route
+    body, i.e. before the user lookup and the bcrypt verify.
+    """
+    await enforce_rate_limits([
+        (f"login:ip:{client_ip(request)}", RATE_LIMIT_LOGIN_PER_IP),
+        (f"login:email:{data.email.lower()}", RATE_LIMIT_LOGIN_PER_EMAIL),
+    ])
+
+async def signup_rate_limit(request: Request):
+    """
+    Throttle signup per client IP, before the email check and the bcrypt hash.
+    """
+    await enforce_rate_limits([
+        (f"signup:ip:{client_ip(request)}", RATE_LIMIT_SIGNUP_PER_IP),
+    ])
@@ -1,37 +1,119 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.database import Base, engine
+from fastapi.responses import ORJSONResponse
+import asyncio
+from app.database import Base, engine, async_engine, async_read_engine, warm_up_pool
+from app.core.security import init_password_hashing, shutdown_password_executor
+from app.migrations import run_migrations
+from app.core.sweeper import TOKEN_SWEEP_ENABLED, run_sweeper
+from app.core.revocation import load_revocation_index, run_revocation_sync
+from app.core.sessions import load_session_watermarks, run_session_sync
+from app.core.role_catalog import load_role_catalog
+from app.core.write_batcher import WRITE_BATCH_ENABLED, write_batcher
 from app.routes import auth, admin
 import app.models
-from app.routes import protected
+from app.routes import protected, well_known, health, metrics, sessions
+from app.core.logging_config import setup_logging, shutdown_logging
+from app.core.metrics import (
+    PROMETHEUS_MULTIPROC_DIR,
+    MetricsMiddleware,
+    register_pool_collector,
+    run_pool_metrics,
+)
+from app.schemas.auth import MessageResponse
+from app.schemas.health import HealthResponse
 import logging
-import logging.config
+import os
 from fastapi.middleware.cors import CORSMiddleware
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("app.log"),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging (queue-backed; I/O happens off the request path)
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
-try:
-    # Create database tables
+# Schema changes are an explicit deploy step: python -m app.migrations
+# Opt in to running them at startup for local development only.
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "false").lower() == "true"
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "2"))
+
+
+def _create_schema():
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     logger.info("Database tables created successfully")
-except Exception as e:
-    logger.error(f"Failed to create database tables: {str(e)}")
-    raise
+
+
+async def _warm_up(app: FastAPI):
+    """
+    Fill connection pools and load in-memory state, retrying until the DB
+    is reachable. /health/ready reports 503 until this has finished.
+    """
+    while True:
+        try:
+            opened = await warm_up_pool(async_engine)
+            if async_read_engine is not async_engine:
+                opened += await warm_up_pool(async_read_engine)
+            await asyncio.to_thread(load_revocation_index)
+            await asyncio.to_thread(load_session_watermarks)
+            await asyncio.to_thread(load_role_catalog)
+
+            app.state.warm = True
+            logger.info("Warm-up complete (%d connections opened)", opened)
+            return
+        except Exception as e:
+            logger.error("Warm-up failed, retrying: %s", e)
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup / shutdown hooks.
+
+    Startup does not block on the database: warm-up runs in the background
+    and readiness flips once it is done.
+    """
+    app.state.warm = False
+
+    # calibrate hash cost before the executor starts
+    await asyncio.to_thread(init_password_hashing)
+
+    if RUN_MIGRATIONS_ON_STARTUP:
+        await asyncio.to_thread(_create_schema)
+
+    warm_up = asyncio.create_task(_warm_up(app))
+    revocation_sync = asyncio.create_task(run_revocation_sync())
+    session_sync = asyncio.create_task(run_session_sync())
+    sweeper = asyncio.create_task(run_sweeper()) if TOKEN_SWEEP_ENABLED else None
+    pool_metrics = asyncio.create_task(run_pool_metrics()) if PROMETHEUS_MULTIPROC_DIR else None
+    if WRITE_BATCH_ENABLED:
+        write_batcher.start()
+
+    yield
+
+    # flush queued token writes while the DB pool is still open
+    await write_batcher.stop()
+    warm_up.cancel()
+    revocation_sync.cancel()
+    session_sync.cancel()
+    if sweeper:
+        sweeper.cancel()
+    if pool_metrics:
+        pool_metrics.cancel()
+    shutdown_password_executor()
+    logger.info("Password hashing executor stopped")
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+    shutdown_logging()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Auth System",
     description="Secure authentication system with JWT tokens",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson instead of json.dumps for every response body
+    default_response_class=ORJSONResponse
 )
 app.add_middleware(
     CORSMiddleware,
@@ -39,23 +121,30 @@ app.add_middleware(
     allow_credentials=True,                   # cookies allow
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
+register_pool_collector()
 # Include routers
 app.include_router(auth.router)
 app.include_router(protected.router)
+app.include_router(sessions.router)
 app.include_router(admin.router)
+app.include_router(well_known.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
 
-@app.get("/health")
-def health_check():
+@app.get("/health", response_model=HealthResponse)
+async def health_check():
     """
-    Health check endpoint.
+    Health check endpoint (liveness; see /health/ready for readiness).
     
     Returns:
         Health status
     """
     return {"status": "healthy"}
 
-@app.get("/")
+@app.get("/", response_model=MessageResponse)
 def read_root():
     """
     Root endpoint.
@@ -0,0 +1,125 @@
+"""
+Schema migrations.
+
+create_all only creates missing tables; it never alters existing ones.
+Column, index and type changes to existing tables are listed here as
+ordered, idempotent PostgreSQL statements and recorded in
+schema_migrations once applied.
+
+Usage:
+    python -m app.migrations
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from typing import List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS: List[Tuple[str, List[str]]] = [
+    ("0001_users_role_version", [
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS role_version INTEGER NOT NULL DEFAULT 0",
+    ]),
+    ("0002_users_created_at_id_index", [
+        "UPDATE users SET created_at = now() WHERE created_at IS NULL",
+        "CREATE INDEX IF NOT EXISTS ix_users_created_at_id ON users (created_at, id)",
+    ]),
+    ("0003_refresh_tokens_binary_hash", [
+        # hex text -> 32-byte digest; skipped when create_all already made it bytea
+        """
+        DO $$
+        BEGIN
+            IF (SELECT data_type FROM information_schema.columns
+                WHERE table_name = 'refresh_tokens'
+                  AND column_name = 'token_hash') <> 'bytea' THEN
+                ALTER TABLE refresh_tokens
+                    ALTER COLUMN token_hash TYPE bytea
+                    USING decode(token_hash, 'hex');
+            END IF;
+        END $$
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_refresh_tokens_token_hash "
+        "ON refresh_tokens (token_hash)",
+        "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_id "
+        "ON refresh_tokens (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_active "
+        "ON refresh_tokens (user_id, expires_at) WHERE is_revoked = false",
+    ]),
+    ("0004_token_expiry_sweeper", [
+        "ALTER TABLE revoked_tokens ADD COLUMN IF NOT EXISTS expires_at TIMESTAMP",
+        "CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires_at "
+        "ON revoked_tokens (expires_at)",
+        "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_expires_at "
+        "ON refresh_tokens (expires_at)",
+        "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_revoked "
+        "ON refresh_tokens (id) WHERE is_revoked = true",
+    ]),
+    ("0005_sessions", [
+        "ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS session_id UUID",
+        "UPDATE refresh_tokens SET session_id = id WHERE session_id IS NULL",
+        "ALTER TABLE refresh_tokens ALTER COLUMN session_id SET NOT NULL",
+        "ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS device VARCHAR",
+        "ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS ip VARCHAR",
+        "ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS created_at TIMESTAMP",
+        "ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS last_used_at TIMESTAMP",
+        "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_session_id "
+        "ON refresh_tokens (session_id)",
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS tokens_valid_after TIMESTAMP",
+        "CREATE INDEX IF NOT EXISTS ix_users_tokens_valid_after "
+        "ON users (tokens_valid_after) WHERE tokens_valid_after IS NOT NULL",
+    ]),
+    ("0006_revoked_tokens_revoked_at_index", [
+        "UPDATE revoked_tokens SET revoked_at = now() WHERE revoked_at IS NULL",
+        "CREATE INDEX IF NOT EXISTS ix_revoked_tokens_revoked_at "
+        "ON revoked_tokens (revoked_at)",
+    ]),
+]
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """
+    Apply pending migrations in order.
+
+    Args:
+        engine: SQLAlchemy engine bound to the primary database
+
+    Returns:
+        Ids of the migrations applied by this call
+    """
+    applied = []
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "id VARCHAR PRIMARY KEY, "
+            "applied_at TIMESTAMP NOT NULL DEFAULT now())"
+        ))
+        done = {
+            row[0] for row in conn.execute(text("SELECT id FROM schema_migrations"))
+        }
+
+    for migration_id, statements in MIGRATIONS:
+        if migration_id in done:
+            continue
+
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO schema_migrations (id) VALUES (:id)"),
+                {"id": migration_id},
+            )
+
+        logger.info(f"Applied migration {migration_id}")
+        applied.append(migration_id)
+
+    return applied
+
+
+if __name__ == "__main__":
+    from app.database import Base, engine
+    import app.models  # noqa: F401  (register tables)
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
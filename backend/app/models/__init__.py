@@ -2,3 +2,4 @@ from app.models.user import User
 from app.models.role import Role
 from app.models.user_role import UserRole
 from app.models.refresh_token import RefreshToken
+from app.models.token import RevokedToken
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Boolean, DateTime, ForeignKey,String
+from sqlalchemy import Column, Boolean, DateTime, ForeignKey, Index, LargeBinary, String, text
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
@@ -6,9 +6,35 @@ from app.database import Base
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        Index("ix_refresh_tokens_token_hash", "token_hash", unique=True),
+        Index("ix_refresh_tokens_user_id", "user_id"),
+        # active sessions per user
+        Index(
+            "ix_refresh_tokens_active",
+            "user_id",
+            "expires_at",
+            postgresql_where=text("is_revoked = false"),
+        ),
+        Index("ix_refresh_tokens_session_id", "session_id"),
+        # expiry sweeper
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+        Index(
+            "ix_refresh_tokens_revoked",
+            "id",
+            postgresql_where=text("is_revoked = true"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
-    token_hash = Column(String, nullable=False)
+    token_hash = Column(LargeBinary(32), nullable=False)  # raw SHA-256 digest
     expires_at = Column(DateTime)
     is_revoked = Column(Boolean, default=False)
+
+    # session metadata, carried forward on rotation
+    session_id = Column(UUID(as_uuid=True), nullable=False, default=uuid.uuid4)
+    device = Column(String)
+    ip = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)  # session start
+    last_used_at = Column(DateTime, default=datetime.utcnow)
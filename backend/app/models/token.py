@@ -7,4 +7,7 @@ class RevokedToken(Base):
 
     id = Column(Integer, primary_key=True)
     jti = Column(String, unique=True, index=True)
-    revoked_at = Column(DateTime, default=datetime.utcnow)
+    # polled by the revocation index sync (app.core.revocation)
+    revoked_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # the revoked token's own exp; the row is useless after this
+    expires_at = Column(DateTime, index=True)
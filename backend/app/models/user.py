@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -7,12 +7,25 @@ from app.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # keyset pagination for /admin/users
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # session watermark sync
+        Index(
+            "ix_users_tokens_valid_after",
+            "tokens_valid_after",
+            postgresql_where=text("tokens_valid_after IS NOT NULL"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    role_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # tokens issued at or before this are invalid ("log out everywhere")
+    tokens_valid_after = Column(DateTime, nullable=True)
     roles = relationship(
         "UserRole",
         back_populates="user",
@@ -1,131 +1,454 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from datetime import datetime
+from typing import List, Optional
+import base64
+import json
+import orjson
+import uuid
 
-from app.database import get_db
+from app.database import AsyncReadSessionLocal, get_async_db, get_read_db
 from app.models.user import User
 from app.models.role import Role
 from app.models.user_role import UserRole
-from app.schemas.auth import SignupSchema
-from app.core.security import hash_password
+from app.schemas.auth import MessageResponse, SignupSchema
+from app.schemas.user import (
+    BulkRoleResponse,
+    BulkRoleSchema,
+    SessionOut,
+    SessionsRevokedResponse,
+    UserOut,
+)
+from app.core.security import hash_password_async
+from app.core.user_import import import_users, iter_lines
 from app.deps import admin_required
+from app.core.token_cache import token_cache
+from app.core.role_versions import role_versions
+from app.core.role_catalog import role_catalog
+from app.core.negative_cache import forget_unknown_email
+from app.core.sessions import list_sessions, revoke_all_sessions, revoke_session
 
 router = APIRouter(
     prefix="/admin",
     tags=["Admin"]
 )
 
+async def _bump_role_version(db: AsyncSession, user_id) -> int:
+    """
+    Increment the user's role version in the current transaction.
+    Access tokens carrying an older version are treated as stale.
+    """
+    return (await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(role_version=User.role_version + 1)
+        .returning(User.role_version)
+    )).scalar()
+
+
 # Get all users (with roles)
-@router.get("/users")
-def list_users(
-    _: User = Depends(admin_required),
-    db: Session = Depends(get_db)
+#
+# Keyset pagination on (created_at, id): each page is an index range scan,
+# however deep the cursor. The next page's cursor is returned in the
+# X-Next-Cursor header so the body stays a plain list.
+LIST_USERS_MAX_LIMIT = 1000
+EXPORT_PAGE_SIZE = 1000
+
+
+def _encode_cursor(user: User) -> str:
+    raw = f"{user.created_at.isoformat()}|{user.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, user_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(user_id)
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+
+async def _users_page(
+    db: AsyncSession,
+    limit: int,
+    after=None,
+    email_prefix: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    role: Optional[str] = None,
+) -> List[User]:
+    query = select(User).options(
+        selectinload(User.roles).joinedload(UserRole.role)
+    )
+
+    if after:
+        created_at, user_id = after
+        query = query.where(
+            tuple_(User.created_at, User.id) > tuple_(created_at, user_id)
+        )
+    if email_prefix:
+        escaped = (
+            email_prefix.replace("\\", "\\\\")
+            .replace("%", "\\%")
+            .replace("_", "\\_")
+        )
+        query = query.where(User.email.like(f"{escaped}%", escape="\\"))
+    if is_active is not None:
+        query = query.where(User.is_active == is_active)
+    if role:
+        query = query.where(User.roles.any(UserRole.role.has(Role.name == role)))
+
+    query = query.order_by(User.created_at, User.id).limit(limit)
+    return list((await db.execute(query)).scalars().all())
+
+
+def _user_dict(u: User) -> dict:
+    return {
+        "id": str(u.id),
+        "email": u.email,
+        "is_active": u.is_active,
+        "roles": [ur.role.name for ur in u.roles]
+    }
+
+
+async def _export_users(after, **filters):
+    """
+    Yield every matching user as NDJSON, one keyset page at a time.
+    Uses its own session because the request-scoped one is closed
+    before a streaming response starts.
+    """
+    async with AsyncReadSessionLocal() as db:
+        while True:
+            users = await _users_page(db, EXPORT_PAGE_SIZE, after, **filters)
+            # one chunk per page
+            if users:
+                yield b"".join(orjson.dumps(_user_dict(u)) + b"\n" for u in users)
+
+            if len(users) < EXPORT_PAGE_SIZE:
+                break
+            after = (users[-1].created_at, users[-1].id)
+            db.expunge_all()
+
+
+@router.get("/users", response_model=List[UserOut])
+async def list_users(
+    response: Response,
+    limit: int = Query(100, ge=1, le=LIST_USERS_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    email_prefix: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    role: Optional[str] = None,
+    stream: bool = False,
+    _: dict = Depends(admin_required),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    users = db.query(User).all()
+    """
+    List users with their roles.
+
+    Pages are ordered by (created_at, id); pass the X-Next-Cursor header
+    of one page as ?cursor= to get the next. With ?stream=true every
+    matching user is streamed as NDJSON instead (limit is ignored).
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    filters = {
+        "email_prefix": email_prefix,
+        "is_active": is_active,
+        "role": role,
+    }
 
-    return [
-        {
-            "id": str(u.id),
-            "email": u.email,
-            "is_active": u.is_active,
-            "roles": [ur.role.name for ur in u.roles]
-        }
-        for u in users
-    ]
+    if stream:
+        return StreamingResponse(
+            _export_users(after, **filters),
+            media_type="application/x-ndjson"
+        )
+
+    users = await _users_page(db, limit, after, **filters)
+
+    if len(users) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(users[-1])
+
+    return [_user_dict(u) for u in users]
 
 
 # Admin add user (default role: user)
-@router.post("/users")
-def create_user(
+@router.post("/users", response_model=MessageResponse)
+async def create_user(
     data: SignupSchema,
-    _: User = Depends(admin_required),
-    db: Session = Depends(get_db)
+    _: dict = Depends(admin_required),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if db.query(User).filter(User.email == data.email).first():
+    exists = (await db.execute(
+        select(User.id).where(User.email == data.email)
+    )).first()
+    if exists:
         raise HTTPException(400, "User already exists")
 
     user = User(
+        id=uuid.uuid4(),
         email=data.email,
-        hashed_password=hash_password(data.password)
+        hashed_password=await hash_password_async(data.password)
     )
-
     db.add(user)
-    db.commit()
-    db.refresh(user)
 
-    # 🔑 assign default role = user
-    user_role = db.query(Role).filter(Role.name == "user").first()
-    if user_role:
-        db.add(UserRole(user_id=user.id, role_id=user_role.id))
-        db.commit()
+    # 🔑 assign default role = user, same transaction
+    role_id = await role_catalog.get_id(db, "user")
+    if role_id is not None:
+        db.add(UserRole(user_id=user.id, role_id=role_id))
+
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(400, "User already exists")
+    await forget_unknown_email(data.email)
 
     return {"message": "User created by admin"}
 
 
+# Bulk import users (CSV / NDJSON body)
+#
+# The request body is consumed as it arrives and imported chunk by chunk.
+# The per-row report is returned once the body has been read: Starlette
+# cannot stream a response while the request body is still being read.
+# For very large feeds use the CLI: python -m app.core.user_import
+@router.post(
+    "/users/import",
+    response_class=Response,
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+async def import_users_bulk(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    _: dict = Depends(admin_required)
+):
+    """
+    Create users from a CSV or NDJSON body (format from ?format= or the
+    Content-Type). Returns one NDJSON result per input row; totals per
+    status are in the X-Import-Summary header.
+    """
+    if not format:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+
+    summary = {}
+    report = []
+    async for result in import_users(iter_lines(request.stream()), format):
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+        report.append(orjson.dumps(result) + b"\n")
+
+    return Response(
+        b"".join(report),
+        media_type="application/x-ndjson",
+        headers={"X-Import-Summary": json.dumps(summary)}
+    )
+
+
 # Assign role to user
-@router.post("/users/{user_id}/roles/{role_name}")
-def assign_role(
-    user_id: str,
+@router.post("/users/{user_id}/roles/{role_name}", response_model=MessageResponse)
+async def assign_role(
+    user_id: uuid.UUID,
     role_name: str,
-    _: User = Depends(admin_required),
-    db: Session = Depends(get_db)
+    _: dict = Depends(admin_required),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
-    role = db.query(Role).filter(Role.name == role_name).first()
-
-    if not user or not role:
+    role_id = await role_catalog.get_id(db, role_name)
+    if role_id is None:
         raise HTTPException(404, "User or role not found")
 
-    exists = db.query(UserRole).filter(
-        UserRole.user_id == user.id,
-        UserRole.role_id == role.id
-    ).first()
+    try:
+        assigned = (await db.execute(
+            insert(UserRole)
+            .values(user_id=user_id, role_id=role_id)
+            .on_conflict_do_nothing()
+            .returning(UserRole.user_id)
+        )).first()
+    except IntegrityError:
+        # unknown user (or a role deleted since the catalog was loaded)
+        await db.rollback()
+        role_catalog.invalidate()
+        raise HTTPException(404, "User or role not found")
 
-    if exists:
+    if not assigned:
+        await db.rollback()
         raise HTTPException(400, "Role already assigned")
 
-    db.add(UserRole(user_id=user.id, role_id=role.id))
-    db.commit()
+    version = await _bump_role_version(db, user_id)
+    await db.commit()
+    role_versions.note(user_id, version)
+    token_cache.invalidate_user(user_id)
 
     return {"message": f"Role '{role_name}' assigned"}
 
 
 # Remove role from user
-@router.delete("/users/{user_id}/roles/{role_name}")
-def remove_role(
-    user_id: str,
+@router.delete(
+    "/users/{user_id}/roles/{role_name}",
+    response_model=MessageResponse
+)
+async def remove_role(
+    user_id: uuid.UUID,
     role_name: str,
-    _: User = Depends(admin_required),
-    db: Session = Depends(get_db)
+    _: dict = Depends(admin_required),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    role = db.query(Role).filter(Role.name == role_name).first()
+    role_id = await role_catalog.get_id(db, role_name)
+    if role_id is None:
+        raise HTTPException(404, "Role not found")
 
-    user_role = db.query(UserRole).filter(
-        UserRole.user_id == user_id,
-        UserRole.role_id == role.id
-    ).first()
+    removed = (await db.execute(
+        delete(UserRole)
+        .where(UserRole.user_id == user_id, UserRole.role_id == role_id)
+        .returning(UserRole.user_id)
+    )).first()
 
-    if not user_role:
+    if not removed:
+        await db.rollback()
         raise HTTPException(404, "Role not assigned")
 
-    db.delete(user_role)
-    db.commit()
+    version = await _bump_role_version(db, user_id)
+    await db.commit()
+    role_versions.note(user_id, version)
+    token_cache.invalidate_user(user_id)
 
     return {"message": f"Role '{role_name}' removed"}
 
 
+# Bulk assign / remove a role
+#
+# One INSERT ... SELECT ... ON CONFLICT DO NOTHING (or DELETE ... IN) per
+# chunk of users, then one UPDATE bumping the role version of the users
+# that actually changed. Unknown user ids are skipped, not errors.
+BULK_ROLE_CHUNK_SIZE = 5000
+
+
+@router.post("/roles/{role_name}/bulk", response_model=BulkRoleResponse)
+async def bulk_role_change(
+    role_name: str,
+    data: BulkRoleSchema,
+    _: dict = Depends(admin_required),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Assign (action=assign) or remove (action=remove) a role for many users.
+    Each chunk of BULK_ROLE_CHUNK_SIZE users is committed on its own.
+    """
+    role_id = await role_catalog.get_id(db, role_name)
+    if role_id is None:
+        raise HTTPException(404, "Role not found")
+
+    user_ids = list(dict.fromkeys(data.user_ids))
+    changed = 0
+
+    for i in range(0, len(user_ids), BULK_ROLE_CHUNK_SIZE):
+        chunk = user_ids[i:i + BULK_ROLE_CHUNK_SIZE]
+
+        if data.action == "assign":
+            statement = (
+                insert(UserRole)
+                .from_select(
+                    ["user_id", "role_id"],
+                    select(User.id, literal(role_id)).where(User.id.in_(chunk))
+                )
+                .on_conflict_do_nothing()
+                .returning(UserRole.user_id)
+            )
+        else:
+            statement = (
+                delete(UserRole)
+                .where(UserRole.role_id == role_id, UserRole.user_id.in_(chunk))
+                .returning(UserRole.user_id)
+            )
+
+        affected = (await db.execute(statement)).scalars().all()
+        if not affected:
+            await db.rollback()
+            continue
+
+        versions = (await db.execute(
+            update(User)
+            .where(User.id.in_(affected))
+            .values(role_version=User.role_version + 1)
+            .returning(User.id, User.role_version)
+            .execution_options(synchronize_session=False)
+        )).all()
+        await db.commit()
+
+        for affected_id, version in versions:
+            role_versions.note(affected_id, version)
+            token_cache.invalidate_user(affected_id)
+        changed += len(affected)
+
+    return {
+        "role": role_name,
+        "action": data.action,
+        "requested": len(user_ids),
+        "changed": changed,
+    }
+
+
+# User sessions
+@router.get("/users/{user_id}/sessions", response_model=List[SessionOut])
+async def user_sessions(
+    user_id: uuid.UUID,
+    _: dict = Depends(admin_required),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await list_sessions(db, user_id)
+
+
+@router.delete(
+    "/users/{user_id}/sessions/{session_id}",
+    response_model=MessageResponse
+)
+async def revoke_user_session(
+    user_id: uuid.UUID,
+    session_id: uuid.UUID,
+    _: dict = Depends(admin_required),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not await revoke_session(db, user_id, session_id):
+        raise HTTPException(404, "Session not found")
+
+    return {"message": "Session revoked"}
+
+
+@router.delete("/users/{user_id}/sessions", response_model=SessionsRevokedResponse)
+async def revoke_user_sessions(
+    user_id: uuid.UUID,
+    _: dict = Depends(admin_required),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Log the user out everywhere: revoke all refresh tokens and
+    invalidate every access token issued so far.
+    """
+    revoked = await revoke_all_sessions(db, user_id)
+    return {"message": "User logged out everywhere", "sessions_revoked": revoked}
+
+
 # Admin delete user
-@router.delete("/users/{user_id}")
-def delete_user(
-    user_id: str,
-    _: User = Depends(admin_required),
-    db: Session = Depends(get_db)
+@router.delete("/users/{user_id}", response_model=MessageResponse)
+async def delete_user(
+    user_id: uuid.UUID,
+    _: dict = Depends(admin_required),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    # roles must be loaded for the delete-orphan cascade (no lazy loads in async)
+    user = (await db.execute(
+        select(User).options(selectinload(User.roles)).where(User.id == user_id)
+    )).scalar_one_or_none()
 
     if not user:
         raise HTTPException(404, "User not found")
 
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    role_versions.mark_deleted(user_id)
+    token_cache.invalidate_user(user_id)
 
     return {"message": "User deleted"}
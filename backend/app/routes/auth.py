@@ -1,30 +1,122 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, Request, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, Request, status
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_async_db, get_read_db
 from app.models.user import User
-from app.schemas.auth import SignupSchema, LoginSchema
-from app.core.security import hash_password, verify_password, hash_token
-from app.core.jwt import create_access_token, create_refresh_token
+from app.models.role import Role
+from app.models.user_role import UserRole
+from app.schemas.auth import (
+    IntrospectResponse,
+    IntrospectSchema,
+    LoginSchema,
+    MessageResponse,
+    SignupResponse,
+    SignupSchema,
+    TokenResponse,
+)
+from app.core.security import (
+    hash_password_async,
+    hash_token,
+    password_needs_rehash,
+    verify_dummy_password_async,
+    verify_password_async,
+)
+from app.core.jwt import (
+    ACCESS_TOKEN_USE,
+    REFRESH_TOKEN_USE,
+    TokenCodec,
+    TokenError,
+    TokenExpired,
+    create_access_token,
+    create_refresh_token,
+    get_token_codec,
+)
 import os
 from app.models.refresh_token import RefreshToken
-from datetime import datetime, timedelta
-from jose import jwt, JWTError
+from datetime import datetime, timedelta, timezone
 import logging
 from app.models.token import RevokedToken
-from app.deps import get_current_user, get_token_payload
+from app.core.revocation import revocation_index
+from app.core.negative_cache import (
+    forget_unknown_email,
+    is_unknown_email,
+    remember_unknown_email,
+    revoked_refresh_tokens,
+)
+from app.core.write_batcher import WriteBatcherStopped, write_batcher
+from app.core.rate_limit import client_ip
+from app.core.sessions import DEVICE_MAX_LENGTH, issued_before, session_watermarks
+from app.core.logging_config import MaskedEmail
+from app.core.metrics import record_outcome, stage_timer
+from app.deps import (
+    introspection_client,
+    login_rate_limit,
+    signup_rate_limit,
+)
+import asyncio
 import uuid
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-@router.post("/signup")
-def signup(data: SignupSchema, db: Session = Depends(get_db)):
+async def _load_role_claims(db: AsyncSession, user_id):
+    """
+    Load a user's role names and role version in one query,
+    for stamping into the access token.
+    """
+    rows = (await db.execute(
+        select(User.role_version, Role.name)
+        .outerjoin(UserRole, UserRole.user_id == User.id)
+        .outerjoin(Role, Role.id == UserRole.role_id)
+        .where(User.id == user_id)
+    )).all()
+    role_version = rows[0][0] if rows else 0
+    roles = [name for _, name in rows if name]
+    return roles, role_version
+
+async def _rehash_password(user_id, password: str, old_hash: str):
+    """
+    Upgrade a hash made with outdated cost settings. Runs as a background
+    task after the login response is sent; the compare-and-set UPDATE
+    leaves a password changed in the meantime untouched.
+    """
+    try:
+        new_hash = await hash_password_async(password)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(User)
+                .where(User.id == user_id, User.hashed_password == old_hash)
+                .values(hashed_password=new_hash)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+    except Exception as e:
+        logger.warning("Password rehash failed: %s", e)
+
+def _get_codec() -> TokenCodec:
+    try:
+        return get_token_codec()
+    except ValueError:
+        raise HTTPException(
+            status_code=500,
+            detail="JWT configuration error"
+        )
+
+@router.post(
+    "/signup",
+    response_model=SignupResponse,
+    dependencies=[Depends(signup_rate_limit)]
+)
+async def signup(data: SignupSchema, db: AsyncSession = Depends(get_async_db)):
     """Create a new user account"""
     try:
         # Check if email already exists
-        existing_user = db.query(User).filter(User.email == data.email).first()
+        with stage_timer("db_signup_lookup"):
+            existing_user = (await db.execute(
+                select(User.id).where(User.email == data.email)
+            )).first()
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -33,9 +125,11 @@ def signup(data: SignupSchema, db: Session = Depends(get_db)):
 
         # Hash password
         try:
-            hashed_password = hash_password(data.password)
+            hashed_password = await hash_password_async(data.password)
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Password hashing failed: {str(e)}")
+            logger.error("Password hashing failed: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to process password"
@@ -47,42 +141,52 @@ def signup(data: SignupSchema, db: Session = Depends(get_db)):
             hashed_password=hashed_password
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        with stage_timer("db_signup_insert"):
+            await db.commit()
+        await forget_unknown_email(data.email)
+        record_outcome("signup")
         
-        logger.info(f"User created successfully: {data.email}")
+        logger.info("User created successfully: %s", MaskedEmail(data.email))
         return {
             "message": "User created successfully",
             "user_id": str(user.id)
         }
         
+    except HTTPException:
+        raise
     except IntegrityError as e:
-        db.rollback()
-        logger.error(f"Integrity error during signup: {str(e)}")
+        await db.rollback()
+        logger.error("Integrity error during signup: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already exists"
         )
     except SQLAlchemyError as e:
-        db.rollback()
-        logger.error(f"Database error during signup: {str(e)}")
+        await db.rollback()
+        logger.error("Database error during signup: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Database error occurred"
         )
     except Exception as e:
-        db.rollback()
-        logger.error(f"Unexpected error during signup: {str(e)}")
+        await db.rollback()
+        logger.error("Unexpected error during signup: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
         )
 
-@router.post("/login")
-def login(
+@router.post(
+    "/login",
+    response_model=TokenResponse,
+    dependencies=[Depends(login_rate_limit)]
+)
+async def login(
     data: LoginSchema,
+    request: Request,
     response: Response,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Authenticate user and return tokens"""
     try:
@@ -97,71 +201,118 @@ def login(
                 detail="Configuration error"
             )
 
-        # Find user
-        try:
-            user = db.query(User).filter(User.email == data.email).first()
-        except SQLAlchemyError as e:
-            logger.error(f"Database error during login: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Database error occurred"
-            )
+        # Find user (emails recently found not to exist skip the DB)
+        user = None
+        if not await is_unknown_email(data.email):
+            try:
+                with stage_timer("db_login_lookup"):
+                    user = (await db.execute(
+                        select(User).where(User.email == data.email)
+                    )).scalar_one_or_none()
+            except SQLAlchemyError as e:
+                logger.error("Database error during login: %s", e)
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Database error occurred"
+                )
+            if not user:
+                await remember_unknown_email(data.email)
 
         # Verify credentials
         if not user:
-            logger.warning(f"Login attempt for non-existent user: {data.email}")
+            record_outcome("unknown_user")
+            logger.warning(
+                "Login attempt for non-existent user: %s", MaskedEmail(data.email),
+                extra={"sample": "login_unknown_user"}
+            )
+            # same KDF cost as a wrong password, cached or not
+            await verify_dummy_password_async(data.password)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
 
         try:
-            password_valid = verify_password(data.password, user.hashed_password)
+            password_valid = await verify_password_async(
+                data.password, user.hashed_password
+            )
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Password verification failed: {str(e)}")
+            logger.error("Password verification failed: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Authentication error"
             )
 
         if not password_valid:
-            logger.warning(f"Invalid password for user: {data.email}")
+            record_outcome("invalid_password")
+            logger.warning(
+                "Invalid password for user: %s", MaskedEmail(data.email),
+                extra={"sample": "login_invalid_password"}
+            )
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
 
+        # Upgrade outdated hashes off the request path
+        if password_needs_rehash(user.hashed_password):
+            background_tasks.add_task(
+                _rehash_password, user.id, data.password, user.hashed_password
+            )
+
         # Generate tokens
         try:
+            with stage_timer("db_role_claims"):
+                roles, role_version = await _load_role_claims(db, user.id)
             access_token = create_access_token(
                 {"sub": str(user.id)},
-                int(access_token_expire)
+                int(access_token_expire),
+                roles=roles,
+                role_version=role_version
             )
             refresh_token = create_refresh_token(
                 {"sub": str(user.id)},
                 int(refresh_token_expire)
             )
         except Exception as e:
-            logger.error(f"Token generation failed: {str(e)}")
+            logger.error("Token generation failed: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to generate tokens"
             )
 
         # Store hashed refresh token
+        #   group-committed with concurrent logins when write batching is on
         try:
-            db_token = RefreshToken(
-                user_id=user.id,
-                token_hash=hash_token(refresh_token),
-                expires_at=datetime.utcnow() + timedelta(
-                    days=int(refresh_token_expire)
-                )
-            )
-            db.add(db_token)
-            db.commit()
+            now = datetime.utcnow()
+            token_row = {
+                "id": uuid.uuid4(),
+                "user_id": user.id,
+                "token_hash": hash_token(refresh_token),
+                "expires_at": now + timedelta(days=int(refresh_token_expire)),
+                "is_revoked": False,
+                "session_id": uuid.uuid4(),
+                "device": (request.headers.get("User-Agent") or "")[:DEVICE_MAX_LENGTH] or None,
+                "ip": client_ip(request),
+                "created_at": now,
+                "last_used_at": now,
+            }
+            with stage_timer("db_refresh_token_insert"):
+                batched = write_batcher.running
+                if batched:
+                    try:
+                        await write_batcher.insert_refresh_token(token_row)
+                    except WriteBatcherStopped:
+                        # shutdown began after the check
+                        batched = False
+                if not batched:
+                    db.add(RefreshToken(**token_row))
+                    await db.commit()
         except SQLAlchemyError as e:
-            db.rollback()
-            logger.error(f"Failed to store refresh token: {str(e)}")
+            await db.rollback()
+            logger.error("Failed to store refresh token: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to process login"
@@ -177,7 +328,8 @@ def login(
             max_age=60 * 60 * 24 * 7
         )
 
-        logger.info(f"User logged in successfully: {data.email}")
+        record_outcome("login")
+        logger.info("User logged in successfully: %s", MaskedEmail(data.email))
         return {
             "access_token": access_token,
             "token_type": "bearer"
@@ -186,7 +338,7 @@ def login(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error during login: {str(e)}")
+        logger.error("Unexpected error during login: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
@@ -194,11 +346,11 @@ def login(
 
 
 
-@router.post("/refresh")
-def refresh_token(
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh_token(
     request: Request,
     response: Response,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Rotate refresh token and issue new access token
@@ -212,96 +364,187 @@ def refresh_token(
             detail="Refresh token missing"
         )
 
-    # 2️⃣ Load env vars
-    SECRET_KEY = os.getenv("SECRET_KEY")
-    ALGORITHM = os.getenv("ALGORITHM")
+    # 2️⃣ Load config
     ACCESS_EXPIRE = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
     REFRESH_EXPIRE = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
-
-    if not SECRET_KEY or not ALGORITHM:
-        raise HTTPException(
-            status_code=500,
-            detail="JWT configuration error"
-        )
+    codec = _get_codec()
 
     # 3️⃣ Decode refresh token
     try:
-        payload = jwt.decode(
-            refresh_token_value,
-            SECRET_KEY,
-            algorithms=[ALGORITHM]
-        )
+        with stage_timer("jwt_decode"):
+            payload = codec.decode(refresh_token_value)
         user_id = payload.get("sub")
         jti = payload.get("jti")
+        exp = payload.get("exp")
 
         if not user_id or not jti:
             raise HTTPException(status_code=401, detail="Invalid token payload")
-
-    except JWTError:
+        # refresh tokens issued before the claim existed carry none
+        if payload.get("token_use", REFRESH_TOKEN_USE) != REFRESH_TOKEN_USE:
+            raise HTTPException(status_code=401, detail="Invalid token type")
+        # needed to blacklist the old jti until it would have expired
+        if exp is None:
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    except TokenError as e:
+        record_outcome("expired_token" if isinstance(e, TokenExpired) else "invalid_token")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token"
         )
 
     # 4️⃣ Check JWT blacklist (logout protection)
-    if db.query(RevokedToken).filter(RevokedToken.jti == jti).first():
+    #    replayed cookies that recently failed rotation are rejected first;
+    #    then the in-memory index when loaded, DB otherwise
+    token_hash = hash_token(refresh_token_value)
+    if token_hash in revoked_refresh_tokens:
+        record_outcome("refresh_token_rejected")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token invalid or revoked"
+        )
+
+    if revocation_index.loaded:
+        revoked = revocation_index.is_revoked(jti)
+    else:
+        with stage_timer("db_revocation_lookup"):
+            revoked = (await db.execute(
+                select(RevokedToken.id).where(RevokedToken.jti == jti)
+            )).first()
+
+    if revoked:
+        revoked_refresh_tokens.add(token_hash)
+        record_outcome("revoked_token")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token revoked"
         )
 
-    # 5️⃣ Check refresh token in DB
-    token_hash = hash_token(refresh_token_value)
+    # 5️⃣ Reject tokens issued before the user's last "log out everywhere".
+    #    FOR SHARE on the users row orders this rotation against a
+    #    concurrent revoke-all (see app.core.sessions.revoke_all_sessions)
+    if session_watermarks.is_invalidated(user_id, payload.get("iat")):
+        revoked_refresh_tokens.add(token_hash)
+        record_outcome("revoked_token")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session revoked"
+        )
+
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+
+    with stage_timer("db_session_watermark"):
+        valid_after = (await db.execute(
+            select(User.tokens_valid_after)
+            .where(User.id == user_uuid)
+            .with_for_update(read=True)
+        )).scalar()
+
+    if issued_before(payload.get("iat"), valid_after):
+        await db.rollback()
+        session_watermarks.set(user_id, valid_after)
+        revoked_refresh_tokens.add(token_hash)
+        record_outcome("revoked_token")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session revoked"
+        )
+
+    # 6️⃣ Revoke the presented refresh token atomically.
+    #    The row lock makes concurrent refreshes with the same cookie
+    #    serialize: only the first one sees is_revoked = false.
+    #    RETURNING also hands back the role claims for the new access token
+    #    and the session metadata to carry forward.
+    now = datetime.utcnow()
+
+    role_names = (
+        select(func.array_agg(Role.name))
+        .join(UserRole, UserRole.role_id == Role.id)
+        .where(UserRole.user_id == RefreshToken.user_id)
+        .scalar_subquery()
+    )
+    role_version = (
+        select(User.role_version)
+        .where(User.id == RefreshToken.user_id)
+        .scalar_subquery()
+    )
 
-    db_token = db.query(RefreshToken).filter(
-        RefreshToken.token_hash == token_hash,
-        RefreshToken.is_revoked == False,
-        RefreshToken.expires_at > datetime.utcnow()
-    ).first()
+    with stage_timer("db_refresh_rotate"):
+        rotated = (await db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.is_revoked == False,
+                RefreshToken.expires_at > now
+            )
+            .values(is_revoked=True)
+            .returning(
+                RefreshToken.user_id, role_version, role_names,
+                RefreshToken.session_id, RefreshToken.device, RefreshToken.created_at
+            )
+            .execution_options(synchronize_session=False)
+        )).first()
 
-    if not db_token:
+    if not rotated:
+        await db.rollback()
+        revoked_refresh_tokens.add(token_hash)
+        record_outcome("refresh_token_rejected")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Refresh token invalid or revoked"
         )
 
-    # 6️⃣ Revoke old refresh token
-    db_token.is_revoked = True
-    db.add(RevokedToken(jti=jti))
-    db.commit()
+    token_user_id, rv, roles, session_id, device, session_started_at = rotated
 
     # 7️⃣ Generate new tokens
     new_access_payload = {
         "sub": user_id,
         "jti": str(uuid.uuid4()),
-        "exp": datetime.utcnow() + timedelta(minutes=ACCESS_EXPIRE),
+        "iat": now,
+        "exp": now + timedelta(minutes=ACCESS_EXPIRE),
+        "roles": sorted(roles or []),
+        "rv": rv or 0,
+        "token_use": ACCESS_TOKEN_USE,
     }
 
     new_refresh_payload = {
         "sub": user_id,
         "jti": str(uuid.uuid4()),
-        "exp": datetime.utcnow() + timedelta(days=REFRESH_EXPIRE),
+        "iat": now,
+        "exp": now + timedelta(days=REFRESH_EXPIRE),
+        "token_use": REFRESH_TOKEN_USE,
     }
 
-    new_access_token = jwt.encode(
-        new_access_payload, SECRET_KEY, algorithm=ALGORITHM
-    )
-
-    new_refresh_token = jwt.encode(
-        new_refresh_payload, SECRET_KEY, algorithm=ALGORITHM
-    )
+    with stage_timer("jwt_encode"):
+        new_access_token = codec.encode(new_access_payload)
+        new_refresh_token = codec.encode(new_refresh_payload)
 
-    # 8️⃣ Store new refresh token
-    db.add(
+    # 8️⃣ Blacklist old jti + store new refresh token, same transaction
+    old_expires_at = datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+    db.add_all([
+        RevokedToken(jti=jti, expires_at=old_expires_at),
         RefreshToken(
-            user_id=user_id,
+            user_id=token_user_id,
             token_hash=hash_token(new_refresh_token),
-            expires_at=datetime.utcnow() + timedelta(days=REFRESH_EXPIRE)
-        )
-    )
-    db.commit()
-
-    # 9️⃣ Update cookie
+            expires_at=now + timedelta(days=REFRESH_EXPIRE),
+            session_id=session_id,
+            device=device,
+            ip=client_ip(request),
+            created_at=session_started_at or now,
+            last_used_at=now
+        ),
+    ])
+
+    # 9️⃣ Single commit for the whole rotation
+    with stage_timer("db_refresh_commit"):
+        await db.commit()
+    revocation_index.add(jti, old_expires_at)
+    record_outcome("refresh")
+
+    # 🔟 Update cookie
     response.set_cookie(
         key="refresh_token",
         value=new_refresh_token,
@@ -316,72 +559,91 @@ def refresh_token(
         "token_type": "bearer"
     }
 
-@router.post("/logout")
-def logout(
+@router.post("/logout", response_model=MessageResponse)
+async def logout(
     request: Request,
     response: Response,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Logout user by revoking refresh token and blacklisting JWT jti
     """
 
-    # 1️⃣ Get refresh token from cookie
+    # 1️⃣ Get refresh token from cookie, access token from header
     refresh_token_value = request.cookies.get("refresh_token")
+    authorization = request.headers.get("Authorization", "")
+    access_token_value = (
+        authorization[7:] if authorization.lower().startswith("bearer ") else None
+    )
 
-    # Even if token missing → logout should succeed (idempotent)
-    if not refresh_token_value:
+    # Even if tokens missing → logout should succeed (idempotent)
+    if not refresh_token_value and not access_token_value:
         response.delete_cookie("refresh_token")
         return {"message": "Logged out"}
 
-    # 2️⃣ Load env vars
-    SECRET_KEY = os.getenv("SECRET_KEY")
-    ALGORITHM = os.getenv("ALGORITHM")
-
-    if not SECRET_KEY or not ALGORITHM:
-        raise HTTPException(
-            status_code=500,
-            detail="JWT configuration error"
-        )
-
-    # 3️⃣ Decode refresh token (best-effort)
-    jti = None
-    try:
-        payload = jwt.decode(
-            refresh_token_value,
-            SECRET_KEY,
-            algorithms=[ALGORITHM]
-        )
-        jti = payload.get("jti")
-    except JWTError:
-        # token already invalid / expired → still logout
-        logger.info("Logout with invalid or expired refresh token")
+    # 2️⃣ Load codec
+    codec = _get_codec()
 
-    # 4️⃣ Blacklist JWT jti (if exists)
-    if jti:
-        exists = db.query(RevokedToken).filter(
-            RevokedToken.jti == jti
-        ).first()
-
-        if not exists:
-            db.add(RevokedToken(jti=jti))
-            db.commit()
+    # 3️⃣ Decode both tokens (best-effort)
+    to_revoke = []
+    for token_value in (refresh_token_value, access_token_value):
+        if not token_value:
+            continue
+        try:
+            payload = codec.decode(token_value)
+            if payload.get("jti"):
+                exp = payload.get("exp")
+                to_revoke.append((
+                    payload["jti"],
+                    datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+                    if exp else None
+                ))
+        except TokenError:
+            # token already invalid / expired → still logout
+            logger.info("Logout with invalid or expired token")
+
+    token_hash = hash_token(refresh_token_value) if refresh_token_value else None
+    batched = write_batcher.running
+
+    # 4️⃣ Blacklist JWT jtis, so the access token stops working immediately
+    #    with write batching: jtis and refresh token in one group commit
+    if batched:
+        try:
+            await write_batcher.revoke(to_revoke, token_hash)
+            if token_hash:
+                revoked_refresh_tokens.add(token_hash)
+        except WriteBatcherStopped:
+            # shutdown began after the check
+            batched = False
+    if not batched:
+        for jti, expires_at in to_revoke:
+            exists = (await db.execute(
+                select(RevokedToken.id).where(RevokedToken.jti == jti)
+            )).first()
+
+            if not exists:
+                db.add(RevokedToken(jti=jti, expires_at=expires_at))
+                await db.commit()
+    for jti, expires_at in to_revoke:
+        revocation_index.add(jti, expires_at)
 
     # 5️⃣ Revoke refresh token in DB (best-effort)
-    try:
-        token_hash = hash_token(refresh_token_value)
-
-        db_token = db.query(RefreshToken).filter(
-            RefreshToken.token_hash == token_hash,
-            RefreshToken.is_revoked == False
-        ).first()
+    if token_hash and not batched:
+        try:
+            db_token = (await db.execute(
+                select(RefreshToken).where(
+                    RefreshToken.token_hash == token_hash,
+                    RefreshToken.is_revoked == False
+                )
+            )).scalar_one_or_none()
 
-        if db_token:
-            db_token.is_revoked = True
-            db.commit()
+            if db_token:
+                db_token.is_revoked = True
+                await db.commit()
+            revoked_refresh_tokens.add(token_hash)
 
-    except Exception as e:
-        logger.error(f"Failed to revoke refresh token: {str(e)}")
+        except Exception as e:
+            logger.error("Failed to revoke refresh token: %s", e)
 
     # 6️⃣ Clear cookie
     response.delete_cookie(
@@ -391,4 +653,125 @@ def logout(
         secure=False   # 🔥 True in production (HTTPS)
     )
 
-    return {"message": "Logged out successfully"}
\ No newline at end of file
+    return {"message": "Logged out successfully"}
+
+
+# Batch introspection
+
+INTROSPECT_DECODE_CHUNK = 64
+
+
+def _decode_chunk(codec: TokenCodec, tokens):
+    results = []
+    for token in tokens:
+        try:
+            results.append(codec.decode(token))
+        except TokenError:
+            results.append(None)
+    return results
+
+
+@router.post(
+    "/introspect",
+    response_model=IntrospectResponse,
+    response_model_exclude_none=True
+)
+async def introspect(
+    data: IntrospectSchema,
+    _: None = Depends(introspection_client),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Validate a batch of tokens in one call (for gateways).
+
+    Tokens are decoded in parallel chunks off the event loop; revocation is
+    checked in bulk; every referenced user and their roles are loaded with
+    a single IN (...) query. Results are returned in request order.
+    """
+    codec = _get_codec()
+
+    # 1️⃣ Decode in parallel
+    loop = asyncio.get_running_loop()
+    chunks = [
+        data.tokens[i:i + INTROSPECT_DECODE_CHUNK]
+        for i in range(0, len(data.tokens), INTROSPECT_DECODE_CHUNK)
+    ]
+    decoded = [
+        claims
+        for chunk in await asyncio.gather(*(
+            loop.run_in_executor(None, _decode_chunk, codec, chunk)
+            for chunk in chunks
+        ))
+        for claims in chunk
+    ]
+
+    # 2️⃣ Bulk revocation check
+    jtis = {c["jti"] for c in decoded if c and c.get("jti")}
+    if revocation_index.loaded:
+        revoked = {jti for jti in jtis if revocation_index.is_revoked(jti)}
+    elif jtis:
+        revoked = set((await db.execute(
+            select(RevokedToken.jti).where(RevokedToken.jti.in_(jtis))
+        )).scalars().all())
+    else:
+        revoked = set()
+
+    # 3️⃣ Resolve all users + roles in one query
+    user_ids = set()
+    for claims in decoded:
+        if claims and claims.get("sub"):
+            try:
+                user_ids.add(uuid.UUID(claims["sub"]))
+            except ValueError:
+                pass
+
+    users = {}
+    if user_ids:
+        rows = (await db.execute(
+            select(
+                User.id, User.email, User.is_active, User.role_version,
+                User.tokens_valid_after, Role.name
+            )
+            .outerjoin(UserRole, UserRole.user_id == User.id)
+            .outerjoin(Role, Role.id == UserRole.role_id)
+            .where(User.id.in_(user_ids))
+        )).all()
+        for user_id, email, is_active, role_version, valid_after, role_name in rows:
+            user = users.setdefault(str(user_id), {
+                "email": email,
+                "is_active": is_active,
+                "role_version": role_version,
+                "valid_after": valid_after,
+                "roles": [],
+            })
+            if role_name:
+                user["roles"].append(role_name)
+
+    # 4️⃣ Build per-token results
+    results = []
+    for claims in decoded:
+        user = users.get(claims.get("sub")) if claims else None
+        active = (
+            user is not None
+            and claims.get("token_use") == ACCESS_TOKEN_USE
+            and user["is_active"]
+            and claims.get("jti") not in revoked
+            # role claims older than the user's current role version are stale
+            and int(claims.get("rv", user["role_version"])) >= user["role_version"]
+            # issued before the user's last "log out everywhere"
+            and not issued_before(claims.get("iat"), user["valid_after"])
+        )
+        if not active:
+            results.append({"active": False})
+            continue
+
+        results.append({
+            "active": True,
+            "sub": claims["sub"],
+            "jti": claims.get("jti"),
+            "exp": claims.get("exp"),
+            "email": user["email"],
+            "roles": sorted(user["roles"]),
+        })
+
+    return {"results": results}
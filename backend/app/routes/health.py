@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Request, Response
+import os
+
+from app.database import async_engine, async_read_engine, ping_database, pool_status
+from app.core.revocation import revocation_index
+from app.schemas.health import HealthResponse, ReadinessResponse
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"]
+)
+
+READINESS_DB_TIMEOUT = float(os.getenv("READINESS_DB_TIMEOUT", "1"))
+
+
+@router.get("/live", response_model=HealthResponse)
+async def liveness():
+    """
+    Liveness probe: the process is up and serving. Never touches the DB.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def readiness(request: Request, response: Response):
+    """
+    Readiness probe: 200 once startup warm-up finished and the DB answers
+    within READINESS_DB_TIMEOUT, 503 otherwise. Reports pool occupancy.
+    """
+    warm = getattr(request.app.state, "warm", False)
+
+    database = await ping_database(async_engine, READINESS_DB_TIMEOUT)
+    replica = True
+    if async_read_engine is not async_engine:
+        replica = await ping_database(async_read_engine, READINESS_DB_TIMEOUT)
+
+    ready = warm and database and replica
+    response.status_code = 200 if ready else 503
+
+    return {
+        "status": "ready" if ready else "not_ready",
+        "warm": warm,
+        "database": "ok" if database else "unavailable",
+        "replica": "ok" if replica else "unavailable",
+        "revocation_index_loaded": revocation_index.loaded,
+        "pools": pool_status(),
+    }
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.core.metrics import metrics_registry
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus scrape endpoint (all workers in multiprocess mode).
+    """
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+import uuid
+
+from app.database import get_async_db
+from app.deps import get_current_user
+from app.core.token_cache import UserSnapshot
+from app.core.security import hash_token
+from app.core.sessions import list_sessions, revoke_all_sessions, revoke_session
+from app.schemas.auth import MessageResponse
+from app.schemas.user import SessionOut, SessionsRevokedResponse
+
+router = APIRouter(
+    prefix="/sessions",
+    tags=["Sessions"]
+)
+
+
+# List my active sessions
+@router.get("", response_model=List[SessionOut])
+async def my_sessions(
+    request: Request,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Active sessions (devices) of the caller; "current" marks the one
+    holding this request's refresh cookie.
+    """
+    cookie = request.cookies.get("refresh_token")
+    return await list_sessions(db, current_user.id, hash_token(cookie) if cookie else None)
+
+
+# Revoke one of my sessions
+@router.delete("/{session_id}", response_model=MessageResponse)
+async def revoke_my_session(
+    session_id: uuid.UUID,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not await revoke_session(db, current_user.id, session_id):
+        raise HTTPException(404, "Session not found")
+
+    return {"message": "Session revoked"}
+
+
+# Log out everywhere
+@router.delete("", response_model=SessionsRevokedResponse)
+async def revoke_my_sessions(
+    response: Response,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Revoke every session of the caller, including this one. All access
+    tokens issued so far stop working immediately.
+    """
+    revoked = await revoke_all_sessions(db, current_user.id)
+
+    response.delete_cookie(
+        key="refresh_token",
+        httponly=True,
+        samesite="lax",
+        secure=False   # 🔥 True in production (HTTPS)
+    )
+    return {"message": "Logged out everywhere", "sessions_revoked": revoked}
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+import hashlib
+import json
+import os
+
+from app.core.jwt import get_token_codec
+
+router = APIRouter(
+    prefix="/.well-known",
+    tags=["Well-known"]
+)
+
+JWKS_MAX_AGE_SECONDS = int(os.getenv("JWKS_MAX_AGE_SECONDS", "300"))
+
+_jwks_cache = {}
+
+
+def _jwks_document():
+    """
+    Serialized JWK Set and its ETag, built once per codec.
+    """
+    try:
+        codec = get_token_codec()
+    except ValueError:
+        raise HTTPException(500, "JWT configuration error")
+
+    cached = _jwks_cache.get(id(codec))
+    if cached is None:
+        body = json.dumps(codec.jwks(), separators=(",", ":"), sort_keys=True).encode()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        cached = _jwks_cache[id(codec)] = (body, etag)
+    return cached
+
+
+@router.get("/jwks.json")
+def jwks(request: Request):
+    """
+    Public keys for verifying access tokens locally (RFC 7517).
+    Cacheable; honours If-None-Match.
+    """
+    body, etag = _jwks_document()
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={JWKS_MAX_AGE_SECONDS}",
+    }
+
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,4 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
+
+INTROSPECT_MAX_TOKENS = 1000
 
 class SignupSchema(BaseModel):
     email: EmailStr
@@ -7,3 +10,30 @@ class SignupSchema(BaseModel):
 class LoginSchema(BaseModel):
     email: EmailStr
     password: str
+
+class IntrospectSchema(BaseModel):
+    tokens: List[str] = Field(..., min_length=1, max_length=INTROSPECT_MAX_TOKENS)
+
+
+# Responses
+
+class MessageResponse(BaseModel):
+    message: str
+
+class SignupResponse(MessageResponse):
+    user_id: str
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+
+class IntrospectResult(BaseModel):
+    active: bool
+    sub: Optional[str] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None
+    email: Optional[str] = None
+    roles: Optional[List[str]] = None
+
+class IntrospectResponse(BaseModel):
+    results: List[IntrospectResult]
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Dict
+
+class HealthResponse(BaseModel):
+    status: str
+
+class ReadinessResponse(BaseModel):
+    status: str
+    warm: bool
+    database: str
+    replica: str
+    revocation_index_loaded: bool
+    pools: Dict[str, Dict[str, int]]
@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Literal, Optional
+import uuid
+
+from app.schemas.auth import MessageResponse
+
+class UserOut(BaseModel):
+    id: str
+    email: str
+    is_active: bool
+    roles: List[str]
+
+class SessionOut(BaseModel):
+    id: str
+    device: Optional[str] = None
+    ip: Optional[str] = None
+    created_at: Optional[datetime] = None
+    last_used_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    current: bool = False
+
+class SessionsRevokedResponse(MessageResponse):
+    sessions_revoked: int
+
+BULK_ROLE_MAX_USERS = 100000
+
+class BulkRoleSchema(BaseModel):
+    action: Literal["assign", "remove"]
+    user_ids: List[uuid.UUID] = Field(..., min_length=1, max_length=BULK_ROLE_MAX_USERS)
+
+class BulkRoleResponse(BaseModel):
+    role: str
+    action: str
+    requested: int
+    changed: int
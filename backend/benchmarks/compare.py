@@ -0,0 +1,92 @@
+"""
+Compare two benchmarks.load result files and flag regressions.
+
+A scenario regresses when its p50/p95/p99 latency grows, or its
+throughput drops, by more than --threshold (relative), or when it starts
+returning errors.
+
+Usage (from backend/):
+    python -m benchmarks.compare baseline.json current.json [--threshold 0.10]
+
+Exits with status 1 if any scenario regressed.
+"""
+import argparse
+import json
+import sys
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def _change(before: float, after: float) -> float:
+    if not before:
+        return 0.0
+    return (after - before) / before
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    Returns:
+        One row per scenario present in both runs:
+        (scenario, metric, before, after, relative change, regressed)
+    """
+    rows = []
+    for name, before in baseline["scenarios"].items():
+        after = current["scenarios"].get(name)
+        if after is None:
+            continue
+
+        for key in LATENCY_KEYS:
+            change = _change(before[key], after[key])
+            rows.append((name, key, before[key], after[key], change, change > threshold))
+
+        change = _change(before["throughput_rps"], after["throughput_rps"])
+        rows.append((
+            name, "throughput_rps", before["throughput_rps"], after["throughput_rps"],
+            change, change < -threshold
+        ))
+
+        rows.append((
+            name, "errors", before["errors"], after["errors"],
+            0.0, after["errors"] > before["errors"]
+        ))
+
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    for label, run in (("baseline", baseline), ("current", current)):
+        meta = run.get("meta", {})
+        print(
+            f"{label:<9} commit={meta.get('commit')} db={meta.get('database')} "
+            f"concurrency={meta.get('concurrency')} requests={meta.get('requests')}"
+        )
+    if baseline.get("meta", {}).get("concurrency") != current.get("meta", {}).get("concurrency"):
+        print("warning: runs used different concurrency, results are not comparable")
+    print()
+
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'scenario':<12} {'metric':<15} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, metric, before, after, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<12} {metric:<15} {before:>10} {after:>10} {change:>+7.1%}{flag}")
+
+    regressions = [row for row in rows if row[5]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark of JWT encode/decode throughput per codec backend.
+
+Usage (from backend/):
+    python -m benchmarks.jwt_codec [--iterations N] [--algorithm HS256]
+"""
+from datetime import datetime, timedelta
+import argparse
+import time
+import uuid
+
+from app.core.jwt import TOKEN_BACKENDS, TokenCodec
+
+
+def _claims() -> dict:
+    return {
+        "sub": str(uuid.uuid4()),
+        "jti": str(uuid.uuid4()),
+        "exp": datetime.utcnow() + timedelta(minutes=15),
+        "roles": ["user"],
+        "rv": 0,
+    }
+
+
+def bench_backend(backend: str, algorithm: str, secret: str, iterations: int) -> dict:
+    codec = TokenCodec(secret, algorithm, backend)
+    claims = [_claims() for _ in range(iterations)]
+
+    started = time.perf_counter()
+    tokens = [codec.encode(c) for c in claims]
+    encode_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for token in tokens:
+        codec.decode(token)
+    decode_seconds = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "encode_per_sec": iterations / encode_seconds,
+        "decode_per_sec": iterations / decode_seconds,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--algorithm", default="HS256")
+    parser.add_argument("--secret", default="benchmark-secret-key-0123456789abcdef")
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'encode/s':>12} {'decode/s':>12}")
+    for backend in TOKEN_BACKENDS:
+        try:
+            result = bench_backend(backend, args.algorithm, args.secret, args.iterations)
+        except (ImportError, ValueError) as e:
+            print(f"{backend:<8} skipped ({e})")
+            continue
+        print(
+            f"{result['backend']:<8} "
+            f"{result['encode_per_sec']:>12,.0f} "
+            f"{result['decode_per_sec']:>12,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
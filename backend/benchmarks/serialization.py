@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of response serialization cost per response.
+
+Compares, for the /protected/me and /admin/users payloads:
+- before: plain dicts through jsonable_encoder + JSONResponse (json.dumps)
+- after:  response_model validation/serialization (what FastAPI does with
+          pydantic v2) + ORJSONResponse
+
+Usage (from backend/):
+    python -m benchmarks.serialization [--iterations N]
+"""
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from typing import List
+import argparse
+import time
+import uuid
+
+from app.schemas.user import UserOut
+
+
+def _user(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "email": f"user-{i}@example.com",
+        "is_active": True,
+        "roles": ["user"] if i % 10 else ["admin", "user"],
+    }
+
+
+def _before(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def _after(adapter: TypeAdapter):
+    def render(content):
+        value = adapter.validate_python(content)
+        return ORJSONResponse(adapter.dump_python(value, mode="json")).body
+    return render
+
+
+def bench(render, content, iterations: int) -> float:
+    """
+    Returns:
+        Microseconds per response
+    """
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render(content)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    cases = [
+        ("/protected/me", _user(0), TypeAdapter(UserOut), args.iterations * 10),
+        ("/admin/users?limit=100", [_user(i) for i in range(100)],
+         TypeAdapter(List[UserOut]), args.iterations),
+        ("/admin/users?limit=1000", [_user(i) for i in range(1000)],
+         TypeAdapter(List[UserOut]), max(args.iterations // 10, 1)),
+    ]
+
+    print(f"{'response':<26} {'before us':>10} {'after us':>10} {'saved':>7}")
+    for name, content, adapter, iterations in cases:
+        before = bench(_before, content, iterations)
+        after = bench(_after(adapter), content, iterations)
+        print(f"{name:<26} {before:>10.1f} {after:>10.1f} {1 - after / before:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Shared fixtures.
+
+Most tests need PostgreSQL (the app relies on its dialect) and run
+against TEST_DATABASE_URL; they are skipped when it is not set. The
+database is wiped, so point it at a throwaway one:
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost/auth_test python -m pytest
+
+The remaining tests only exercise in-process code and always run.
+"""
+import os
+import uuid
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# never fall back to a DATABASE_URL from the shell or .env; without
+# TEST_DATABASE_URL the engines are created but never connected
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL or "postgresql://localhost/unused"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "15")
+os.environ.setdefault("REFRESH_TOKEN_EXPIRE_DAYS", "7")
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PASSWORD_HASH_EXECUTOR", "thread")
+# one worker, PASSWORD_HASH_MAX_PENDING = 4 queue slots
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "1")
+os.environ.setdefault("TOKEN_SWEEP_ENABLED", "false")
+
+requires_postgres = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+
+def reset_database() -> None:
+    """
+    Drop every table, leaving an empty database.
+    """
+    from sqlalchemy import text
+    from app.database import engine
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+
+
+def create_schema() -> None:
+    from app.main import _create_schema
+
+    _create_schema()
+
+
+@pytest.fixture(scope="session")
+def database():
+    """
+    Empty, fully migrated database (once per run).
+    """
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    reset_database()
+    create_schema()
+
+
+@pytest.fixture
+def db(database):
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(autouse=True)
+def _reset_rate_limits():
+    # every test client shares one IP
+    from app.core.rate_limit import _backend
+
+    _backend.clear()
+
+
+@pytest.fixture(scope="module")
+def client(database):
+    """
+    TestClient around the app, started (lifespan) and warmed up.
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        wait_until_ready(client)
+        yield client
+
+
+@pytest.fixture(scope="module")
+def admin_token(client):
+    """
+    Access token of a fresh user holding the admin role. Also creates
+    the "admin" and "user" roles.
+    """
+    from sqlalchemy import select
+    from app.core.role_catalog import role_catalog
+    from app.database import SessionLocal
+    from app.models.role import Role
+    from app.models.user import User
+    from app.models.user_role import UserRole
+
+    email = unique_email()
+    client.post("/auth/signup", json={"email": email, "password": "s3cret-pass"})
+
+    db = SessionLocal()
+    try:
+        for name in ("admin", "user"):
+            if not db.execute(select(Role).where(Role.name == name)).first():
+                db.add(Role(name=name))
+        db.commit()
+        # roles were created behind the catalog's back
+        role_catalog.invalidate()
+
+        user_id = db.execute(select(User.id).where(User.email == email)).scalar_one()
+        admin_id = db.execute(select(Role.id).where(Role.name == "admin")).scalar_one()
+        db.add(UserRole(user_id=user_id, role_id=admin_id))
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.post("/auth/login", json={"email": email, "password": "s3cret-pass"})
+    client.cookies.clear()
+    return response.json()["access_token"]
+
+
+def wait_until_ready(client, timeout: float = 10) -> None:
+    import time
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if client.get("/health/ready").status_code == 200:
+            return
+        time.sleep(0.05)
+    pytest.fail("app did not become ready")
+
+
+def unique_email() -> str:
+    return f"user-{uuid.uuid4().hex[:12]}@example.com"
+
+
+def signup_and_login(client, email: str = None, password: str = "s3cret-pass"):
+    """
+    Create a user and log in.
+
+    Returns:
+        (email, access token, refresh token)
+    """
+    email = email or unique_email()
+    response = client.post("/auth/signup", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+
+    response = client.post("/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    return email, response.json()["access_token"], response.cookies["refresh_token"]
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
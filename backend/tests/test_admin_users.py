@@ -0,0 +1,68 @@
+import json
+
+from conftest import bearer
+
+
+def _create_users(client, admin_token, prefix: str, count: int):
+    for i in range(count):
+        response = client.post(
+            "/admin/users",
+            json={"email": f"{prefix}{i}@example.com", "password": "s3cret-pass"},
+            headers=bearer(admin_token),
+        )
+        assert response.status_code == 200, response.text
+
+
+def test_admin_created_users_get_the_user_role(client, admin_token):
+    _create_users(client, admin_token, "default-role-", 1)
+
+    users = client.get(
+        "/admin/users", params={"email_prefix": "default-role-"}, headers=bearer(admin_token)
+    ).json()
+    assert [u["roles"] for u in users] == [["user"]]
+
+
+def test_keyset_pagination_walks_every_user_once(client, admin_token):
+    prefix = "page-"
+    _create_users(client, admin_token, prefix, 7)
+
+    emails, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 3, "email_prefix": prefix}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/admin/users", params=params, headers=bearer(admin_token))
+        assert response.status_code == 200
+        emails += [u["email"] for u in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert emails == [f"{prefix}{i}@example.com" for i in range(7)]
+
+    # the NDJSON export yields the same users in the same order
+    response = client.get(
+        "/admin/users", params={"email_prefix": prefix, "stream": "true"},
+        headers=bearer(admin_token),
+    )
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["email"] for line in response.text.splitlines()] == emails
+
+
+def test_email_prefix_is_matched_literally(client, admin_token):
+    _create_users(client, admin_token, "under_score-", 1)
+    _create_users(client, admin_token, "underXscore-", 1)
+
+    users = client.get(
+        "/admin/users", params={"email_prefix": "under_"}, headers=bearer(admin_token)
+    ).json()
+    assert [u["email"] for u in users] == ["under_score-0@example.com"]
+
+
+def test_invalid_cursor(client, admin_token):
+    response = client.get(
+        "/admin/users", params={"cursor": "garbage"}, headers=bearer(admin_token)
+    )
+    assert response.status_code == 400
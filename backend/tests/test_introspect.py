@@ -0,0 +1,83 @@
+import pytest
+
+from app import deps
+from app.core.jwt import create_access_token
+from conftest import bearer, signup_and_login
+
+KEY = "gateway-key"
+
+
+@pytest.fixture
+def introspect(client, monkeypatch):
+    monkeypatch.setattr(deps, "INTROSPECT_API_KEY", KEY)
+
+    def post(tokens, key=KEY):
+        headers = {"X-Introspect-Key": key} if key else {}
+        client.cookies.clear()
+        return client.post("/auth/introspect", json={"tokens": tokens}, headers=headers)
+
+    return post
+
+
+def test_mixed_batch(client, introspect):
+    _, valid, refresh = signup_and_login(client)
+    client.cookies.clear()
+
+    _, logged_out, logged_out_refresh = signup_and_login(client)
+    client.cookies.clear()
+    client.post(
+        "/auth/logout",
+        headers={**bearer(logged_out), "Cookie": f"refresh_token={logged_out_refresh}"},
+    )
+
+    _, watermarked, _ = signup_and_login(client)
+    client.cookies.clear()
+    assert client.delete("/sessions", headers=bearer(watermarked)).status_code == 200
+
+    response = introspect([valid, logged_out, refresh, "not-a-token", watermarked])
+    assert response.status_code == 200
+    results = response.json()["results"]
+
+    assert [r["active"] for r in results] == [True, False, False, False, False]
+    me = client.get("/protected/me", headers=bearer(valid)).json()
+    assert results[0]["sub"] == me["id"]
+    assert results[0]["email"] == me["email"]
+    # inactive results carry nothing else
+    assert all(r == {"active": False} for r in results[1:])
+
+
+def test_unknown_user_is_inactive(introspect):
+    token = create_access_token({"sub": "00000000-0000-0000-0000-000000000000"}, 5)
+    assert introspect([token]).json()["results"] == [{"active": False}]
+
+
+def test_refresh_tokens_are_not_access_tokens(client):
+    _, _, refresh = signup_and_login(client)
+    client.cookies.clear()
+
+    response = client.get("/protected/me", headers=bearer(refresh))
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid token type"
+
+
+def test_access_tokens_cannot_be_refreshed(client):
+    _, access, _ = signup_and_login(client)
+    client.cookies.clear()
+
+    response = client.post("/auth/refresh", headers={"Cookie": f"refresh_token={access}"})
+    client.cookies.clear()
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid token type"
+
+
+def test_wrong_or_missing_key_is_rejected(introspect):
+    assert introspect(["x"], key="wrong").status_code == 401
+    assert introspect(["x"], key=None).status_code == 401
+
+
+def test_unconfigured_introspection_returns_503(client, monkeypatch):
+    monkeypatch.setattr(deps, "INTROSPECT_API_KEY", None)
+    response = client.post(
+        "/auth/introspect", json={"tokens": ["x"]}, headers={"X-Introspect-Key": KEY}
+    )
+    assert response.status_code == 503
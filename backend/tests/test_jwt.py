@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+from app.core.jwt import AsymmetricBackend, TokenCodec, TokenError, TokenExpired
+
+SECRET = "test-secret"
+
+
+def _asymmetric(algorithm: str) -> TokenCodec:
+    if algorithm == "ES256":
+        key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        key = ed25519.Ed25519PrivateKey.generate()
+    return TokenCodec(None, algorithm, AsymmetricBackend(algorithm, signing_key=key))
+
+
+def _pyjwt() -> TokenCodec:
+    pytest.importorskip("jwt")
+    return TokenCodec(SECRET, "HS256", "pyjwt")
+
+
+CODECS = {
+    "hmac": lambda: TokenCodec(SECRET, "HS256", "hmac"),
+    "hmac-hs512": lambda: TokenCodec(SECRET, "HS512", "hmac"),
+    "jose": lambda: TokenCodec(SECRET, "HS256", "jose"),
+    "pyjwt": _pyjwt,
+    "es256": lambda: _asymmetric("ES256"),
+    "eddsa": lambda: _asymmetric("EdDSA"),
+}
+
+
+@pytest.fixture(params=list(CODECS))
+def codec(request) -> TokenCodec:
+    return CODECS[request.param]()
+
+
+def _claims(expires_in: timedelta = timedelta(minutes=5)) -> dict:
+    now = datetime.utcnow()
+    return {"sub": "user-1", "jti": "jti-1", "iat": now, "exp": now + expires_in, "roles": ["admin"]}
+
+
+def _tamper(token: str) -> str:
+    header, payload, signature = token.split(".")
+    return ".".join((header, payload[:-2] + ("AA" if payload[-2:] != "AA" else "BB"), signature))
+
+
+def test_round_trip(codec):
+    claims = codec.decode(codec.encode(_claims()))
+
+    assert claims["sub"] == "user-1"
+    assert claims["roles"] == ["admin"]
+    assert isinstance(claims["exp"], int)
+
+
+def test_expired_token(codec):
+    token = codec.encode(_claims(expires_in=timedelta(seconds=-10)))
+
+    with pytest.raises(TokenExpired):
+        codec.decode(token)
+
+
+def test_tampered_token(codec):
+    with pytest.raises(TokenError):
+        codec.decode(_tamper(codec.encode(_claims())))
+
+
+@pytest.mark.parametrize("token", ["", "a.b", "not.a.jwt", "a.b.c.d"])
+def test_malformed_token(codec, token):
+    with pytest.raises(TokenError):
+        codec.decode(token)
+
+
+def test_auto_picks_the_stdlib_backend_for_hmac():
+    assert TokenCodec(SECRET, "HS256").backend == "hmac"
+
+
+def test_hmac_backend_is_compatible_with_python_jose():
+    hmac_codec = TokenCodec(SECRET, "HS256", "hmac")
+    jose_codec = TokenCodec(SECRET, "HS256", "jose")
+
+    assert jose_codec.decode(hmac_codec.encode(_claims()))["sub"] == "user-1"
+    assert hmac_codec.decode(jose_codec.encode(_claims()))["sub"] == "user-1"
+
+
+def test_wrong_secret_or_algorithm_is_rejected():
+    token = TokenCodec(SECRET, "HS256", "hmac").encode(_claims())
+
+    with pytest.raises(TokenError):
+        TokenCodec("other-secret", "HS256", "hmac").decode(token)
+    with pytest.raises(TokenError):
+        TokenCodec(SECRET, "HS512", "hmac").decode(token)
+
+
+def test_asymmetric_key_rotation():
+    old_key = ec.generate_private_key(ec.SECP256R1())
+    new_key = ec.generate_private_key(ec.SECP256R1())
+    old = TokenCodec(None, "ES256", AsymmetricBackend("ES256", signing_key=old_key, signing_kid="old"))
+    new = TokenCodec(None, "ES256", AsymmetricBackend(
+        "ES256",
+        signing_key=new_key,
+        signing_kid="new",
+        verification_keys={"old": old_key.public_key()},
+    ))
+
+    # tokens signed with the previous key still verify
+    assert new.decode(old.encode(_claims()))["sub"] == "user-1"
+    assert {key["kid"] for key in new.jwks()["keys"]} == {"old", "new"}
+
+    # but not once it is no longer listed
+    with pytest.raises(TokenError):
+        old.decode(new.encode(_claims()))
+
+
+def test_hmac_secret_is_never_published():
+    assert TokenCodec(SECRET, "HS256").jwks() == {"keys": []}
+
+
+def test_asymmetric_key_type_must_match_the_algorithm():
+    with pytest.raises(ValueError):
+        AsymmetricBackend("ES256", signing_key=ed25519.Ed25519PrivateKey.generate())
+
+
+def test_jwks_endpoint(client):
+    response = client.get("/.well-known/jwks.json")
+
+    assert response.status_code == 200
+    # HS256 in the test config: nothing to publish
+    assert response.json() == {"keys": []}
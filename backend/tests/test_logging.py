@@ -0,0 +1,71 @@
+import json
+import logging
+import queue
+
+from prometheus_client import REGISTRY
+
+from app.core.logging_config import (
+    BoundedQueueHandler,
+    JsonFormatter,
+    MaskedEmail,
+    SamplingFilter,
+)
+
+
+def _record(msg="event %s", args=("a",), **extra) -> logging.LogRecord:
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def _dropped() -> float:
+    return REGISTRY.get_sample_value("log_records_dropped_total") or 0.0
+
+
+def test_sampling_keeps_one_in_every_per_key():
+    sampler = SamplingFilter(every=3)
+
+    kept = [sampler.filter(_record(sample="jwt_invalid")) for _ in range(7)]
+    assert kept == [True, False, False, True, False, False, True]
+
+    other = _record(sample="other")
+    assert sampler.filter(other)
+    assert other.sample_rate == 3
+    # unsampled records always pass
+    assert all(sampler.filter(_record()) for _ in range(5))
+
+
+def test_sampling_every_one_keeps_everything():
+    sampler = SamplingFilter(every=1)
+    assert all(sampler.filter(_record(sample="key")) for _ in range(5))
+
+
+def test_full_queue_drops_and_counts():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=2))
+    before = _dropped()
+
+    for i in range(5):
+        handler.handle(_record(args=(i,)))
+
+    assert handler.queue.qsize() == 2
+    assert _dropped() - before == 3
+    assert [handler.queue.get_nowait().getMessage() for _ in range(2)] == ["event 0", "event 1"]
+
+
+def test_formatting_is_left_to_the_listener():
+    rendered = []
+
+    class Spy(MaskedEmail):
+        def __str__(self):
+            rendered.append(self.email)
+            return super().__str__()
+
+    handler = BoundedQueueHandler(queue.Queue(maxsize=10))
+    handler.handle(_record("login for %s", (Spy("jane@example.com"),), request_id="r1"))
+    assert rendered == []
+
+    queued = handler.queue.get_nowait()
+    entry = json.loads(JsonFormatter().format(queued))
+    assert entry["message"] == "login for j***@example.com"
+    assert entry["request_id"] == "r1"
+    assert rendered == ["jane@example.com"]
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect, text
+
+from app.migrations import MIGRATIONS
+from conftest import requires_postgres, reset_database, wait_until_ready
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _migrate():
+    # the documented deploy step, in a fresh interpreter
+    return subprocess.run(
+        [sys.executable, "-m", "app.migrations"],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+    )
+
+
+@requires_postgres
+def test_migrate_and_start_on_empty_database():
+    from app.database import engine
+    from app.main import app
+
+    reset_database()
+
+    result = _migrate()
+    assert result.returncode == 0, result.stderr
+
+    tables = set(inspect(engine).get_table_names())
+    assert {
+        "users", "roles", "user_roles", "refresh_tokens",
+        "revoked_tokens", "schema_migrations",
+    } <= tables
+    with engine.connect() as conn:
+        applied = {row[0] for row in conn.execute(text("SELECT id FROM schema_migrations"))}
+    assert applied == {migration_id for migration_id, _ in MIGRATIONS}
+
+    # idempotent
+    result = _migrate()
+    assert result.returncode == 0, result.stderr
+
+    with TestClient(app) as client:
+        wait_until_ready(client)
+        body = client.get("/health/ready").json()
+        assert body["status"] == "ready"
+        assert body["revocation_index_loaded"]
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from app.core import negative_cache
+from app.core.negative_cache import (
+    LocalEmailBackend,
+    NegativeCache,
+    forget_unknown_email,
+    is_unknown_email,
+    remember_unknown_email,
+    set_unknown_email_backend,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(negative_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def use_backend(monkeypatch):
+    # restored after the test
+    monkeypatch.setattr(negative_cache, "_email_backend", negative_cache._email_backend)
+    return set_unknown_email_backend
+
+
+def test_entries_expire(clock):
+    cache = NegativeCache(max_entries=10, ttl_seconds=30)
+    cache.add("a")
+    assert "a" in cache
+
+    clock.now += 30
+    assert "a" not in cache
+    assert len(cache._entries) == 0
+
+
+def test_least_recently_added_is_evicted(clock):
+    cache = NegativeCache(max_entries=2, ttl_seconds=30)
+    for key in ("a", "b", "c"):
+        cache.add(key)
+
+    assert "a" not in cache
+    assert "b" in cache and "c" in cache
+
+
+def test_zero_size_disables_the_cache():
+    cache = NegativeCache(max_entries=0, ttl_seconds=30)
+    cache.add("a")
+    assert "a" not in cache
+
+
+def test_discard():
+    cache = NegativeCache(max_entries=10, ttl_seconds=30)
+    cache.add("a")
+    cache.discard("a")
+    cache.discard("missing")
+    assert "a" not in cache
+
+
+def test_unknown_email_cache_is_off_by_default(use_backend):
+    use_backend(None)
+
+    asyncio.run(remember_unknown_email("nobody@example.com"))
+    assert not asyncio.run(is_unknown_email("nobody@example.com"))
+
+
+def test_signup_forgets_the_unknown_email(use_backend):
+    use_backend(LocalEmailBackend(NegativeCache(max_entries=10, ttl_seconds=30)))
+
+    asyncio.run(remember_unknown_email("new@example.com"))
+    assert asyncio.run(is_unknown_email("new@example.com"))
+
+    asyncio.run(forget_unknown_email("new@example.com"))
+    assert not asyncio.run(is_unknown_email("new@example.com"))
+
+
+def test_backend_errors_count_as_a_miss(use_backend):
+    class Broken:
+        async def contains(self, key):
+            raise ConnectionError("store down")
+
+        async def add(self, key, ttl):
+            raise ConnectionError("store down")
+
+        async def discard(self, key):
+            raise ConnectionError("store down")
+
+    use_backend(Broken())
+
+    asyncio.run(remember_unknown_email("a@example.com"))
+    asyncio.run(forget_unknown_email("a@example.com"))
+    assert not asyncio.run(is_unknown_email("a@example.com"))
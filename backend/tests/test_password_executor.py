@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.security import (
+    PASSWORD_HASH_MAX_PENDING,
+    hash_password_async,
+    verify_password_async,
+)
+from conftest import signup_and_login
+
+
+def _free_slots() -> int:
+    """
+    Count the free executor queue slots (and leave them free).
+    """
+    taken = 0
+    while security._pending.acquire(blocking=False):
+        taken += 1
+    for _ in range(taken):
+        security._pending.release()
+    return taken
+
+
+class _Saturated:
+    """
+    Hold every executor queue slot, as concurrent hashes would.
+    """
+
+    def __enter__(self):
+        self.held = 0
+        while security._pending.acquire(blocking=False):
+            self.held += 1
+        return self
+
+    def __exit__(self, *exc):
+        for _ in range(self.held):
+            security._pending.release()
+
+
+def test_hash_and_verify_round_trip():
+    async def main():
+        hashed = await hash_password_async("s3cret-pass")
+        return (
+            await verify_password_async("s3cret-pass", hashed),
+            await verify_password_async("wrong", hashed),
+        )
+
+    assert asyncio.run(main()) == (True, False)
+    assert _free_slots() == PASSWORD_HASH_MAX_PENDING
+
+
+def test_saturated_executor_rejects_with_503():
+    with _Saturated() as saturated:
+        assert saturated.held == PASSWORD_HASH_MAX_PENDING
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(hash_password_async("s3cret-pass"))
+
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "1"
+    # the rejected call did not take (or give back) a slot
+    assert _free_slots() == PASSWORD_HASH_MAX_PENDING
+
+
+def test_failed_job_releases_its_slot():
+    with pytest.raises(ValueError):
+        asyncio.run(verify_password_async("s3cret-pass", "not-a-hash"))
+
+    assert _free_slots() == PASSWORD_HASH_MAX_PENDING
+
+
+def test_login_returns_503_while_saturated_and_recovers(client):
+    email, _, _ = signup_and_login(client)
+    client.cookies.clear()
+    credentials = {"email": email, "password": "s3cret-pass"}
+
+    with _Saturated():
+        response = client.post("/auth/login", json=credentials)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+    assert _free_slots() == PASSWORD_HASH_MAX_PENDING
+    response = client.post("/auth/login", json=credentials)
+    client.cookies.clear()
+    assert response.status_code == 200
+    assert _free_slots() == PASSWORD_HASH_MAX_PENDING
@@ -0,0 +1,53 @@
+from passlib.hash import bcrypt
+from sqlalchemy import select
+
+from app.core import security
+from app.models.user import User
+from conftest import unique_email
+
+PASSWORD = "s3cret-pass"
+
+
+def _create_user(db, rounds: int) -> str:
+    email = unique_email()
+    db.add(User(email=email, hashed_password=bcrypt.using(rounds=rounds).hash(PASSWORD)))
+    db.commit()
+    return email
+
+
+def _stored_hash(db, email: str) -> str:
+    db.expire_all()
+    return db.execute(select(User.hashed_password).where(User.email == email)).scalar_one()
+
+
+def _use_rounds(monkeypatch, rounds: int) -> None:
+    settings = {**security._hash_settings, "bcrypt_rounds": rounds}
+    monkeypatch.setattr(security, "pwd_context", security._build_context(settings))
+
+
+def _login(client, email: str):
+    response = client.post("/auth/login", json={"email": email, "password": PASSWORD})
+    client.cookies.clear()
+    return response
+
+
+def test_weaker_hash_is_upgraded_after_login(client, db, monkeypatch):
+    email = _create_user(db, rounds=4)
+    _use_rounds(monkeypatch, 5)
+
+    # the rehash runs as a background task, before TestClient returns
+    assert _login(client, email).status_code == 200
+
+    upgraded = _stored_hash(db, email)
+    assert bcrypt.from_string(upgraded).rounds == 5
+    assert not security.password_needs_rehash(upgraded)
+    assert _login(client, email).status_code == 200
+
+
+def test_stronger_hash_is_left_alone(client, db, monkeypatch):
+    email = _create_user(db, rounds=5)
+    original = _stored_hash(db, email)
+    _use_rounds(monkeypatch, 4)
+
+    assert _login(client, email).status_code == 200
+    assert _stored_hash(db, email) == original
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import rate_limit
+from app.core.rate_limit import MemoryBackend, enforce_rate_limits, set_rate_limit_backend
+
+
+class _Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock(6000.0)  # start of a 60s window
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def use_backend(monkeypatch):
+    # restored after the test
+    monkeypatch.setattr(rate_limit, "_backend", rate_limit._backend)
+    return set_rate_limit_backend
+
+
+def _hit(backend, key="k", limit=3, window=60.0):
+    return asyncio.run(backend.hit(key, limit, window))
+
+
+def test_allows_up_to_the_limit(clock):
+    backend = MemoryBackend(max_keys=100)
+
+    assert [_hit(backend) for _ in range(3)] == [0, 0, 0]
+    assert _hit(backend) == pytest.approx(60)
+    # other keys are independent
+    assert _hit(backend, key="other") == 0
+
+
+def test_previous_window_is_weighted_by_overlap(clock):
+    backend = MemoryBackend(max_keys=100)
+    for _ in range(3):
+        _hit(backend)
+
+    # half of the previous window still overlaps: 3 * 0.5 = 1.5 counted
+    clock.now += 90
+    assert _hit(backend) == 0
+    assert _hit(backend) == 0
+    wait = _hit(backend)
+    assert 0 < wait < 30
+
+    # two windows later nothing is left
+    clock.now += 120
+    assert _hit(backend) == 0
+
+
+def test_memory_backend_is_bounded(clock):
+    backend = MemoryBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        _hit(backend, key=key, limit=1)
+
+    assert len(backend._windows) == 2
+    # "a" was evicted, so it starts over
+    assert _hit(backend, key="a", limit=1) == 0
+    assert _hit(backend, key="c", limit=1) > 0
+
+
+def test_enforce_raises_429_with_retry_after(clock, use_backend):
+    use_backend(MemoryBackend(max_keys=100))
+
+    asyncio.run(enforce_rate_limits([("login:ip:1.2.3.4", 1)]))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(enforce_rate_limits([("login:ip:1.2.3.4", 1)]))
+
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "60"
+
+
+def test_enforce_fails_open_when_the_backend_errors(use_backend):
+    class Broken:
+        async def hit(self, key, limit, window):
+            raise ConnectionError("store down")
+
+    use_backend(Broken())
+    asyncio.run(enforce_rate_limits([("login:ip:1.2.3.4", 1)] * 5))
@@ -0,0 +1,109 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core.jwt import get_token_codec
+from app.core.security import hash_token
+from app.models.refresh_token import RefreshToken
+from conftest import bearer, signup_and_login
+
+
+@pytest.fixture(autouse=True)
+def _no_cookie_jar(client):
+    # cookies are passed explicitly; the shared client must not keep any
+    client.cookies.clear()
+    yield
+    client.cookies.clear()
+
+
+def _refresh(client, refresh_token: str):
+    client.cookies.clear()
+    response = client.post("/auth/refresh", headers={"Cookie": f"refresh_token={refresh_token}"})
+    client.cookies.clear()
+    return response
+
+
+def _token_row(db, refresh_token: str) -> RefreshToken:
+    db.expire_all()
+    return db.execute(
+        select(RefreshToken).where(RefreshToken.token_hash == hash_token(refresh_token))
+    ).scalar_one()
+
+
+def test_signup_login_and_profile(client):
+    email, access, _ = signup_and_login(client)
+
+    response = client.get("/protected/me", headers=bearer(access))
+    assert response.status_code == 200
+    assert response.json()["email"] == email
+
+
+def test_login_with_wrong_password(client):
+    email, _, _ = signup_and_login(client)
+
+    response = client.post("/auth/login", json={"email": email, "password": "wrong"})
+    assert response.status_code == 401
+
+
+def test_refresh_rotates_within_the_session(client, db):
+    _, _, first = signup_and_login(client)
+
+    response = _refresh(client, first)
+    assert response.status_code == 200
+    second = response.cookies["refresh_token"]
+    assert second != first
+    assert client.get("/protected/me", headers=bearer(response.json()["access_token"])).status_code == 200
+
+    old, new = _token_row(db, first), _token_row(db, second)
+    assert old.is_revoked
+    assert not new.is_revoked
+    assert new.session_id == old.session_id
+
+
+def test_rotated_refresh_token_cannot_be_replayed(client, db):
+    _, _, first = signup_and_login(client)
+    second = _refresh(client, first).cookies["refresh_token"]
+
+    assert _refresh(client, first).status_code == 401
+    # the replay did not burn the current token
+    assert _refresh(client, second).status_code == 200
+
+
+def test_logout_revokes_both_tokens(client, db):
+    _, access, refresh = signup_and_login(client)
+
+    response = client.post(
+        "/auth/logout",
+        headers={**bearer(access), "Cookie": f"refresh_token={refresh}"},
+    )
+    assert response.status_code == 200
+
+    assert client.get("/protected/me", headers=bearer(access)).status_code == 401
+    assert _refresh(client, refresh).status_code == 401
+    assert _token_row(db, refresh).is_revoked
+
+
+def test_refresh_rejects_garbage(client):
+    assert _refresh(client, "not-a-jwt").status_code == 401
+    assert client.post("/auth/refresh").status_code == 401
+    assert _refresh(client, str(uuid.uuid4())).status_code == 401
+
+
+def test_refresh_token_without_exp_is_rejected(client, db):
+    _, access, _ = signup_and_login(client)
+    user_id = client.get("/protected/me", headers=bearer(access)).json()["id"]
+    # validly signed and stored, but never expires
+    token = get_token_codec().encode({"sub": user_id, "jti": str(uuid.uuid4())})
+    db.add(RefreshToken(
+        user_id=uuid.UUID(user_id),
+        token_hash=hash_token(token),
+        expires_at=datetime.utcnow() + timedelta(days=1),
+    ))
+    db.commit()
+
+    response = _refresh(client, token)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid refresh token"
+    assert not _token_row(db, token).is_revoked
@@ -0,0 +1,87 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.revocation import BloomFilter, RevocationIndex
+from app.models.token import RevokedToken
+
+
+def _jti() -> str:
+    return str(uuid.uuid4())
+
+
+def _revoke(db, jti: str, revoked_at: datetime = None, expires_in: timedelta = timedelta(hours=1)):
+    now = datetime.utcnow()
+    db.add(RevokedToken(jti=jti, revoked_at=revoked_at or now, expires_at=now + expires_in))
+    db.commit()
+
+
+@pytest.fixture
+def index(db):
+    index = RevocationIndex(capacity=1000, error_rate=0.001)
+    index.load(db)
+    return index
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [_jti() for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    false_positives = sum(_jti() in bloom for _ in range(10000))
+    assert false_positives < 300
+
+
+def test_load_includes_unexpired_rows_only(db):
+    live, expired = _jti(), _jti()
+    _revoke(db, live)
+    _revoke(db, expired, expires_in=timedelta(seconds=-1))
+
+    index = RevocationIndex(capacity=1000, error_rate=0.001)
+    index.load(db)
+
+    assert index.loaded
+    assert index.is_revoked(live)
+    assert not index.is_revoked(expired)
+
+
+def test_local_add_is_visible_immediately(index):
+    jti = _jti()
+    assert not index.is_revoked(jti)
+
+    index.add(jti, datetime.utcnow() + timedelta(hours=1))
+    assert index.is_revoked(jti)
+
+
+def test_sync_picks_up_rows_from_other_workers(db, index):
+    jti = _jti()
+    _revoke(db, jti)
+
+    assert index.sync(db) == 1
+    assert index.is_revoked(jti)
+    # re-read through the lookback window, but not counted twice
+    assert index.sync(db) == 0
+
+
+def test_sync_picks_up_late_commits(db, index):
+    """
+    revoked_at is stamped before commit: a row committed after a sync can
+    carry a revoked_at older than that sync, and must not be skipped.
+    """
+    index.sync(db)
+    late = _jti()
+    _revoke(db, late, revoked_at=datetime.utcnow() - timedelta(seconds=10))
+
+    assert index.sync(db) == 1
+    assert index.is_revoked(late)
+
+
+def test_sync_skips_expired_rows(db, index):
+    jti = _jti()
+    _revoke(db, jti, expires_in=timedelta(seconds=-1))
+
+    assert index.sync(db) == 0
+    assert not index.is_revoked(jti)
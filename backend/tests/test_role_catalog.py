@@ -0,0 +1,196 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, select
+
+from app.core import role_catalog as role_catalog_module
+from app.core.role_catalog import RoleCatalog
+from app.database import async_engine
+from app.deps import require_role
+from app.models.role import Role
+from app.models.user import User
+from app.models.user_role import UserRole
+from app.routes import admin as admin_routes
+from conftest import bearer, signup_and_login
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class _Catalog(RoleCatalog):
+    """
+    Reloads from `roles` instead of the DB and counts reloads.
+    """
+
+    def __init__(self, roles: dict):
+        super().__init__(ttl_seconds=300, miss_reload_seconds=1)
+        self.roles = roles
+        self.reloads = 0
+
+    async def reload(self, db) -> None:
+        self.reloads += 1
+        self._set(self.roles.items())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(role_catalog_module, "time", clock)
+    return clock
+
+
+def _get(catalog, name):
+    return asyncio.run(catalog.get_id(None, name))
+
+
+def test_first_lookup_loads_the_catalog(clock):
+    catalog = _Catalog({"user": 1, "admin": 2})
+    assert not catalog.loaded
+
+    assert _get(catalog, "user") == 1
+    assert _get(catalog, "admin") == 2
+    assert catalog.reloads == 1
+
+
+def test_reloads_when_stale(clock):
+    catalog = _Catalog({"user": 1})
+    _get(catalog, "user")
+
+    catalog.roles = {"user": 7}
+    clock.now += 299
+    assert _get(catalog, "user") == 1
+    clock.now += 2
+    assert _get(catalog, "user") == 7
+    assert catalog.reloads == 2
+
+
+def test_misses_reload_at_most_once_per_interval(clock):
+    catalog = _Catalog({"user": 1})
+    _get(catalog, "user")
+
+    clock.now += 2
+    for _ in range(5):
+        assert _get(catalog, "nope") is None
+    assert catalog.reloads == 2
+
+    # a role created meanwhile is found after the interval
+    catalog.roles = {"user": 1, "nope": 3}
+    assert _get(catalog, "nope") is None
+    clock.now += 2
+    assert _get(catalog, "nope") == 3
+
+
+def test_invalidate_forces_a_reload(clock):
+    catalog = _Catalog({"user": 1})
+    _get(catalog, "user")
+
+    catalog.roles = {"user": 2}
+    catalog.invalidate()
+    assert not catalog.loaded
+    assert _get(catalog, "user") == 2
+
+
+def test_load_from_database(db):
+    for name in ("catalog-a", "catalog-b"):
+        if not db.query(Role).filter(Role.name == name).first():
+            db.add(Role(name=name))
+    db.commit()
+    expected = dict(db.query(Role.name, Role.id).all())
+
+    catalog = RoleCatalog(ttl_seconds=300, miss_reload_seconds=1)
+    catalog.load(db)
+
+    assert catalog.loaded
+    assert catalog._ids == expected
+
+
+# Set-based role assignment
+
+def _login(client, email: str) -> str:
+    response = client.post("/auth/login", json={"email": email, "password": "s3cret-pass"})
+    client.cookies.clear()
+    return response.json()["access_token"]
+
+
+def _claims_check(token: str):
+    """
+    Status of a claims-mode "user" role check: 200, 401 or 403.
+    """
+    try:
+        asyncio.run(require_role("user", strict=False)(token=token))
+    except HTTPException as e:
+        return e.status_code
+    return 200
+
+
+@pytest.fixture
+def role_statements(monkeypatch):
+    """
+    Use chunks of 2 users and count the statements touching user_roles.
+    """
+    monkeypatch.setattr(admin_routes, "BULK_ROLE_CHUNK_SIZE", 2)
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        if "user_roles" in statement and not statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+
+def test_bulk_role_change_across_chunks(client, admin_token, db, role_statements):
+    emails = [signup_and_login(client)[0] for _ in range(5)]
+    client.cookies.clear()
+    users = dict(db.execute(select(User.email, User.id).where(User.email.in_(emails))).all())
+    user_ids = [str(users[email]) for email in emails]
+    before = {email: _login(client, email) for email in emails}
+
+    def bulk(action: str, ids):
+        response = client.post(
+            "/admin/roles/user/bulk",
+            json={"action": action, "user_ids": ids},
+            headers=bearer(admin_token),
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    # duplicates and unknown ids are dropped / skipped
+    result = bulk("assign", user_ids + user_ids[:1] + [str(uuid.uuid4())])
+    assert result["requested"] == 6
+    assert result["changed"] == 5
+    assert len(role_statements) == 3
+
+    db.expire_all()
+    role_id = db.execute(select(Role.id).where(Role.name == "user")).scalar_one()
+    linked = set(db.execute(
+        select(UserRole.user_id).where(UserRole.role_id == role_id, UserRole.user_id.in_(users.values()))
+    ).scalars())
+    assert linked == set(users.values())
+    assert set(db.execute(
+        select(User.role_version).where(User.id.in_(users.values()))
+    ).scalars()) == {1}
+
+    # tokens from before the change are stale in every chunk
+    assert {_claims_check(token) for token in before.values()} == {401}
+    granted = {email: _login(client, email) for email in emails}
+    assert {_claims_check(token) for token in granted.values()} == {200}
+
+    assert bulk("remove", user_ids)["changed"] == 5
+    assert {_claims_check(token) for token in granted.values()} == {401}
+    assert {_claims_check(_login(client, email)) for email in emails} == {403}
+
+    # nothing left to remove: no role version bump
+    assert bulk("remove", user_ids)["changed"] == 0
+    db.expire_all()
+    assert set(db.execute(
+        select(User.role_version).where(User.id.in_(users.values()))
+    ).scalars()) == {2}
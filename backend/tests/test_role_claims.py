@@ -0,0 +1,99 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.jwt import TokenCodec, create_access_token
+from app.core.role_versions import RoleVersionRegistry, role_versions
+from app.deps import require_role
+from conftest import bearer, signup_and_login
+
+
+def _check(checker, token: str) -> dict:
+    return asyncio.run(checker(token=token))
+
+
+def test_role_version_registry():
+    registry = RoleVersionRegistry()
+    user = uuid.uuid4()
+    assert not registry.is_stale(user, 0)
+
+    registry.note(user, 2)
+    registry.note(user, 1)  # never goes back
+    assert registry.is_stale(user, 1)
+    assert registry.is_stale(user, None)
+    assert not registry.is_stale(user, 2)
+
+    registry.mark_deleted(user)
+    assert registry.is_stale(user, 10**6)
+
+
+def test_claims_mode_decides_from_the_token():
+    checker = require_role("moderator", strict=False)
+    user_id = str(uuid.uuid4())
+
+    token = create_access_token({"sub": user_id}, 5, roles=["moderator"], role_version=3)
+    assert _check(checker, token)["roles"] == ["moderator"]
+
+    token = create_access_token({"sub": user_id}, 5, roles=[], role_version=3)
+    with pytest.raises(HTTPException) as exc:
+        _check(checker, token)
+    assert exc.value.status_code == 403
+
+    # tokens from before role claims existed
+    token = create_access_token({"sub": user_id}, 5)
+    with pytest.raises(HTTPException) as exc:
+        _check(checker, token)
+    assert exc.value.status_code == 401
+
+
+def test_claims_mode_rejects_stale_role_versions():
+    checker = require_role("moderator", strict=False)
+    user_id = str(uuid.uuid4())
+    token = create_access_token({"sub": user_id}, 5, roles=["moderator"], role_version=3)
+
+    role_versions.note(user_id, 4)
+    with pytest.raises(HTTPException) as exc:
+        _check(checker, token)
+    assert exc.value.status_code == 401
+    assert exc.value.detail == "Role claims are stale"
+
+
+def test_login_stamps_roles_into_the_access_token(client, admin_token):
+    claims = TokenCodec.unverified_claims(admin_token)
+    assert claims["roles"] == ["admin"]
+    assert isinstance(claims["rv"], int)
+
+
+def test_admin_routes_require_the_admin_role(client, admin_token):
+    _, access, _ = signup_and_login(client)
+    client.cookies.clear()
+
+    assert client.get("/admin/users", headers=bearer(access)).status_code == 403
+    assert client.get("/admin/users").status_code == 401
+    assert client.get("/admin/users", headers=bearer(admin_token)).status_code == 200
+
+
+def test_demoted_admin_loses_access_immediately(client, admin_token):
+    email, access, _ = signup_and_login(client)
+    client.cookies.clear()
+    user_id = client.get("/protected/me", headers=bearer(access)).json()["id"]
+
+    assert client.post(
+        f"/admin/users/{user_id}/roles/admin", headers=bearer(admin_token)
+    ).status_code == 200
+    assert client.post(
+        f"/admin/users/{user_id}/roles/admin", headers=bearer(admin_token)
+    ).status_code == 400
+
+    response = client.post("/auth/login", json={"email": email, "password": "s3cret-pass"})
+    client.cookies.clear()
+    promoted = response.json()["access_token"]
+    assert client.get("/admin/users", headers=bearer(promoted)).status_code == 200
+
+    assert client.delete(
+        f"/admin/users/{user_id}/roles/admin", headers=bearer(admin_token)
+    ).status_code == 200
+    # the token still claims "admin", the database no longer does
+    assert client.get("/admin/users", headers=bearer(promoted)).status_code == 403
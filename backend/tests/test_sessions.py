@@ -0,0 +1,113 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+
+from app import deps
+from app.core.jwt import TokenCodec, get_token_codec
+from app.core.negative_cache import revoked_refresh_tokens
+from app.core.security import hash_token
+from app.core.sessions import SessionWatermarks, issued_before, session_watermarks
+from app.models.refresh_token import RefreshToken
+from conftest import bearer, signup_and_login
+
+REVOKED_AT = datetime(2026, 1, 1, 12, 0, 0, 400000)
+SECOND = 1767268800  # REVOKED_AT, whole seconds
+
+
+@pytest.fixture(autouse=True)
+def _no_cookie_jar(client):
+    client.cookies.clear()
+    yield
+    client.cookies.clear()
+
+
+def _refresh(client, refresh_token: str):
+    client.cookies.clear()
+    response = client.post("/auth/refresh", headers={"Cookie": f"refresh_token={refresh_token}"})
+    client.cookies.clear()
+    return response
+
+
+def test_iat_has_millisecond_precision():
+    token = get_token_codec().encode({"sub": "x", "iat": REVOKED_AT})
+    assert TokenCodec.unverified_claims(token)["iat"] == SECOND + 0.4
+
+
+def test_watermark_separates_tokens_within_one_second():
+    watermarks = SessionWatermarks()
+    user_id = str(uuid.uuid4())
+    watermarks.set(user_id, REVOKED_AT)
+
+    assert watermarks.is_invalidated(user_id, SECOND + 0.3)
+    assert watermarks.is_invalidated(user_id, SECOND + 0.4)
+    assert not watermarks.is_invalidated(user_id, SECOND + 0.5)
+    # whole-second iat from older tokens
+    assert watermarks.is_invalidated(user_id, SECOND)
+    assert watermarks.is_invalidated(user_id, None)
+
+    assert issued_before(SECOND + 0.4, REVOKED_AT)
+    assert not issued_before(SECOND + 0.5, REVOKED_AT)
+    assert not issued_before(SECOND, None)
+
+
+def test_revoke_all_sessions(client):
+    email, access, first = signup_and_login(client)
+    # a second device
+    response = client.post("/auth/login", json={"email": email, "password": "s3cret-pass"})
+    second = response.cookies["refresh_token"]
+
+    response = client.delete("/sessions", headers=bearer(access))
+    assert response.status_code == 200
+    assert response.json()["sessions_revoked"] == 2
+
+    assert client.get("/protected/me", headers=bearer(access)).status_code == 401
+    assert _refresh(client, first).status_code == 401
+    assert _refresh(client, second).status_code == 401
+
+
+def test_login_right_after_revoke_all(client, monkeypatch):
+    email, access, _ = signup_and_login(client)
+    assert client.delete("/sessions", headers=bearer(access)).status_code == 200
+
+    # same second as the revoke-all, almost always
+    response = client.post("/auth/login", json={"email": email, "password": "s3cret-pass"})
+    assert response.status_code == 200
+    access, refresh = response.json()["access_token"], response.cookies["refresh_token"]
+    client.cookies.clear()
+
+    assert client.get("/protected/me", headers=bearer(access)).status_code == 200
+    monkeypatch.setattr(deps, "INTROSPECT_API_KEY", "gateway-key")
+    response = client.post(
+        "/auth/introspect", json={"tokens": [access]}, headers={"X-Introspect-Key": "gateway-key"}
+    )
+    assert response.json()["results"][0]["active"]
+    assert _refresh(client, refresh).status_code == 200
+
+
+def test_refresh_checks_the_watermark_in_the_database(client, db):
+    """
+    A worker that has not synced the revoke-all yet must still reject
+    tokens issued before it, even if their row escaped revocation
+    (e.g. inserted by a rotation that raced with the revoke-all).
+    """
+    _, access, refresh = signup_and_login(client)
+    user_id = client.get("/protected/me", headers=bearer(access)).json()["id"]
+
+    assert client.delete("/sessions", headers=bearer(access)).status_code == 200
+
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == hash_token(refresh))
+        .values(is_revoked=False)
+    )
+    db.commit()
+    session_watermarks._by_user.pop(user_id, None)
+    revoked_refresh_tokens.clear()
+
+    response = _refresh(client, refresh)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Session revoked"
+    # and the worker learned the watermark
+    assert session_watermarks.is_invalidated(user_id, 0)
@@ -0,0 +1,87 @@
+import uuid
+from datetime import datetime, timedelta
+
+from prometheus_client import REGISTRY
+from sqlalchemy import func, select, text
+
+from app.core.sweeper import SWEEP_LOCK_KEY, sweep_once
+from app.database import engine
+from app.models.refresh_token import RefreshToken
+from app.models.token import RevokedToken
+from app.models.user import User
+
+
+def _purged(table: str) -> float:
+    return REGISTRY.get_sample_value("token_sweep_rows_purged_total", {"table": table}) or 0.0
+
+
+def _seed(db):
+    now = datetime.utcnow()
+    user = User(email=f"sweep-{uuid.uuid4().hex[:8]}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+
+    def revoked(expires_at, revoked_at=now):
+        db.add(RevokedToken(jti=str(uuid.uuid4()), expires_at=expires_at, revoked_at=revoked_at))
+
+    def refresh(expires_at, is_revoked=False):
+        db.add(RefreshToken(
+            user_id=user.id, token_hash=uuid.uuid4().bytes * 2,
+            expires_at=expires_at, is_revoked=is_revoked,
+        ))
+
+    for _ in range(5):
+        revoked(now - timedelta(minutes=1))                       # expired
+    for _ in range(2):
+        revoked(None, revoked_at=now - timedelta(days=30))        # legacy, past retention
+    revoked(None)                                                 # legacy, recent
+    revoked(now + timedelta(hours=1))                             # live
+
+    for _ in range(3):
+        refresh(now - timedelta(minutes=1))                       # expired
+    for _ in range(4):
+        refresh(now + timedelta(days=1), is_revoked=True)         # rotated / logged out
+    refresh(now + timedelta(days=1))                              # active
+    db.commit()
+    return user.id
+
+
+def _count(db, model, user_id=None) -> int:
+    query = select(func.count()).select_from(model)
+    if user_id is not None:
+        query = query.where(model.user_id == user_id)
+    return db.execute(query).scalar()
+
+
+def test_sweep_purges_dead_rows_in_batches(db):
+    sweep_once()  # whatever earlier tests left behind
+    revoked_before = _count(db, RevokedToken)
+    purged_before = {t: _purged(t) for t in ("revoked_tokens", "refresh_tokens")}
+
+    user_id = _seed(db)
+    result = sweep_once(batch_size=2)
+
+    assert result == {"revoked_tokens": 7, "refresh_tokens": 7}
+    assert _purged("revoked_tokens") - purged_before["revoked_tokens"] == 7
+    assert _purged("refresh_tokens") - purged_before["refresh_tokens"] == 7
+
+    db.expire_all()
+    assert _count(db, RevokedToken) == revoked_before + 2
+    assert _count(db, RefreshToken, user_id) == 1
+
+    assert sweep_once(batch_size=2) == {"revoked_tokens": 0, "refresh_tokens": 0}
+
+
+def test_sweep_is_skipped_while_another_process_sweeps(db):
+    sweep_once()
+    _seed(db)
+
+    with engine.connect() as other:
+        assert other.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": SWEEP_LOCK_KEY}).scalar()
+        try:
+            assert sweep_once() is None
+        finally:
+            other.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SWEEP_LOCK_KEY})
+            other.commit()
+
+    assert sweep_once() == {"revoked_tokens": 7, "refresh_tokens": 7}
@@ -0,0 +1,139 @@
+import time
+import uuid
+
+import pytest
+
+from app.core import token_cache as token_cache_module
+from app.core.jwt import TokenCodec
+from app.core.token_cache import TokenCache, UserSnapshot, token_cache
+from conftest import bearer, signup_and_login
+
+
+def _user(user_id=None) -> UserSnapshot:
+    return UserSnapshot(id=user_id or uuid.uuid4(), email="a@example.com", is_active=True, roles=())
+
+
+def _cached(token: str):
+    return token_cache.get(TokenCodec.unverified_claims(token)["jti"], token)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    class Clock:
+        now = 1000.0
+
+        def time(self):
+            return self.now
+
+    clock = Clock()
+    monkeypatch.setattr(token_cache_module, "time", clock)
+    return clock
+
+
+def test_hit_requires_the_identical_token():
+    cache = TokenCache(max_entries=10, ttl_seconds=60)
+    cache.put("jti-1", "token-a", {}, _user())
+
+    assert cache.get("jti-1", "token-a") is not None
+    assert cache.get("jti-1", "token-b") is None
+
+
+def test_entries_expire_at_ttl_or_exp(clock):
+    cache = TokenCache(max_entries=10, ttl_seconds=60)
+    cache.put("long", "t1", {"exp": 5000}, _user())
+    cache.put("short", "t2", {"exp": 1010}, _user())
+
+    clock.now += 11
+    assert cache.get("short", "t2") is None
+    assert cache.get("long", "t1") is not None
+    clock.now += 50
+    assert cache.get("long", "t1") is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = TokenCache(max_entries=2, ttl_seconds=60)
+    for jti in ("a", "b"):
+        cache.put(jti, jti, {}, _user())
+    cache.get("a", "a")
+    cache.put("c", "c", {}, _user())
+
+    assert cache.get("b", "b") is None
+    assert cache.get("a", "a") is not None
+
+
+def test_invalidate_user_drops_all_their_tokens():
+    cache = TokenCache(max_entries=10, ttl_seconds=60)
+    user, other = uuid.uuid4(), uuid.uuid4()
+    cache.put("a", "a", {}, _user(user))
+    cache.put("b", "b", {}, _user(user))
+    cache.put("c", "c", {}, _user(other))
+
+    cache.invalidate_user(str(user))
+    assert cache.get("a", "a") is None and cache.get("b", "b") is None
+    assert cache.get("c", "c") is not None
+
+
+def test_zero_size_disables_the_cache():
+    cache = TokenCache(max_entries=0, ttl_seconds=60)
+    cache.put("a", "a", {}, _user())
+    assert cache.get("a", "a") is None
+
+
+def test_verified_tokens_are_served_from_the_cache(client):
+    _, access, _ = signup_and_login(client)
+    client.cookies.clear()
+
+    assert client.get("/protected/me", headers=bearer(access)).status_code == 200
+    assert _cached(access) is not None
+
+
+def test_logout_stops_the_cached_token(client):
+    _, access, refresh = signup_and_login(client)
+    client.get("/protected/me", headers=bearer(access))
+    assert _cached(access) is not None
+
+    client.cookies.clear()
+    client.post("/auth/logout", headers={**bearer(access), "Cookie": f"refresh_token={refresh}"})
+    client.cookies.clear()
+
+    assert client.get("/protected/me", headers=bearer(access)).status_code == 401
+
+
+def test_revoke_all_stops_the_cached_token(client):
+    _, access, _ = signup_and_login(client)
+    client.cookies.clear()
+    client.get("/protected/me", headers=bearer(access))
+    assert _cached(access) is not None
+
+    assert client.delete("/sessions", headers=bearer(access)).status_code == 200
+    client.cookies.clear()
+
+    assert client.get("/protected/me", headers=bearer(access)).status_code == 401
+
+
+def test_role_change_drops_the_cached_snapshot(client, admin_token):
+    _, access, _ = signup_and_login(client)
+    client.cookies.clear()
+    me = client.get("/protected/me", headers=bearer(access)).json()
+    assert me["roles"] == []
+
+    response = client.post(f"/admin/users/{me['id']}/roles/admin", headers=bearer(admin_token))
+    assert response.status_code == 200
+
+    assert _cached(access) is None
+    assert client.get("/protected/me", headers=bearer(access)).json()["roles"] == ["admin"]
+
+
+def test_cached_entry_lives_at_most_the_ttl(client, monkeypatch):
+    _, access, _ = signup_and_login(client)
+    client.cookies.clear()
+    client.get("/protected/me", headers=bearer(access))
+
+    class Later:
+        @staticmethod
+        def time():
+            return now + token_cache.ttl_seconds + 1
+
+    now = time.time()
+    monkeypatch.setattr(token_cache_module, "time", Later)
+    assert _cached(access) is None
@@ -0,0 +1,171 @@
+import asyncio
+import functools
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app.core import security, user_import
+from app.core.security import PASSWORD_HASH_BULK_BATCH, hash_passwords_async, verify_password
+from app.models.role import Role
+from app.models.user import User
+from app.models.user_role import UserRole
+from app.routes import admin as admin_routes
+from conftest import bearer, signup_and_login, unique_email
+
+TOO_LONG = "x" * 73
+
+
+@pytest.fixture
+def chunk_sizes(monkeypatch):
+    """
+    Import in chunks of 2 and record the size of every chunk.
+    """
+    sizes = []
+    import_chunk = user_import._import_chunk
+
+    async def spy(db, rows, *args):
+        sizes.append(len(rows))
+        return await import_chunk(db, rows, *args)
+
+    monkeypatch.setattr(user_import, "_import_chunk", spy)
+    monkeypatch.setattr(
+        admin_routes, "import_users", functools.partial(user_import.import_users, chunk_size=2)
+    )
+    return sizes
+
+
+def _import(client, token, body: str, fmt: str):
+    response = client.post(
+        f"/admin/users/import?format={fmt}", content=body.encode(), headers=bearer(token)
+    )
+    assert response.status_code == 200, response.text
+    report = [json.loads(line) for line in response.text.splitlines()]
+    return report, json.loads(response.headers["X-Import-Summary"])
+
+
+def _users(db, emails):
+    db.expire_all()
+    return {
+        user.email: user
+        for user in db.execute(select(User).where(User.email.in_(emails))).scalars()
+    }
+
+
+def test_csv_import_creates_users_in_chunks(client, admin_token, db, chunk_sizes):
+    emails = [unique_email() for _ in range(5)]
+    body = "email,password,is_active\n" + "".join(
+        f"{email},pass-{i},{'false' if i == 4 else 'true'}\n" for i, email in enumerate(emails)
+    )
+
+    report, summary = _import(client, admin_token, body, "csv")
+
+    assert chunk_sizes == [2, 2, 1]
+    assert summary == {"created": 5}
+    assert [r["line"] for r in report] == [2, 3, 4, 5, 6]
+    assert [r["email"] for r in report] == emails
+
+    users = _users(db, emails)
+    for i, email in enumerate(emails):
+        assert str(users[email].id) == report[i]["id"]
+        assert verify_password(f"pass-{i}", users[email].hashed_password)
+    assert users[emails[4]].is_active is False
+
+    # every imported user gets the default role
+    linked = set(db.execute(
+        select(UserRole.user_id)
+        .join(Role, Role.id == UserRole.role_id)
+        .where(Role.name == "user", UserRole.user_id.in_([u.id for u in users.values()]))
+    ).scalars())
+    assert linked == {u.id for u in users.values()}
+
+
+def test_existing_emails_are_skipped(client, admin_token, db, chunk_sizes):
+    existing, _, _ = signup_and_login(client)
+    client.cookies.clear()
+    before = _users(db, [existing])[existing].hashed_password
+    new = unique_email()
+
+    body = f"email,password\n{existing},other-pass\n{new},pass\n"
+    report, summary = _import(client, admin_token, body, "csv")
+
+    assert summary == {"exists": 1, "created": 1}
+    assert report[0] == {"line": 2, "email": existing, "status": "exists"}
+    assert report[1]["status"] == "created"
+    # ON CONFLICT (email) DO NOTHING left the existing user alone
+    assert _users(db, [existing])[existing].hashed_password == before
+
+
+def test_per_row_report(client, admin_token, chunk_sizes):
+    first, second = unique_email(), unique_email()
+    body = "\n".join([
+        "email,password",
+        f"{first},pass",
+        "not-an-email,pass",
+        f"{first},pass",                # again, in another chunk
+        f"{second},pass,extra-column",  # malformed
+        f"{second},{TOO_LONG}",         # rejected by the hasher
+        "",
+        f"{second},pass",
+    ])
+
+    report, summary = _import(client, admin_token, body, "csv")
+
+    assert [(r["line"], r["status"]) for r in report] == [
+        (2, "created"),
+        (3, "invalid"),
+        (4, "duplicate"),
+        (5, "invalid"),
+        (6, "invalid"),
+        (8, "created"),
+    ]
+    assert report[1]["email"] == "not-an-email"
+    assert summary == {"created": 2, "invalid": 3, "duplicate": 1}
+
+
+def test_ndjson_import(client, admin_token):
+    email = unique_email()
+    body = "\n".join([
+        json.dumps({"email": email, "password": "pass", "is_active": False}),
+        "{not json",
+        json.dumps(["a", "list"]),
+        json.dumps({"email": unique_email()}),  # no password
+    ])
+
+    report, summary = _import(client, admin_token, body, "ndjson")
+
+    assert [r["status"] for r in report] == ["created", "invalid", "invalid", "invalid"]
+    assert summary == {"created": 1, "invalid": 3}
+
+
+def test_import_requires_admin(client):
+    _, access, _ = signup_and_login(client)
+    client.cookies.clear()
+    response = client.post(
+        "/admin/users/import?format=csv", content=b"email,password\n", headers=bearer(access)
+    )
+    assert response.status_code == 403
+
+
+def test_bulk_hashing_leaves_interactive_slots_alone():
+    passwords = [f"pass-{i}" for i in range(PASSWORD_HASH_BULK_BATCH * 2 + 1)]
+    passwords[5] = TOO_LONG
+
+    # hold every interactive slot: bulk hashing must not need one
+    held = 0
+    while security._pending.acquire(blocking=False):
+        held += 1
+    try:
+        hashes = asyncio.run(hash_passwords_async(passwords))
+    finally:
+        for _ in range(held):
+            security._pending.release()
+
+    assert len(hashes) == len(passwords)
+    assert hashes[5] is None
+    assert all(
+        verify_password(password, hashed)
+        for password, hashed in zip(passwords, hashes)
+        if hashed is not None
+    )
+    assert security.get_bulk_password_executor() is not security.get_password_executor()
@@ -0,0 +1,201 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.core.security import hash_token
+from app.core.write_batcher import WriteBatcher, WriteBatcherStopped, _Write, write_batcher
+from app.models.refresh_token import RefreshToken
+from conftest import bearer, signup_and_login, wait_until_ready
+
+
+class _Batcher(WriteBatcher):
+    """
+    Records commits instead of writing; writes marked "bad" fail.
+    """
+
+    def __init__(self, max_size: int = 500):
+        super().__init__(max_delay_ms=5, max_size=max_size)
+        self.commits = []
+
+    async def _commit(self, batch):
+        if any(values.get("bad") for write in batch for values in write.refresh_tokens):
+            raise ValueError("bad row")
+        self.commits.append(len(batch))
+
+
+def _run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+
+def test_concurrent_writes_share_one_commit():
+    async def main():
+        batcher = _Batcher()
+        batcher.start()
+        await asyncio.gather(*(batcher.insert_refresh_token({}) for _ in range(10)))
+        await batcher.stop()
+        return batcher.commits
+
+    assert _run(main()) == [10]
+
+
+def test_batches_are_bounded():
+    async def main():
+        batcher = _Batcher(max_size=4)
+        batcher.start()
+        await asyncio.gather(*(batcher.insert_refresh_token({}) for _ in range(10)))
+        await batcher.stop()
+        return batcher.commits
+
+    assert _run(main()) == [4, 4, 2]
+
+
+def test_failed_batch_is_retried_one_by_one():
+    async def main():
+        batcher = _Batcher()
+        batcher.start()
+        results = await asyncio.gather(
+            batcher.insert_refresh_token({}),
+            batcher.insert_refresh_token({"bad": True}),
+            batcher.insert_refresh_token({}),
+            return_exceptions=True,
+        )
+        await batcher.stop()
+        return results, batcher.commits
+
+    results, commits = _run(main())
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], ValueError)
+    assert commits == [1, 1]
+
+
+def test_writes_are_rejected_once_stopping():
+    async def main():
+        batcher = _Batcher()
+        batcher.start()
+        pending = asyncio.ensure_future(batcher.insert_refresh_token({}))
+        await asyncio.sleep(0)
+
+        stopping = asyncio.ensure_future(batcher.stop())
+        await asyncio.sleep(0)
+        assert not batcher.running
+        with pytest.raises(WriteBatcherStopped):
+            await batcher.insert_refresh_token({})
+
+        await stopping
+        await pending
+        return batcher.commits
+
+    assert _run(main()) == [1]
+
+
+def test_stop_resolves_writes_queued_behind_the_sentinel():
+    async def main():
+        batcher = _Batcher()
+        batcher.start()
+        stopping = asyncio.ensure_future(batcher.stop())
+        await asyncio.sleep(0)
+
+        late = _Write(refresh_tokens=[{}])
+        late.future = asyncio.get_running_loop().create_future()
+        batcher._queue.put_nowait(late)
+
+        await stopping
+        await late.future
+        return batcher.commits
+
+    assert _run(main()) == [1]
+
+
+@pytest.fixture(scope="module")
+def batched_client(database):
+    import app.main
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(app.main, "WRITE_BATCH_ENABLED", True)
+        with TestClient(app.main.app) as client:
+            wait_until_ready(client)
+            assert write_batcher.running
+            yield client
+
+    assert not write_batcher.running
+
+
+def test_login_and_logout_through_the_batcher(batched_client):
+    client = batched_client
+    _, access, refresh = signup_and_login(client)
+    client.cookies.clear()
+
+    response = client.post("/auth/refresh", headers={"Cookie": f"refresh_token={refresh}"})
+    assert response.status_code == 200
+    access, refresh = response.json()["access_token"], response.cookies["refresh_token"]
+    client.cookies.clear()
+
+    response = client.post(
+        "/auth/logout",
+        headers={**bearer(access), "Cookie": f"refresh_token={refresh}"},
+    )
+    assert response.status_code == 200
+    client.cookies.clear()
+
+    assert client.get("/protected/me", headers=bearer(access)).status_code == 401
+    assert client.post(
+        "/auth/refresh", headers={"Cookie": f"refresh_token={refresh}"}
+    ).status_code == 401
+
+
+@pytest.fixture
+def stop_before(batched_client, monkeypatch):
+    """
+    Make a batched write call stop() right before submitting, as a
+    shutdown racing the route would. The batcher is restarted after.
+    """
+    def patch(method: str):
+        submit = getattr(write_batcher, method)
+
+        async def stop_then_submit(*args):
+            await write_batcher.stop()
+            await submit(*args)
+
+        monkeypatch.setattr(write_batcher, method, stop_then_submit)
+
+    yield patch
+    batched_client.portal.call(write_batcher.start)
+
+
+def _refresh_token_row(db, refresh_token: str) -> RefreshToken:
+    db.expire_all()
+    return db.execute(
+        select(RefreshToken).where(RefreshToken.token_hash == hash_token(refresh_token))
+    ).scalar_one()
+
+
+def test_login_falls_back_when_the_batcher_stops(batched_client, stop_before, db):
+    client = batched_client
+    stop_before("insert_refresh_token")
+
+    _, access, refresh = signup_and_login(client)
+    client.cookies.clear()
+
+    assert not write_batcher.running
+    assert not _refresh_token_row(db, refresh).is_revoked
+    assert client.get("/protected/me", headers=bearer(access)).status_code == 200
+
+
+def test_logout_falls_back_when_the_batcher_stops(batched_client, stop_before, db):
+    client = batched_client
+    _, access, refresh = signup_and_login(client)
+    client.cookies.clear()
+    stop_before("revoke")
+
+    response = client.post(
+        "/auth/logout",
+        headers={**bearer(access), "Cookie": f"refresh_token={refresh}"},
+    )
+    client.cookies.clear()
+    assert response.status_code == 200
+
+    assert not write_batcher.running
+    assert _refresh_token_row(db, refresh).is_revoked
+    assert client.get("/protected/me", headers=bearer(access)).status_code == 401